@@ -0,0 +1,433 @@
+import os
+import hmac
+import json
+import math
+import asyncio
+import sqlite3
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, replace
+from datetime import date
+from functools import reduce
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from common import DB_PATH, cached_query, db_pool, ensure_database, get_db_path
+from modules.factors import FactorRegistry, get_emission_factors
+from modules.electricity import calculate_electricity_emission, calculate_hvac_emission
+from modules.food import calculate_dish_emission
+from modules.material import (calculate_banner_emission, calculate_kit_emission, calculate_kit_item_emission,
+                              calculate_momento_emission, calculate_trophy_emission)
+from modules.sc1_emissions import calculate_emission
+from modules.transport import calculate_transport_emission
+from app_pages.quick_stats import quick_stats
+from resources import registry
+from tenancy import CONSULTANTS, DEFAULT_ORG, org_for_user, shard_path, use_org, validate_org
+from visualizations.stats_engine import RunningStats
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+API_HOST = os.getenv("EMISSIONS_API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("EMISSIONS_API_PORT", 8600))
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+ORG_HEADER = "X-Organization"  # Shard to use; the token's organization when absent
+MAX_RECORDS = 5000  # Activity records per POST
+MAX_AMOUNT = float(os.getenv("EMISSIONS_API_MAX_AMOUNT", 1e7))  # Per record, in the source's unit
+MAX_QUANTITY = 100_000  # Units per Materials record
+GROUP_COMMIT_BATCHES = 64  # Concurrent POSTs written in one transaction
+TRANSPORT_MODE = "Road"  # The only mode the transport calculator offers
+
+# 🧮 Material calculators by category (Kit items go through calculate_kit_item_emission)
+MATERIAL_CALCULATORS = {
+    "Trophies": calculate_trophy_emission,
+    "Banners": calculate_banner_emission,
+    "Momentoes": calculate_momento_emission,
+    "Kit": calculate_kit_emission,
+}
+
+
+def _parse_tokens(value: str) -> Dict[str, str]:
+    """``"<token>:ops_manager,<token>:sustain_consultant"`` -> {token: user}."""
+    pairs = (item.rsplit(":", 1) for item in value.split(",") if ":" in item)
+    return {token.strip(): user.strip() for token, user in pairs if token.strip() and user.strip()}
+
+
+# Each token acts as a user, so it reaches that user's organization (tenancy.USER_ORGS), or any for consultants.
+# Without tokens only loopback clients are served.
+API_TOKENS = _parse_tokens(os.getenv("EMISSIONS_API_TOKENS", ""))
+
+
+class ApiError(Exception):
+    """Request failure reported to the client as ``{"error": ...}`` with ``status``."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass(frozen=True)
+class ActivityRecord:
+    """One validated activity record and its emission (kg CO₂e).
+
+    ``amount`` is litres of fuel (Scope1), kWh (ElectricityEmissions), kg of refrigerant leaked
+    (HVACEmissions), kg per unit (Materials), kg of a dish (FoodItems) or km (TransportEmissions).
+    """
+    index: int  # Position in the posted batch
+    source: str  # Ledger SourceTable
+    event: str
+    item: str
+    amount: float
+    quantity: int = 1  # Materials only
+    material: Optional[str] = None  # Single Kit item, e.g. "pen"
+    emission: float = 0.0
+
+
+# 📌 Calculators by ledger source: (is the item known, emission of a record)
+SOURCES: Dict[str, Tuple[Callable[[FactorRegistry, str, Optional[str]], bool], Callable[[ActivityRecord], float]]] = {
+    "Scope1": (lambda f, item, _: f.factor("Scope1", item) is not None,
+               lambda r: calculate_emission(r.item, r.amount)),
+    "ElectricityEmissions": (lambda f, item, _: f.factor("ElectricityEmissions", item) is not None,
+                             lambda r: calculate_electricity_emission(r.item, r.amount)),
+    "HVACEmissions": (lambda f, item, _: f.factor("HVACEmissions", item) is not None,
+                      lambda r: calculate_hvac_emission(r.item, r.amount)),
+    "Materials": (lambda f, item, material: item in MATERIAL_CALCULATORS and (
+                      material is None or (item == "Kit" and f.factor("Materials", item, material) is not None)),
+                  lambda r: (calculate_kit_item_emission(r.material, r.amount, r.quantity) if r.material
+                             else MATERIAL_CALCULATORS[r.item](r.amount, r.quantity))),
+    "FoodItems": (lambda f, item, _: f.factor("FoodItems", item) is not None,
+                  lambda r: calculate_dish_emission(r.item, r.amount)),
+    "TransportEmissions": (lambda f, item, _: f.factor("TransportEmissions", item) is not None
+                           or f.factor("ElectricConsumption", item) is not None,
+                           lambda r: calculate_transport_emission(TRANSPORT_MODE, r.item, r.amount)),
+}
+
+
+def parse_record(index: int, raw: Any, factors: FactorRegistry) -> ActivityRecord:
+    """Validate one posted record against the factor registry and calculate its emission; raises ValueError."""
+    if not isinstance(raw, dict):
+        raise ValueError("record must be an object")
+    source, event, item = raw.get("source"), raw.get("event"), raw.get("item")
+    if source not in SOURCES:
+        raise ValueError(f"unknown source {source!r}; expected one of {', '.join(SOURCES)}")
+    if not isinstance(event, str) or not event.strip() or len(event) > 200:
+        raise ValueError("event must be a non-empty string of at most 200 characters")
+    amount, quantity, material = raw.get("amount"), raw.get("quantity", 1), raw.get("material")
+    if (isinstance(amount, bool) or not isinstance(amount, (int, float)) or not math.isfinite(amount)
+            or not 0 <= amount <= MAX_AMOUNT):
+        raise ValueError(f"amount must be a number from 0 to {MAX_AMOUNT:g}")
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or not 1 <= quantity <= MAX_QUANTITY:
+        raise ValueError(f"quantity must be an integer from 1 to {MAX_QUANTITY}")
+    if material is not None and (not isinstance(material, str) or len(material) > 200):
+        raise ValueError("material must be a string of at most 200 characters")
+    known, calculate = SOURCES[source]
+    if not isinstance(item, str) or not known(factors, item, material):
+        raise ValueError(f"unknown {source} item {item!r}" + (f" / material {material!r}" if material else ""))
+    record = ActivityRecord(index, source, event.strip(), item, float(amount), quantity, material)
+    emission = calculate(record)
+    if isinstance(emission, bool) or not isinstance(emission, (int, float)) or not math.isfinite(emission) or emission < 0:
+        raise ValueError(f"emission of this record is out of range: {emission!r}")
+    return replace(record, emission=float(emission))
+
+
+def _insert_rows(conn: sqlite3.Connection, records: List[ActivityRecord]):
+    """Insert records into their source tables; the schema triggers fill the ledger and rollups."""
+    by_source: Dict[str, List[ActivityRecord]] = {}
+    for record in records:
+        by_source.setdefault(record.source, []).append(record)
+    events = sorted({r.event for r in records})
+    conn.executemany("INSERT INTO Events (name) SELECT ? WHERE NOT EXISTS (SELECT 1 FROM Events WHERE name = ?)",
+                     [(event, event) for event in events])
+    for source, rows in by_source.items():
+        if source == "Scope1":
+            # One Scope1 row per event holds its fuels as JSON lists, like a save from the calculator
+            for event in events:
+                fuels = [r for r in rows if r.event == event]
+                if fuels:
+                    conn.execute(
+                        "INSERT INTO Scope1 (event, fuels, consumptions, emissions, total_emission) VALUES (?, ?, ?, ?, ?)",
+                        (event, json.dumps([r.item for r in fuels]), json.dumps([r.amount for r in fuels]),
+                         json.dumps([r.emission for r in fuels]), sum(r.emission for r in fuels)),
+                    )
+        elif source == "ElectricityEmissions":
+            conn.executemany("INSERT INTO ElectricityEmissions (event, Usage, Value, Emission) VALUES (?, ?, ?, ?)",
+                             [(r.event, r.item, r.amount, r.emission) for r in rows])
+        elif source == "HVACEmissions":
+            conn.executemany("INSERT INTO HVACEmissions (event, Refrigerant, MassLeak, Emission) VALUES (?, ?, ?, ?)",
+                             [(r.event, r.item, r.amount, r.emission) for r in rows])
+        elif source == "Materials":
+            conn.executemany("INSERT INTO Materials (event, Category, Weight, Quantity, Emission) VALUES (?, ?, ?, ?, ?)",
+                             [(r.event, r.material or r.item, r.amount, r.quantity, r.emission) for r in rows])
+        elif source == "FoodItems":
+            conn.executemany("INSERT INTO FoodItems (event, FoodItem, Quantity, Emission) VALUES (?, ?, ?, ?)",
+                             [(r.event, r.item, r.amount, r.emission) for r in rows])
+        elif source == "TransportEmissions":
+            conn.executemany(
+                "INSERT INTO TransportEmissions (event, Mode, Vehicle, WeightOrDistance, Emission) VALUES (?, ?, ?, ?, ?)",
+                [(r.event, TRANSPORT_MODE, r.item, r.amount, r.emission) for r in rows])
+
+
+def write_batches(db_path: str, batches: List[List[ActivityRecord]]) -> List[Optional[Exception]]:
+    """Write several requests' records in one transaction, each under its own savepoint.
+
+    A batch that fails is rolled back alone; returns None or the error for every batch.
+    """
+    errors: List[Optional[Exception]] = []
+    try:
+        with db_pool(db_path).connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for i, batch in enumerate(batches):
+                conn.execute(f"SAVEPOINT batch{i}")
+                try:
+                    _insert_rows(conn, batch)
+                    errors.append(None)
+                except sqlite3.Error as e:
+                    conn.execute(f"ROLLBACK TO batch{i}")
+                    errors.append(e)
+                conn.execute(f"RELEASE batch{i}")
+            conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"Error writing activity records: {e}")
+        return [e] * len(batches)
+    return errors
+
+
+class GroupCommitWriter:
+    """Queues posted batches of one database and writes whatever is waiting in a single transaction,
+    so concurrent requests share one commit instead of contending for the write lock."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+
+    async def write(self, records: List[ActivityRecord]):
+        """Wait until ``records`` are committed; raises the batch's sqlite3.Error."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((records, future))
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        await future
+
+    async def _run(self):
+        pending = []
+        try:
+            await run_in_threadpool(ensure_database, self.db_path)  # Once per process, like the app
+            while True:
+                pending = [await self.queue.get()]
+                while not self.queue.empty() and len(pending) < GROUP_COMMIT_BATCHES:
+                    pending.append(self.queue.get_nowait())
+                errors = await run_in_threadpool(write_batches, self.db_path, [records for records, _ in pending])
+                for (_, future), error in zip(pending, errors):
+                    if future.done():
+                        continue  # The client went away
+                    if error:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(None)
+                pending = []
+        except Exception as e:
+            # Fail every waiting request rather than leave it hanging; the next write starts a new task
+            logging.error(f"Group commit writer for {self.db_path} stopped: {e}")
+            while not self.queue.empty():
+                pending.append(self.queue.get_nowait())
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+
+
+_writers: Dict[str, GroupCommitWriter] = {}
+
+
+def _writer(db_path: str) -> GroupCommitWriter:
+    if db_path not in _writers:
+        _writers[db_path] = GroupCommitWriter(db_path)
+    return _writers[db_path]
+
+
+# 📌 Request handling
+def _token_user(authorization: str) -> Optional[str]:
+    """User a ``Bearer`` token belongs to; every token is compared so timing reveals nothing."""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    user = None
+    for candidate, owner in API_TOKENS.items():
+        if hmac.compare_digest(candidate.encode(), token.strip().encode()):
+            user = owner
+    return user
+
+
+def _organization(request: Request) -> str:
+    """Check the token and return the organization whose shard the request uses."""
+    if API_TOKENS:
+        user = _token_user(request.headers.get("authorization", ""))
+        if user is None:
+            raise ApiError(401, "missing or invalid bearer token")
+        home = org_for_user(user)
+        org = request.headers.get(ORG_HEADER, home)
+        if org != home and user not in CONSULTANTS:
+            raise ApiError(403, f"token is not allowed to use organization {org!r}")
+    elif request.client is None or request.client.host not in LOOPBACK_HOSTS:
+        raise ApiError(403, "no API tokens are configured (EMISSIONS_API_TOKENS), so only local requests are served")
+    else:
+        org = request.headers.get(ORG_HEADER, DEFAULT_ORG)  # Local tooling, trusted like shards.py
+    try:
+        validate_org(org)
+    except ValueError as e:
+        raise ApiError(400, str(e))
+    if org != DEFAULT_ORG and not os.path.exists(shard_path(org)):
+        raise ApiError(404, f"unknown organization {org!r}")  # Shards are created with shards.py
+    return org
+
+
+def endpoint(handler: Callable):
+    """Run a handler against the request's shard and turn failures into JSON errors."""
+    async def run(request: Request) -> JSONResponse:
+        try:
+            with use_org(_organization(request)):  # Copied into the worker threads handlers use
+                status, body = await handler(request)
+            try:
+                return JSONResponse(body, status_code=status)
+            except ValueError as e:
+                # JSON has no inf/nan, e.g. for a total that overflowed before amounts were capped
+                logging.error(f"Unserializable result in {request.url.path}: {e}")
+                raise ApiError(500, "result contains non-finite numbers")
+        except ApiError as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status)
+        except sqlite3.Error as e:
+            logging.error(f"Database error in {request.url.path}: {e}")
+            return JSONResponse({"error": "database error"}, status_code=503)
+        except Exception as e:
+            logging.exception(f"Unexpected error in {request.url.path}: {e}")
+            return JSONResponse({"error": "internal error"}, status_code=500)
+    return run
+
+
+@endpoint
+async def post_records(request: Request):
+    """Calculate and store a batch of activity records; results come back grouped by event."""
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ApiError(400, "body must be JSON")
+    raw_records = body.get("records") if isinstance(body, dict) else body
+    if not isinstance(raw_records, list) or not raw_records:
+        raise ApiError(400, 'expected {"records": [...]} with at least one record')
+    if len(raw_records) > MAX_RECORDS:
+        raise ApiError(413, f"at most {MAX_RECORDS} records per request")
+
+    records, rejected = [], []
+    factors = get_emission_factors()
+    for index, raw in enumerate(raw_records):
+        try:
+            records.append(parse_record(index, raw, factors))
+        except ValueError as e:
+            rejected.append({"index": index, "error": str(e)})
+    if records:
+        await _writer(get_db_path()).write(records)
+
+    events: Dict[str, Dict[str, Any]] = {}
+    for r in records:
+        summary = events.setdefault(r.event, {"records": [], "emission": 0.0})
+        summary["records"].append({"index": r.index, "source": r.source, "item": r.item, "amount": r.amount,
+                                   "quantity": r.quantity, "material": r.material, "emission": r.emission})
+        summary["emission"] += r.emission
+    return (200 if records else 422), {"accepted": len(records), "rejected": rejected, "events": events}
+
+
+@endpoint
+async def list_events(request: Request):
+    """Every event with its record count, total emission and first/last day, from the EmissionStats rollup."""
+    rows = await run_in_threadpool(
+        cached_query, "SELECT Event, SUM(Count), SUM(Total), MIN(Day), MAX(Day) FROM EmissionStats GROUP BY Event ORDER BY 3 DESC")
+    return 200, {"events": [{"event": event, "records": count, "emission": total, "first_day": first, "last_day": last}
+                            for event, count, total, first, last in rows]}
+
+
+@endpoint
+async def event_summary(request: Request):
+    """Per-source statistics of one event, merged from its EmissionStats buckets."""
+    event = request.path_params["event"]
+    rows = await run_in_threadpool(
+        cached_query, "SELECT SourceTable, Count, Total, Mean, M2, MinValue, MaxValue, PeakTimestamp, LatestTimestamp "
+                "FROM EmissionStats WHERE Event = ?", (event,))
+    if not rows:
+        raise ApiError(404, f"no emissions recorded for event {event!r}")
+    by_source: Dict[str, List[RunningStats]] = {}
+    for source, *values in rows:
+        by_source.setdefault(source, []).append(RunningStats(*values))
+    sources = {}
+    for source, parts in sorted(by_source.items()):
+        stats = reduce(RunningStats.merge, parts, RunningStats())
+        sources[source] = {"records": stats.count, "emission": stats.total, "mean": stats.mean, "std": stats.std,
+                           "min": stats.min, "max": stats.max, "peak_timestamp": stats.peak_timestamp,
+                           "latest_timestamp": stats.latest_timestamp}
+    return 200, {"event": event, "emission": sum(s["emission"] for s in sources.values()), "sources": sources}
+
+
+@endpoint
+async def daily_totals(request: Request):
+    """Ledger totals per local day (EMISSIONS_TIMEZONE) from the LedgerDaily rollup (``start``/``end`` as YYYY-MM-DD)."""
+    try:
+        start = date.fromisoformat(request.query_params.get("start", "0001-01-01")).isoformat()
+        end = date.fromisoformat(request.query_params.get("end", "9999-12-31")).isoformat()
+    except ValueError:
+        raise ApiError(400, "start and end must be YYYY-MM-DD dates")
+    rows = await run_in_threadpool(
+        cached_query, "SELECT Day, Count, Total FROM LedgerDaily WHERE Day >= ? AND Day <= ? ORDER BY Day", (start, end))
+    return 200, {"days": [{"day": day, "records": count, "emission": total} for day, count, total in rows]}
+
+
+@endpoint
+async def summary_stats(request: Request):
+    """The sidebar Quick Stats: footprint of the last period and progress against the annual target."""
+    stats = await run_in_threadpool(quick_stats)
+    return 200, {**asdict(stats), "delta_pct": stats.delta_pct, "progress_pct": stats.progress_pct,
+                 "pace_pts": stats.pace_pts}
+
+
+@endpoint
+async def list_factors(request: Request):
+    """The emission factors the calculators use, by ledger source."""
+    factors = get_emission_factors()
+    return 200, {source: {item: dict(value) if hasattr(value, "items") else value for item, value in table.items()}
+                 for source, table in factors.tables.items()}
+
+
+@endpoint
+async def health(request: Request):
+    """Health of the shared resources created so far."""
+    report = await run_in_threadpool(registry.health)
+    healthy = all(status == "ok" for status in report.values())
+    return (200 if healthy else 503), {"status": "ok" if healthy else "degraded", "resources": report}
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    await run_in_threadpool(ensure_database, DB_PATH)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/v1/records", post_records, methods=["POST"]),
+        Route("/v1/events", list_events),
+        Route("/v1/events/{event}", event_summary),
+        Route("/v1/daily", daily_totals),
+        Route("/v1/stats", summary_stats),
+        Route("/v1/factors", list_factors),
+        Route("/health", health),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    if not API_TOKENS and API_HOST not in LOOPBACK_HOSTS:
+        raise SystemExit(f"Refusing to listen on {API_HOST} without EMISSIONS_API_TOKENS")
+    uvicorn.run(app, host=API_HOST, port=API_PORT, access_log=False)
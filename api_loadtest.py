@@ -0,0 +1,103 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# 📌 Request mix: (weight, method, path, records per POST)
+SCENARIOS = {
+    "ingest": [(1, "POST", "/v1/records", 20)],
+    "query": [(3, "GET", "/v1/events", 0), (3, "GET", "/v1/daily", 0), (2, "GET", "/v1/stats", 0),
+              (2, "GET", "/v1/events/LoadTest-0", 0)],
+    "mixed": [(2, "POST", "/v1/records", 20), (3, "GET", "/v1/events", 0), (3, "GET", "/v1/daily", 0),
+              (2, "GET", "/v1/events/LoadTest-0", 0)],
+}
+
+SAMPLE_RECORDS = [
+    {"source": "ElectricityEmissions", "item": "Cooling", "amount": 12.5},
+    {"source": "Scope1", "item": "Diesel", "amount": 3.0},
+    {"source": "Materials", "item": "Banners", "amount": 0.8, "quantity": 4},
+    {"source": "TransportEmissions", "item": "BUS", "amount": 42.0},
+]
+
+
+def _records(count: int) -> List[Dict]:
+    return [{**random.choice(SAMPLE_RECORDS), "event": f"LoadTest-{random.randrange(5)}"} for _ in range(count)]
+
+
+async def _request(reader, writer, host: str, method: str, path: str, headers: Dict[str, str], body: bytes) -> int:
+    """One HTTP/1.1 request on a kept-alive connection; returns the status code."""
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(url, mix, deadline: float, headers: Dict[str, str], latencies: List[float], errors: List[int]):
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    weights = [weight for weight, *_ in mix]
+    while time.perf_counter() < deadline:
+        _, method, path, count = random.choices(mix, weights)[0]
+        body = json.dumps({"records": _records(count)}).encode() if method == "POST" else b""
+        start = time.perf_counter()
+        status = await _request(reader, writer, url.netloc, method, path,
+                                {**headers, "Content-Type": "application/json"} if body else headers, body)
+        latencies.append(time.perf_counter() - start)
+        if status >= 400 and status != 404:
+            errors.append(status)
+    writer.close()
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def run(base_url: str, scenario: str, connections: int, duration: float,
+              headers: Dict[str, str]) -> Tuple[float, float, float, int]:
+    """Requests/sec, p50 and p99 latency (ms) and error count of ``connections`` clients over ``duration`` seconds."""
+    url = urlsplit(base_url)
+    latencies: List[float] = []
+    errors: List[int] = []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(url, SCENARIOS[scenario], deadline, headers, latencies, errors)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000, len(errors)
+
+
+# 📌 Command line: start the API (python api.py), then run this against it
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for the emissions HTTP API")
+    parser.add_argument("--url", default="http://127.0.0.1:8600")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), default="mixed")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--token", help="Bearer token (one of EMISSIONS_API_TOKENS)")
+    parser.add_argument("--org", help="X-Organization header")
+    args = parser.parse_args()
+
+    headers = {}
+    if args.token:
+        headers["Authorization"] = f"Bearer {args.token}"
+    if args.org:
+        headers["X-Organization"] = args.org
+    print(f"{'scenario':<8} {'conns':>5} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for connections in args.connections:
+        rps, p50, p99, errors = asyncio.run(run(args.url, args.scenario, connections, args.duration, headers))
+        print(f"{args.scenario:<8} {connections:>5} {rps:>9,.0f} {p50:>8.1f} {p99:>8.1f} {errors:>6}")
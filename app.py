@@ -4,7 +4,10 @@ from app_pages.overview import overview_page
 from app_pages.Login import simple_login
 from app_pages.sidebar import render_sidebar  # Import the new sidebar component
 from visualizations.OverallAnalysis import vis
-from common import create_database
+from visualizations.portfolio import portfolio_page
+from common import DB_PATH, ensure_database
+from session_store import synced_session
+from tenancy import CONSULTANTS, ORG_STATE_KEY, org_for_user
 
 # Set page configuration
 st.set_page_config(
@@ -41,9 +44,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize database
+# Initialize the default database (it also holds the session store); shards are set up on first use
 try:
-    create_database()
+    ensure_database(DB_PATH)
 except Exception as e:
     st.error(f"Failed to initialize database: {e}")
     st.stop()
@@ -61,42 +64,49 @@ def handle_authentication():
         
     return True
 
-# Main application flow
-if "logged_in_user" in st.session_state:
-    # User is already logged in
-    # Initialize sidebar_page if not already set
-    if "sidebar_page" not in st.session_state:
-        st.session_state.sidebar_page = "main"
+# Main application flow (persisted session keys are restored first and saved after every run)
+with synced_session():
+    if "logged_in_user" in st.session_state:
+        # User is already logged in
+        # Initialize sidebar_page if not already set
+        if "sidebar_page" not in st.session_state:
+            st.session_state.sidebar_page = "main"
+        # Sessions saved before organizations existed belong to the user's home organization
+        if ORG_STATE_KEY not in st.session_state:
+            st.session_state[ORG_STATE_KEY] = org_for_user(st.session_state.logged_in_user)
+        ensure_database()  # This session's shard
         
-    render_sidebar(st.session_state.logged_in_user)
+        render_sidebar(st.session_state.logged_in_user)
     
-    # Only show the main dashboard content if we're not in profile or contact pages
-    if st.session_state.get("sidebar_page", "main") == "main":
-        # Main page title and description
-        st.title("Emission Calculator and Analysis Dashboard")
-        st.write("This dashboard is designed to calculate and analyze emissions for Scope 1, Scope 2, and Scope 3.")
+        # Only show the main dashboard content if we're not in profile or contact pages
+        if st.session_state.get("sidebar_page", "main") == "main":
+            # Main page title and description
+            st.title("Emission Calculator and Analysis Dashboard")
+            st.write("This dashboard is designed to calculate and analyze emissions for Scope 1, Scope 2, and Scope 3.")
         
-        # Navigation
-        pages = {
-            "Overview": overview_page,
-            "Analysis": vis
-        }
+            # Navigation
+            pages = {
+                "Overview": overview_page,
+                "Analysis": vis
+            }
+            if st.session_state.logged_in_user in CONSULTANTS:
+                pages["Portfolio"] = portfolio_page
 
-        selected = option_menu(
-            menu_title="Emissions Calculators",
-            menu_icon="cloud",
-            options=list(pages.keys()),
-            orientation="horizontal",
-        )
+            selected = option_menu(
+                menu_title="Emissions Calculators",
+                menu_icon="cloud",
+                options=list(pages.keys()),
+                orientation="horizontal",
+            )
 
-        # Route to the selected page
-        if selected in pages:
-            with st.spinner(f"Loading {selected}..."):
-                pages[selected]()
-else:
-    # User is not logged in, show login form
-    if handle_authentication():
-        # Force a rerun to show dashboard after successful login
-        st.rerun()
+            # Route to the selected page
+            if selected in pages:
+                with st.spinner(f"Loading {selected}..."):
+                    pages[selected]()
     else:
-        st.stop()
\ No newline at end of file
+        # User is not logged in, show login form
+        if handle_authentication():
+            # Force a rerun to show dashboard after successful login
+            st.rerun()
+        else:
+            st.stop()
\ No newline at end of file
@@ -2,6 +2,8 @@ import streamlit as st
 import logging
 import os
 from hashlib import sha256
+from session_store import persist_key, rotate_session
+from tenancy import ORG_STATE_KEY, org_for_user
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -13,6 +15,10 @@ USER_CREDENTIALS = {
     "sustain_consultant": os.getenv("SUSTAIN_CONSULTANT_PASSWORD", "admin123"),
 }
 
+# Logins hold on every replica behind the load balancer, for the browser that logged in
+persist_key("logged_in_user", auth=True)
+persist_key(ORG_STATE_KEY, auth=True)  # The organization whose shard this session reads and writes
+
 # 🧮 Hash Password
 def hash_password(password: str) -> str:
     """Hash a password using SHA-256."""
@@ -56,6 +62,8 @@ def simple_login():
         if username == expected_username and hash_password(password) == expected_password_hash:
             st.sidebar.success(f"Logged in as {role}")
             st.session_state.logged_in_user = expected_username
+            st.session_state[ORG_STATE_KEY] = org_for_user(expected_username)
+            rotate_session()  # A session id handed out before login never carries the login
             logging.info(f"User {username} logged in successfully.")
             return st.session_state.logged_in_user
         else:
@@ -0,0 +1,91 @@
+import sys
+import uuid
+import sqlite3
+import logging
+import weakref
+from collections import deque
+from typing import Dict, List, Optional
+from common import db_pool, get_db_path
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+WINDOW_SIZE = 40  # Messages kept in memory per session
+FLUSH_BATCH = 10  # Messages written to ChatTranscripts at a time (must stay below WINDOW_SIZE)
+PAGE_SIZE = 20  # Messages rendered in the chat, and per page of older history
+
+
+def _write(db_path: str, session_id: str, username: Optional[str], pending: List[Dict]) -> bool:
+    """Insert pending messages into ChatTranscripts and clear the list; keeps them on failure."""
+    if not pending:
+        return True
+    try:
+        with db_pool(db_path).connection() as conn, conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO ChatTranscripts (SessionId, Username, Seq, Role, Content) VALUES (?, ?, ?, ?, ?)",
+                [(session_id, username, m["seq"], m["role"], m["content"]) for m in pending],
+            )
+    except sqlite3.Error as e:
+        logging.error(f"Error saving chat transcript: {e}")
+        return False
+    pending.clear()
+    return True
+
+
+class ChatHistory:
+    """Chat messages of one session: a bounded window in memory, the full transcript in the database.
+
+    Messages are numbered by ``seq`` and written in batches of ``FLUSH_BATCH``; since a batch is
+    smaller than the window, a message is always saved before it drops out of memory. Whatever is
+    still pending is written when the session's history is garbage-collected.
+    """
+
+    def __init__(self, username: Optional[str] = None, db_path: Optional[str] = None):
+        self.session_id = uuid.uuid4().hex
+        self.username = username
+        self.db_path = db_path or get_db_path()
+        self.window = deque(maxlen=WINDOW_SIZE)
+        self.pending: List[Dict] = []
+        self.count = 0
+        # Holds the pending list itself, not the history, so the history can still be collected
+        self._finalizer = weakref.finalize(self, _write, self.db_path, self.session_id, self.username, self.pending)
+
+    def append(self, role: str, content: str) -> Dict:
+        """Add a message, writing a batch to the database once enough are pending."""
+        message = {"seq": self.count, "role": role, "content": content}
+        self.count += 1
+        self.window.append(message)
+        self.pending.append(message)
+        if len(self.pending) >= FLUSH_BATCH:
+            self.flush()
+        return message
+
+    def flush(self) -> bool:
+        """Write every pending message now."""
+        return _write(self.db_path, self.session_id, self.username, self.pending)
+
+    def messages(self, start: int, stop: int) -> List[Dict]:
+        """Messages with ``start <= seq < stop``, from memory where possible and the transcript otherwise."""
+        start, stop = max(start, 0), min(stop, self.count)
+        first_in_memory = self.window[0]["seq"] if self.window else self.count
+        older = []
+        if start < min(stop, first_in_memory):
+            try:
+                with db_pool(self.db_path).connection() as conn:
+                    rows = conn.execute(
+                        "SELECT Seq, Role, Content FROM ChatTranscripts WHERE SessionId = ? AND Seq >= ? AND Seq < ? ORDER BY Seq",
+                        (self.session_id, start, min(stop, first_in_memory)),
+                    ).fetchall()
+                older = [{"seq": seq, "role": role, "content": content} for seq, role, content in rows]
+            except sqlite3.Error as e:
+                logging.error(f"Error reading chat transcript: {e}")
+        return older + [m for m in self.window if start <= m["seq"] < stop]
+
+    def recent(self, limit: int = PAGE_SIZE) -> List[Dict]:
+        """The last ``limit`` messages (at most the in-memory window)."""
+        return list(self.window)[-limit:]
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the in-memory window."""
+        return sys.getsizeof(self.window) + sum(
+            sys.getsizeof(m) + sum(sys.getsizeof(value) for value in m.values()) for m in self.window)
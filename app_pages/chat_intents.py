@@ -0,0 +1,365 @@
+import re
+import logging
+import threading
+from dataclasses import dataclass, field, replace
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+from common import get_db_path, query_cache
+from modules.factors import get_emission_factors
+from resources import registry
+from visualizations.aggregations import aggregate
+from visualizations.filters import FilterContext, local_today
+from visualizations.time_buckets import time_buckets
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DEFAULT_TOP_N = 5
+MAX_TOP_N = 50
+
+# 🧭 Intent keywords: phrase -> (intent, extra slot)
+INTENT_PHRASES = {
+    "top": ("top", None), "largest": ("top", None), "biggest": ("top", None), "highest": ("top", None),
+    "most": ("top", None), "main": ("top", None),
+    "trend": ("trend", None), "over time": ("trend", None), "history": ("trend", None),
+    "hourly": ("trend", "hour"), "daily": ("trend", "day"), "weekly": ("trend", "week"),
+    "month": ("trend", "month"), "months": ("trend", "month"), "monthly": ("trend", "month"),
+    "quarterly": ("trend", "quarter"), "yearly": ("trend", "year"), "annual": ("trend", "year"),
+    "total": ("total", None), "footprint": ("total", None), "how much": ("total", None),
+    "breakdown": ("breakdown", None), "break down": ("breakdown", None), "category": ("breakdown", None),
+    "categories": ("breakdown", None), "split": ("breakdown", None),
+    "scope": ("scopes", None), "scopes": ("scopes", None),
+    "reduce": ("tips", None), "reduction": ("tips", None), "tip": ("tips", None), "tips": ("tips", None),
+    "what is": ("explain", None), "what are": ("explain", None),
+    # Questions about how figures are worked out, answered from the methodology notes before anything else
+    "explain": ("method", None), "calculate": ("method", None), "calculated": ("method", None),
+    "calculation": ("method", None), "methodology": ("method", None), "definition": ("method", None),
+}
+
+# What a "top N ..." question ranks: phrase -> (MasterEmissions column, sources it implies)
+FOOD_SOURCES = ("FoodItems", "FoodItemsEmissions")
+DIMENSION_PHRASES = {
+    "sources": ("SourceTable", ()), "events": ("Event", ()),
+    "items": ("Description", ()),
+    "foods": ("Description", FOOD_SOURCES), "dishes": ("Description", FOOD_SOURCES),
+    "fuels": ("Description", ("Scope1",)),
+    "vehicles": ("Description", ("TransportEmissions", "ElectricConsumption")),
+    "materials": ("Description", ("Materials",)),
+    "refrigerants": ("Description", ("HVACEmissions",)),
+    "usages": ("Description", ("ElectricityEmissions",)),
+}
+
+SCOPE_PHRASES = {
+    "Scope1": ("scope 1", "scope1", "scope one", "direct emissions"),
+    "Scope2": ("scope 2", "scope2", "scope two", "purchased energy"),
+    "Scope3": ("scope 3", "scope3", "scope three", "indirect emissions"),
+}
+
+# Source names: phrase group -> SourceTable values in MasterEmissions
+SOURCE_PHRASES = {
+    ("material",): ("Materials",),
+    ("transport", "transportation", "travel"): ("TransportEmissions", "ElectricConsumption"),
+    ("electricity",): ("ElectricityEmissions",),
+    ("hvac", "refrigerant"): ("HVACEmissions",),
+    ("food", "catering"): FOOD_SOURCES,
+    ("fuel", "combustion"): ("Scope1",),
+    ("shipment", "shipments", "logistics", "freight"): ("ShipmentLegs",),
+}
+
+MONTHS = ("january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december")
+
+# A month word only names a month next to one of these, a year, or when capitalised mid-sentence,
+# so "may I see ..." or "march" as a verb doesn't filter by date
+MONTH_PREPOSITIONS = {"in", "during", "for", "of", "since", "from", "until", "till", "through", "throughout",
+                      "before", "after", "by"}
+
+PERIOD_PHRASES = ("today", "yesterday", "this week", "last week", "this month", "last month",
+                  "this year", "last year", "past year")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_CASED_TOKEN = re.compile(r"[A-Za-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens; punctuation only separates words (so 'R-410A' is 'r', '410a')."""
+    return _TOKEN.findall(text.lower())
+
+
+def factor_items() -> Iterable[str]:
+    """Item names from the calculators' emission factor tables (as stored in Description)."""
+    return get_emission_factors().items()
+
+
+@dataclass(frozen=True)
+class ChatQuery:
+    """A parsed question: what to answer and which ledger rows it is about."""
+    intent: str
+    filters: FilterContext = field(default_factory=FilterContext)
+    scopes: Tuple[str, ...] = ()
+    sources: Tuple[str, ...] = ()
+    items: Tuple[str, ...] = ()
+    dimension: str = "SourceTable"
+    limit: int = DEFAULT_TOP_N
+    requested: int = 0  # Count asked for when it was above MAX_TOP_N and clamped to ``limit``
+    grain: str = "month"
+    period: str = ""  # Date range in words, e.g. "in March 2025"
+
+    @property
+    def filtered(self) -> bool:
+        return bool(self.filters.events or self.filters.start or self.scopes or self.sources or self.items)
+
+    def describe(self) -> str:
+        """The filters in words, e.g. ' for event Tech Fest (Scope 2) in March 2025'."""
+        text = ""
+        if self.filters.events:
+            text += f" for event{'s' if len(self.filters.events) > 1 else ''} {', '.join(self.filters.events)}"
+        details = [scope.replace("Scope", "Scope ") for scope in self.scopes] + list(self.sources) + list(self.items)
+        if details:
+            text += f" ({', '.join(details)})"
+        if self.period:
+            text += f" {self.period}"
+        return text
+
+    def where(self) -> Tuple[str, List]:
+        """Conditions on MasterEmissions besides the event/date filter context."""
+        clauses, params = [], []
+        for column, values in (("Category", self.scopes), ("SourceTable", self.sources), ("Description", self.items)):
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        return " AND ".join(clauses), params
+
+
+class IntentRouter:
+    """Word-level trie over every intent keyword and entity name; a question is parsed in one left-to-right pass.
+
+    At each position the longest phrase in the trie wins, so 'scope 2' beats 'scope' and an event
+    called 'Tech Fest 2025' beats the bare year.
+    """
+
+    _END = ""  # Trie key holding the matches of the phrase that ends at a node
+
+    def __init__(self, events: Iterable[str] = (), today: Optional[date] = None):
+        self.today = today
+        self.trie: Dict[str, dict] = {}
+        for phrase, (intent, slot) in INTENT_PHRASES.items():
+            self._add(phrase, ("intent", (intent, slot)))
+        for phrase, dimension in DIMENSION_PHRASES.items():
+            self._add(phrase, ("dimension", dimension))
+        for scope, phrases in SCOPE_PHRASES.items():
+            for phrase in phrases:
+                self._add(phrase, ("scope", scope))
+        for phrases, sources in SOURCE_PHRASES.items():
+            for phrase in phrases:
+                self._add(phrase, ("source", sources))
+        for number, month in enumerate(MONTHS, start=1):
+            self._add(month, ("month", number))
+            self._add(month[:3], ("month", number))
+        for phrase in PERIOD_PHRASES:
+            self._add(phrase, ("period", phrase))
+        for item in factor_items():
+            self._add(item, ("item", item))
+        for event in events:
+            self._add(event, ("event", event))
+
+    def _add(self, phrase: str, match: tuple):
+        tokens = tokenize(phrase)
+        if not tokens:
+            return
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(self._END, match)  # First registration of a phrase wins
+
+    @staticmethod
+    def _names_month(text: str, spans: List[Tuple[int, int]], tokens: List[str], i: int, length: int) -> bool:
+        """Whether the month word at tokens[i:i + length] is used as a date."""
+        if i > 0 and tokens[i - 1] in MONTH_PREPOSITIONS:
+            return True
+        following = tokens[i + length] if i + length < len(tokens) else ""
+        if following.isdigit() and 1900 <= int(following) <= 2100:
+            return True
+        if not spans:
+            return False  # Case information unavailable
+        start = spans[i][0]
+        sentence_start = i == 0 or text[:start].rstrip()[-1:] in (".", "!", "?")
+        return text[start].isupper() and not sentence_start
+
+    def scan(self, text: str) -> List[tuple]:
+        """(kind, value) for every phrase found, longest match first at each position; bare numbers too."""
+        tokens, found, i = tokenize(text), [], 0
+        spans = [m.span() for m in _CASED_TOKEN.finditer(text)]
+        if len(spans) != len(tokens):
+            spans = []  # Non-ASCII case folding changed the tokens
+        while i < len(tokens):
+            node, match, length = self.trie, None, 0
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if self._END in node:
+                    match, length = node[self._END], j - i + 1
+            if match:
+                if match[0] != "month" or self._names_month(text, spans, tokens, i, length):
+                    found.append(match)
+                i += length
+                continue
+            if tokens[i].isdigit():
+                found.append(("number", int(tokens[i])))
+            i += 1
+        return found
+
+    def parse(self, text: str) -> ChatQuery:
+        """Turn a question into a ChatQuery (intent 'fallback' when nothing was recognised)."""
+        intents, grain, dimension = [], None, None
+        events, scopes, sources, items, numbers = [], [], [], [], []
+        month, period = None, None
+        for kind, value in self.scan(text):
+            if kind == "intent":
+                intents.append(value[0])
+                grain = value[1] or grain
+            elif kind == "dimension":
+                dimension = dimension or value[0]
+                sources.extend(value[1])
+            elif kind == "scope":
+                scopes.append(value)
+            elif kind == "source":
+                sources.extend(value)
+            elif kind == "item":
+                items.append(value)
+            elif kind == "event":
+                events.append(value)
+            elif kind == "month":
+                month = value
+            elif kind == "period":
+                period = value
+            elif kind == "number":
+                numbers.append(value)
+
+        years = [n for n in numbers if 1900 <= n <= 2100]
+        counts = [n for n in numbers if n > 0 and n not in years]
+        start, end, label = self._date_range(month, years[0] if years else None, period)
+        query = ChatQuery(
+            intent="fallback",
+            filters=FilterContext(events=tuple(dict.fromkeys(events)), start=start, end=end),
+            scopes=tuple(dict.fromkeys(scopes)),
+            sources=tuple(dict.fromkeys(sources)),
+            items=tuple(dict.fromkeys(items)),
+            dimension=dimension or "SourceTable",
+            limit=min(counts[0], MAX_TOP_N) if counts else DEFAULT_TOP_N,
+            requested=counts[0] if counts and counts[0] > MAX_TOP_N else 0,
+            grain=grain or "month",
+            period=label,
+        )
+
+        # Most specific intent wins; entities alone ask for a total
+        if "method" in intents:
+            return replace(query, intent="explain")
+        if "breakdown" in intents and "scopes" in intents and not query.scopes:
+            return replace(query, intent="scopes")
+        for intent in ("tips", "top", "trend", "breakdown", "total"):
+            if intent in intents:
+                return replace(query, intent=intent)
+        if "scopes" in intents:
+            return replace(query, intent="total" if query.scopes else "scopes")
+        if query.filtered:
+            return replace(query, intent="total")
+        if "explain" in intents:
+            return replace(query, intent="explain")
+        return query
+
+    def _date_range(self, month: Optional[int], year: Optional[int],
+                    period: Optional[str]) -> Tuple[Optional[date], Optional[date], str]:
+        """Inclusive start/end dates and a label for the period named in a question."""
+        today = self.today or local_today()
+        if month:
+            # A bare month is the latest one that has started
+            year = year or (today.year if month <= today.month else today.year - 1)
+            start = date(year, month, 1)
+            end = (date(year + month // 12, month % 12 + 1, 1)) - timedelta(days=1)
+            return start, end, start.strftime("in %B %Y")
+        if year:
+            return date(year, 1, 1), date(year, 12, 31), f"in {year}"
+        if period == "today":
+            return today, today, "today"
+        if period == "yesterday":
+            day = today - timedelta(days=1)
+            return day, day, "yesterday"
+        if period in ("this week", "last week"):
+            start = today - timedelta(days=today.weekday())
+            if period == "last week":
+                return start - timedelta(days=7), start - timedelta(days=1), period
+            return start, today, period
+        if period == "this month":
+            return today.replace(day=1), today, period
+        if period == "last month":
+            end = today.replace(day=1) - timedelta(days=1)
+            return end.replace(day=1), end, period
+        if period == "this year":
+            return date(today.year, 1, 1), today, period
+        if period == "last year":
+            return date(today.year - 1, 1, 1), date(today.year - 1, 12, 31), period
+        if period == "past year":
+            return today - timedelta(days=365), today, "over the past year"
+        return None, None, ""
+
+
+class IntentRouterProvider:
+    """Compiled router of one database; event names are re-read when the database changes and the
+    trie is recompiled only when they differ."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.data_version = None
+        self.events: Tuple[str, ...] = ()
+        self._router = None
+        self._lock = threading.Lock()
+
+    def router(self) -> IntentRouter:
+        version = query_cache.data_version(self.db_path)
+        with self._lock:
+            if self._router is not None and version == self.data_version:
+                return self._router
+        events = tuple(row[0] for row in query_cache.query("SELECT name FROM Events", (), self.db_path)[1])
+        with self._lock:
+            if self._router is None or events != self.events:
+                self._router, self.events = IntentRouter(events), events
+            self.data_version = version
+            return self._router
+
+
+registry.register("intent_router", IntentRouterProvider, per_database=True,
+                  health=lambda provider: provider.router().parse("total").intent == "total")
+
+
+def get_intent_router(db_path: Optional[str] = None) -> IntentRouter:
+    """Router compiled with the current event names."""
+    return registry.get("intent_router", db_path or get_db_path()).router()
+
+
+# 📊 Parameterized answers (indexed SQL on MasterEmissions, cached per SQL, params and data version)
+def query_total(query: ChatQuery) -> Tuple[float, int]:
+    where, params = query.where()
+    result = aggregate("MasterEmissions", {}, {"Emission": "SUM(Emission)", "Records": "COUNT(*)"},
+                       where, params, filters=query.filters)
+    return float(result["Emission"].iloc[0] or 0), int(result["Records"].iloc[0])
+
+
+def query_top(query: ChatQuery) -> pd.DataFrame:
+    where, params = query.where()
+    ranked = aggregate("MasterEmissions", {"Name": query.dimension}, {"Emission": "SUM(Emission)"},
+                       where, params, order_by="2 DESC", filters=query.filters)
+    return ranked.head(query.limit)
+
+
+def query_breakdown(query: ChatQuery, column: str) -> pd.DataFrame:
+    where, params = query.where()
+    return aggregate("MasterEmissions", {"Name": column}, {"Emission": "SUM(Emission)"},
+                     where, params, order_by="2 DESC", filters=query.filters)
+
+
+def query_trend(query: ChatQuery) -> pd.DataFrame:
+    where, params = query.where()
+    return time_buckets("MasterEmissions", query.grain, where=where, params=params, filters=query.filters)
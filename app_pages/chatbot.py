@@ -2,81 +2,163 @@ import streamlit as st
 import random
 import re
 import sqlite3
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import replace
+from typing import Dict, Optional
+import pandas as pd
+from common import db_pool, get_db_path, query_cache
+from resources import registry
+from visualizations.filters import DISPLAY_TIMEZONE
+from visualizations.time_buckets import bucket_starts, slice_seconds
+from app_pages.chat_intents import get_intent_router, query_breakdown, query_top, query_total, query_trend
+from app_pages.tips_retrieval import get_tips_index
+from app_pages.chat_history import PAGE_SIZE, ChatHistory
+from app_pages.fragments import LATENCY_STATE_KEY, measure
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 # -------------------------------
-# 1. Real Data Integration: Load Emission Data from Database
+# 1. Real Data Integration: Shared Emission Snapshot
 # -------------------------------
-def load_emission_data():
-    """
-    Connects to your SQLite database and fetches carbon emissions data.
-    
-    This function aggregates data from the MasterEmissions table:
-      - Total emissions as the SUM of all Emission values.
-      - Breakdown into Scope 1, Scope 2, and Scope 3 (assuming these are stored under Category).
-      - Category breakdown (grouped by SourceTable as a proxy).
-      - Monthly aggregated emissions.
-      - Reduction tips (if available from a reduction_tips_table, else default tips).
-    
-    Adjust the queries and table names as needed for your actual schema.
-    """
-    conn = sqlite3.connect("data/emissions.db")
-    cursor = conn.cursor()
-    
-    # Total Emissions
-    cursor.execute("SELECT SUM(Emission) FROM MasterEmissions")
-    total_row = cursor.fetchone()
-    total = total_row[0] if total_row and total_row[0] is not None else 0
-
-    # Scope Breakdown: Assume Category field holds 'Scope 1', 'Scope 2', or 'Scope 3'
-    scopes = {}
-    for scope in ["Scope 1", "Scope 2", "Scope 3"]:
-        cursor.execute("SELECT SUM(Emission) FROM MasterEmissions WHERE Category=?", (scope,))
-        row = cursor.fetchone()
-        scopes[scope] = row[0] if row and row[0] is not None else 0
-
-    # Category Breakdown: Group by SourceTable as an example (adjust as needed)
-    cursor.execute("SELECT SourceTable, SUM(Emission) FROM MasterEmissions GROUP BY SourceTable")
-    rows = cursor.fetchall()
-    categories = {row[0]: row[1] for row in rows if row[0] is not None}
-
-    # Monthly Data: Group using SQLite's strftime function
-    cursor.execute("SELECT strftime('%m', Timestamp) as month, SUM(Emission) FROM MasterEmissions GROUP BY month")
-    rows = cursor.fetchall()
-    monthly_data = {}
-    month_lookup = {
-      '01': 'Jan', '02': 'Feb', '03': 'Mar', '04': 'Apr', '05': 'May', '06': 'Jun',
-      '07': 'Jul', '08': 'Aug', '09': 'Sep', '10': 'Oct', '11': 'Nov', '12': 'Dec'
-    }
-    for row in rows:
-        month = month_lookup.get(row[0], row[0])
-        monthly_data[month] = row[1] if row[1] is not None else 0
-
-    # Reduction Tips
+SCOPES = ("Scope1", "Scope2", "Scope3")  # Category values written by the ledger triggers
+TREND_POINTS = 12  # Most recent buckets quoted in a trend answer
+
+DEFAULT_REDUCTION_TIPS = [
+    "Use public transportation instead of driving alone",
+    "Switch to LED light bulbs",
+    "Reduce meat consumption, especially beef",
+    "Buy locally produced goods when possible",
+    "Use a programmable thermostat to reduce energy use",
+    "Properly insulate your home",
+    "Reduce, reuse, recycle in that order",
+    "Consider offsetting your carbon footprint through verified programs"
+]
+
+
+def load_reduction_tips(conn):
+    """Tips from reduction_tips_table, or the defaults when there are none."""
     try:
-        cursor.execute("SELECT tip FROM reduction_tips_table")
-        tips_rows = cursor.fetchall()
-        reduction_tips = [r[0] for r in tips_rows]
+        tips = [row[0] for row in conn.execute("SELECT tip FROM reduction_tips_table WHERE kind = 'tip'")]
     except sqlite3.Error:
-        reduction_tips = []
-    if not reduction_tips:
-        reduction_tips = [
-            "Use public transportation instead of driving alone",
-            "Switch to LED light bulbs",
-            "Reduce meat consumption, especially beef",
-            "Buy locally produced goods when possible",
-            "Use a programmable thermostat to reduce energy use",
-            "Properly insulate your home",
-            "Reduce, reuse, recycle in that order",
-            "Consider offsetting your carbon footprint through verified programs"
-        ]
-    conn.close()
-    return {
-        "total": total,
-        "scopes": scopes,
-        "categories": categories,
-        "monthly_data": monthly_data,
-        "reduction_tips": reduction_tips
-    }
+        tips = []
+    return tips or list(DEFAULT_REDUCTION_TIPS)
+
+
+class EmissionSnapshotProvider:
+    """Chatbot figures for one database, built from MasterEmissions and shared by every session.
+
+    A single grouped query folds the ledger into (source, scope, time slice) totals; later refreshes
+    read only rows with a higher id. Nothing is queried while ``PRAGMA data_version`` is unchanged.
+    """
+
+    def __init__(self, db_path: str, tz: Optional[str] = None):
+        self.db_path = db_path
+        self.tz = tz or DISPLAY_TIMEZONE
+        self.slice = slice_seconds(self.tz)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.last_id = 0
+        self.data_version = None
+        self.slices: Dict[tuple, float] = defaultdict(float)  # (SourceTable, Category, Epoch slice) -> kg CO₂
+        self._snapshot = self._build(list(DEFAULT_REDUCTION_TIPS))
+
+    def snapshot(self) -> Dict[str, object]:
+        """Current totals; the returned dict is shared, so treat it as read-only."""
+        with self._lock:
+            version = query_cache.data_version(self.db_path)
+            if version == self.data_version:
+                return self._snapshot
+
+            try:
+                with db_pool(self.db_path).connection() as conn:
+                    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'MasterEmissions'").fetchone()
+                    if seq is None or seq[0] < self.last_id:
+                        # Ledger was recreated; start over
+                        self._reset()
+                    if self.last_id:
+                        rows = conn.execute(
+                            "SELECT SourceTable, Category, Epoch / ?, SUM(Emission), MAX(id) FROM MasterEmissions "
+                            "WHERE id > ? GROUP BY 1, 2, 3",
+                            (self.slice, self.last_id),
+                        ).fetchall()
+                    else:
+                        # First build: pre-group in idx_masteremissions_epoch_totals order, so only
+                        # one row per distinct timestamp reaches the sort
+                        rows = conn.execute(
+                            "SELECT SourceTable, Category, Epoch / ?, SUM(Emission), MAX(LastId) FROM ("
+                            "  SELECT Epoch, SourceTable, Category, SUM(Emission) AS Emission, MAX(id) AS LastId"
+                            "  FROM MasterEmissions GROUP BY Epoch, SourceTable, Category"
+                            ") GROUP BY 1, 2, 3",
+                            (self.slice,),
+                        ).fetchall()
+                    tips = load_reduction_tips(conn)
+            except sqlite3.Error as e:
+                logging.error(f"Error refreshing chatbot data: {e}")
+                return self._snapshot
+
+            for source, category, slice_, emission, last_id in rows:
+                self.slices[(source, category, slice_)] += emission or 0
+                self.last_id = max(self.last_id, last_id)
+            self._snapshot = self._build(tips)
+            self.data_version = version
+            return self._snapshot
+
+    def _build(self, tips) -> Dict[str, object]:
+        """Roll the slice totals up into the figures the response generator uses."""
+        scopes = {scope: 0.0 for scope in SCOPES}
+        categories, by_slice = defaultdict(float), defaultdict(float)
+        for (source, category, slice_), emission in self.slices.items():
+            if category is not None:
+                scopes[category] = scopes.get(category, 0.0) + emission
+            if source is not None:
+                categories[source] += emission
+            if slice_ is not None:
+                by_slice[slice_] += emission
+
+        # Calendar months (each year separately) in the display timezone
+        monthly_data = {}
+        if by_slice:
+            months = bucket_starts(pd.Series(list(by_slice)) * self.slice, "month", self.tz)
+            totals = pd.Series(list(by_slice.values())).groupby(months.values).sum()
+            monthly_data = {month.strftime("%b %Y"): emission for month, emission in totals.items()}
+
+        return {
+            "total": sum(self.slices.values()),
+            "scopes": scopes,
+            "categories": dict(categories),
+            "monthly_data": monthly_data,
+            "reduction_tips": tips,
+        }
+
+
+def format_bucket(bucket, grain):
+    """Label of a time bucket at the given grain, e.g. 'Mar 2025' or 'Q1 2025'."""
+    if grain == "quarter":
+        return f"Q{bucket.quarter} {bucket.year}"
+    return bucket.strftime({"hour": "%d %b %Y %H:00", "day": "%d %b %Y", "week": "week of %d %b %Y",
+                            "month": "%b %Y", "year": "%Y"}[grain])
+
+
+registry.register("chat_snapshot", EmissionSnapshotProvider, per_database=True,
+                  health=lambda provider: isinstance(provider.snapshot(), dict))
+
+
+def load_emission_data(db_path: Optional[str] = None) -> Dict[str, object]:
+    """
+    Current emission snapshot for the chatbot:
+      - Total emissions and the Scope1/Scope2/Scope3 breakdown (as stored in Category).
+      - Category breakdown (grouped by SourceTable).
+      - Monthly emissions (calendar months, so each year's January is separate).
+      - Reduction tips (from reduction_tips_table, else default tips).
+
+    One provider per database serves every session and only reads ledger rows added since its last refresh.
+    """
+    return registry.get("chat_snapshot", db_path or get_db_path()).snapshot()
 
 # -------------------------------
 # 2. EmissionResponseGenerator Class (Enhanced Response Logic)
@@ -87,37 +169,47 @@ class EmissionResponseGenerator:
 
     def generate_response(self, user_input, conversation_context=None):
         """Generate a rich, context-aware response based on user input."""
-        input_lower = user_input.lower()
-
-        # Check for total emissions query with detailed context.
-        if ("total" in input_lower or "footprint" in input_lower) and "emission" in input_lower:
-            return self._generate_total_emissions_response()
+        query = get_intent_router().parse(user_input)
 
-        # Scope breakdown query.
-        elif "scope" in input_lower:
-            return self._generate_scope_breakdown_response(user_input)
-
-        # Category breakdown query.
-        elif "category" in input_lower or "breakdown" in input_lower:
-            return self._generate_category_analysis_response()
-
-        # Reduction tips query.
-        elif "reduce" in input_lower or "tip" in input_lower:
-            return self._generate_reduction_tips_response()
+        if query.intent == "tips":
+            return self._generate_reduction_tips_response(user_input)
+        elif query.intent == "explain":
+            return self._generate_explanation_response(user_input)
+        elif query.intent == "fallback":
+            return self._generate_fallback_response()
 
-        # Explanation query.
-        elif "what is" in input_lower or "explain" in input_lower:
-            return self._generate_explanation_response()
+        # Questions about a single scope, or about everything, come straight from the snapshot
+        only_scope = len(query.scopes) == 1 and query.filtered and not replace(query, scopes=()).filtered
+        if query.intent in ("total", "scopes") and only_scope:
+            return self._generate_scope_breakdown_response(query.scopes[0])
+        if not query.filtered:
+            if query.intent == "total":
+                return self._generate_total_emissions_response()
+            elif query.intent == "scopes":
+                return self._generate_scope_breakdown_response(None)
+            elif query.intent == "breakdown":
+                return self._generate_category_analysis_response()
+            elif query.intent == "trend" and query.grain == "month":
+                return self._generate_monthly_trend_response()
 
-        # Fallback response for unrecognized input.
-        else:
-            return self._generate_fallback_response()
+        # Everything else is a parameterized, indexed query on the ledger
+        try:
+            if query.intent == "top":
+                return self._generate_top_response(query)
+            elif query.intent == "trend":
+                return self._generate_trend_response(query)
+            elif query.intent in ("breakdown", "scopes"):
+                return self._generate_filtered_breakdown_response(query)
+            return self._generate_filtered_total_response(query)
+        except sqlite3.Error as e:
+            logging.error(f"Error answering chatbot query {query}: {e}")
+            return "Sorry, I couldn't look that up right now. Please try again in a moment."
 
     def _generate_total_emissions_response(self):
         total = self.data["total"]
-        scope1 = self.data["scopes"].get("Scope 1", 0)
-        scope2 = self.data["scopes"].get("Scope 2", 0)
-        scope3 = self.data["scopes"].get("Scope 3", 0)
+        scope1 = self.data["scopes"].get("Scope1", 0)
+        scope2 = self.data["scopes"].get("Scope2", 0)
+        scope3 = self.data["scopes"].get("Scope3", 0)
         # Assume a benchmark global average (adjust this value as needed)
         average_global = 4000  
         if total < average_global * 0.8:
@@ -134,25 +226,25 @@ class EmissionResponseGenerator:
                     "This detailed breakdown can help you identify which areas to focus on for reductions.")
         return response
 
-    def _generate_scope_breakdown_response(self, user_input):
-        input_lower = user_input.lower()
-        if "1" in input_lower:
-            val = self.data["scopes"].get("Scope 1", "unknown")
+    def _generate_scope_breakdown_response(self, scope):
+        if scope == "Scope1":
+            val = self.data["scopes"].get("Scope1", "unknown")
             response = (f"Scope 1 emissions, which are direct emissions from sources you control (like fuel combustion), "
                         f"are estimated at {val} kg CO₂e.")
             return response
-        elif "2" in input_lower:
-            val = self.data["scopes"].get("Scope 2", "unknown")
+        elif scope == "Scope2":
+            val = self.data["scopes"].get("Scope2", "unknown")
             response = (f"Scope 2 emissions, stemming from indirect energy use like purchased electricity or heat, "
                         f"are estimated at {val} kg CO₂e.")
             return response
-        elif "3" in input_lower:
-            val = self.data["scopes"].get("Scope 3", "unknown")
+        elif scope == "Scope3":
+            val = self.data["scopes"].get("Scope3", "unknown")
             response = (f"Scope 3 emissions, which include transportation, materials, and other indirect sources, "
                         f"are estimated at {val} kg CO₂e.")
             return response
         else:
-            return ("Your emissions are grouped into Scope 1, 2, and 3. Please specify the scope you are interested in, "
+            totals = ", ".join(f"Scope {scope[-1]}: {self.data['scopes'].get(scope, 0)} kg CO₂e" for scope in SCOPES)
+            return (f"Your emissions are grouped into Scope 1, 2, and 3 ({totals}). Ask about one scope for details, "
                     "for example, 'Scope 2 emissions'.")
 
     def _generate_category_analysis_response(self):
@@ -160,13 +252,70 @@ class EmissionResponseGenerator:
         response = f"The emissions are also broken down by category as follows: {breakdown}. This helps pinpoint major emission sources."
         return response
 
-    def _generate_reduction_tips_response(self):
-        tips = random.sample(self.data['reduction_tips'], min(3, len(self.data['reduction_tips'])))
+    def _generate_monthly_trend_response(self):
+        monthly = self.data["monthly_data"]
+        if not monthly:
+            return "There are no recorded emissions yet, so there is no monthly trend to show."
+        recent = list(monthly.items())[-6:]
+        trend = ", ".join([f"{month}: {round(val, 2)} kg CO₂e" for month, val in recent])
+        response = f"Here are your emissions for the most recent months on record: {trend}."
+        if len(recent) > 1 and recent[-2][1]:
+            change = (recent[-1][1] - recent[-2][1]) / recent[-2][1] * 100
+            response += f" That is a {abs(round(change, 1))}% {'increase' if change > 0 else 'decrease'} on the month before."
+        return response
+
+    def _generate_filtered_total_response(self, query):
+        total, records = query_total(query)
+        if not records:
+            return f"I couldn't find any recorded emissions{query.describe()}."
+        return f"Total emissions{query.describe()} are {round(total, 2)} kg CO₂e across {records} records."
+
+    def _generate_top_response(self, query):
+        ranked = query_top(query)
+        if ranked.empty:
+            return f"I couldn't find any recorded emissions{query.describe()}."
+        label = {"SourceTable": "sources", "Event": "events"}.get(query.dimension, "items")
+        ranking = ", ".join(f"{name}: {round(value, 2)} kg CO₂e" for name, value in zip(ranked["Name"], ranked["Emission"]))
+        answer = f"The top {len(ranked)} emission {label}{query.describe()} are: {ranking}."
+        if query.requested:
+            answer += f" (You asked for {query.requested}; I list at most {query.limit}.)"
+        return answer
+
+    def _generate_filtered_breakdown_response(self, query):
+        column = "Category" if query.intent == "scopes" else "SourceTable"
+        breakdown = query_breakdown(query, column)
+        if breakdown.empty:
+            return f"I couldn't find any recorded emissions{query.describe()}."
+        parts = ", ".join(f"{name}: {round(value, 2)} kg CO₂e" for name, value in zip(breakdown["Name"], breakdown["Emission"]))
+        return f"Emissions{query.describe()} break down as follows: {parts}."
+
+    def _generate_trend_response(self, query):
+        trend = query_trend(query)
+        if trend.empty:
+            return f"There are no recorded emissions{query.describe()}, so there is no trend to show."
+        recent = list(zip(trend["Bucket"], trend["Emission"]))[-TREND_POINTS:]
+        points = ", ".join(f"{format_bucket(bucket, query.grain)}: {round(value, 2)} kg CO₂e" for bucket, value in recent)
+        response = f"Here are your emissions by {query.grain}{query.describe()}: {points}."
+        if len(recent) > 1 and recent[-2][1]:
+            change = (recent[-1][1] - recent[-2][1]) / recent[-2][1] * 100
+            response += f" That is a {abs(round(change, 1))}% {'increase' if change > 0 else 'decrease'} on the {query.grain} before."
+        return response
+
+    def _generate_reduction_tips_response(self, user_input=""):
+        # Ranked by similarity to the question and by the user's biggest emission sources
+        tips = [tip for tip, _ in get_tips_index().search(user_input, "tip", profile=self.data["categories"], k=3)]
+        if not tips:
+            tips = random.sample(self.data['reduction_tips'], min(3, len(self.data['reduction_tips'])))
         tips_formatted = "\n".join([f"- {tip}" for tip in tips])
-        response = f"Based on best practices, consider the following actionable tips to reduce your emissions:\n{tips_formatted}"
+        largest = sorted(self.data["categories"], key=self.data["categories"].get, reverse=True)[:2]
+        focus = f" Your largest sources so far are {' and '.join(largest)}." if largest else ""
+        response = f"Based on best practices, consider the following actionable tips to reduce your emissions:{focus}\n{tips_formatted}"
         return response
 
-    def _generate_explanation_response(self):
+    def _generate_explanation_response(self, user_input=""):
+        notes = get_tips_index().search(user_input, "methodology", k=1)
+        if notes and notes[0][1] > 0:
+            return notes[0][0]
         response = ("Carbon emissions refer to the release of carbon dioxide (CO₂) into the atmosphere—primarily "
                     "resulting from burning fossil fuels in vehicles, power plants, and industrial processes. These emissions "
                     "contribute to the greenhouse effect, leading to climate change. By understanding your carbon footprint, "
@@ -175,7 +324,8 @@ class EmissionResponseGenerator:
 
     def _generate_fallback_response(self):
         response = ("I'm sorry, I didn't understand your question. Please ask about your total emissions, scope breakdown "
-                    "(e.g., 'Scope 1'), category breakdown, reduction tips, or for an explanation of carbon emissions.")
+                    "(e.g., 'Scope 1'), category breakdown, monthly trend, top sources (e.g., 'top 5 sources for event X in March'), "
+                    "reduction tips, or for an explanation of carbon emissions.")
         return response
 
 # -------------------------------
@@ -189,37 +339,56 @@ class EmissionChatbotWithContext:
     def get_response(self, user_input, conversation_context=None):
         return self.response_generator.generate_response(user_input, conversation_context)
 
+GREETING = "Hello! I'm your Carbon Emissions Assistant. How can I help?"
+
+
+def _show_earlier_messages(history: ChatHistory):
+    """Older messages one page at a time, plus this session's chat memory and render time."""
+    older = history.count - PAGE_SIZE
+    with st.expander("🕘 Earlier messages", expanded=False):
+        if older > 0:
+            pages = -(-older // PAGE_SIZE)
+            page = st.number_input("Page (1 = most recent)", min_value=1, max_value=pages, value=1, key="chat_history_page")
+            stop = older - (page - 1) * PAGE_SIZE
+            for message in history.messages(stop - PAGE_SIZE, stop):
+                st.markdown(f"**{message['role'].title()}:** {message['content']}")
+        else:
+            st.caption("No earlier messages.")
+        last_render = st.session_state.get(LATENCY_STATE_KEY, {}).get("Chatbot")
+        st.caption(f"{history.count} messages · {len(history.window)} in memory "
+                   f"({history.memory_bytes() / 1024:.1f} KB) · last render {last_render or '–'} ms")
+
+
 def chatbot_ui():
     st.write("Ask me anything about your carbon emissions and how you can reduce them with accurate, data-driven insights.")
-    
-    # Initialize the conversation history
-    if "messages" not in st.session_state:
-        st.session_state.messages = [
-            {"role": "assistant", "content": "Hello! I'm your Carbon Emissions Assistant. How can I help?"}
-        ]
-    
-    # Initialize the chatbot with real data integration
-    if "chatbot" not in st.session_state:
-        data = load_emission_data()
-        st.session_state.chatbot = EmissionChatbotWithContext(data)
-
-    # Display conversation history
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
-
-    # Accept new user input
-    user_input = st.chat_input("Type your question here...")
-    if user_input:
-        st.session_state.messages.append({"role": "user", "content": user_input})
-        with st.chat_message("user"):
-            st.markdown(user_input)
-        
-        # Generate and display a detailed response using real data
-        response = st.session_state.chatbot.get_response(user_input)
-        st.session_state.messages.append({"role": "assistant", "content": response})
-        with st.chat_message("assistant"):
-            st.markdown(response)
+
+    with measure("Chatbot"):
+        # Initialize the conversation history (a bounded window; full transcripts go to ChatTranscripts)
+        if "chat_history" not in st.session_state:
+            st.session_state.chat_history = ChatHistory(st.session_state.get("logged_in_user"))
+        history = st.session_state.chat_history
+
+        # Display the most recent messages only
+        _show_earlier_messages(history)
+        if history.count <= PAGE_SIZE:
+            with st.chat_message("assistant"):
+                st.markdown(GREETING)
+        for message in history.recent(PAGE_SIZE):
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+
+        # Accept new user input
+        user_input = st.chat_input("Type your question here...")
+        if user_input:
+            history.append("user", user_input)
+            with st.chat_message("user"):
+                st.markdown(user_input)
+
+            # Generate and display a detailed response using real data (the shared snapshot, not a per-session copy)
+            response = EmissionChatbotWithContext(load_emission_data()).get_response(user_input)
+            history.append("assistant", response)
+            with st.chat_message("assistant"):
+                st.markdown(response)
 
 # -------------------------------
 # 4. Run the Chatbot Application
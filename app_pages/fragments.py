@@ -0,0 +1,86 @@
+import sqlite3
+import time
+import logging
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Sequence
+import streamlit as st
+from common import query_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Session keys
+LATENCY_STATE_KEY = "rerun_latency_ms"
+NOTICE_STATE_KEY = "calculator_notices"
+
+
+def table_marks(tables: Sequence[str]) -> Dict[str, int]:
+    """Highest rowid per table; the ledger tables are insert-only, so a change means new rows.
+
+    Served from the query cache (pooled connection, keyed by data version), so a rerun without writes costs no query.
+    """
+    if not tables:
+        return {}
+    try:
+        sql = "SELECT " + ", ".join(f"(SELECT MAX(rowid) FROM {t})" for t in tables)
+        _, rows = query_cache.query(sql)
+        return dict(zip(tables, rows[0]))
+    except sqlite3.Error as e:
+        logging.error(f"Error reading table marks: {e}")
+        return {}
+
+
+@contextmanager
+def measure(name: str):
+    """Record how long one (fragment) rerun of ``name`` took."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = round((time.perf_counter() - start) * 1000, 1)
+        st.session_state.setdefault(LATENCY_STATE_KEY, {})[name] = elapsed
+        logging.info(f"Rerun of {name}: {elapsed} ms")
+
+
+def view_fragment(name: str):
+    """Run an analysis view as a fragment: its own widgets rerun only the view."""
+    def decorator(render):
+        @st.fragment
+        @wraps(render)
+        def run(*args, **kwargs):
+            with measure(name):
+                return render(*args, **kwargs)
+        return run
+    return decorator
+
+
+def calculator_fragment(name: str, writes: Sequence[str], reads: Sequence[str]):
+    """Run a calculator as a fragment.
+
+    Typing into a calculator reruns only the calculator. After a save, the page reruns only
+    when a table in ``writes`` gained rows and a view on the page (``reads``) depends on it.
+    """
+    watched = [t for t in writes if t in reads]
+
+    def decorator(render):
+        @st.fragment
+        @wraps(render)
+        def run(*args, **kwargs):
+            notice = st.session_state.get(NOTICE_STATE_KEY, {}).pop(name, None)
+            if notice:
+                st.success(notice)
+
+            before = table_marks(watched)
+            with measure(name):
+                render(*args, **kwargs)
+            after = table_marks(watched)
+            changed = [t for t in watched if after.get(t) != before.get(t)]
+            if changed:
+                logging.info(f"{name} wrote to {changed}; refreshing dependent views")
+                st.session_state.setdefault(NOTICE_STATE_KEY, {})[name] = (
+                    f"Saved. Analysis refreshed for {', '.join(changed)}."
+                )
+                st.rerun(scope="app")
+        return run
+    return decorator
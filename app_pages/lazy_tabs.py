@@ -0,0 +1,50 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Sequence
+import streamlit as st
+from tenancy import current_org, use_org
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Background pool that warms the data of tabs the user hasn't opened yet
+PREFETCH_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tab-prefetch")
+PREFETCH_MEMORY = 256  # Remembered (tab, token, org) submissions
+_submitted: Dict[Hashable, object] = {}
+
+
+def lazy_tabs(labels: Sequence[str], key: str) -> str:
+    """Tab strip that returns the active tab, so only that view is computed on each run.
+
+    The selection is kept in session state, so returning to the page reopens the last tab.
+    """
+    remembered = st.session_state.get(f"{key}_active")
+    index = list(labels).index(remembered) if remembered in labels else 0
+    active = st.radio("View", labels, index=index, horizontal=True, key=key, label_visibility="collapsed")
+    st.session_state[f"{key}_active"] = active  # Survives page switches, unlike widget state
+    return active
+
+
+def _run_prefetch(label: str, task: Callable[[], None], org: str):
+    try:
+        with use_org(org):  # Pool threads have no session, so they get the submitting session's shard
+            task()
+        logging.info(f"Prefetched tab: {label}")
+    except Exception as e:
+        logging.warning(f"Prefetch of tab {label} failed: {e}")
+
+
+def prefetch_tabs(tasks: Dict[str, Callable[[], None]], active: str, token: Hashable = None):
+    """Warm every inactive tab in the background once per ``token`` (e.g. the active filters).
+
+    Called after the active view has rendered, so prefetching runs while the page sits idle.
+    Tasks should only fill shared caches (query results, routing tables); they must not draw.
+    """
+    if len(_submitted) > PREFETCH_MEMORY:
+        _submitted.clear()
+    org = current_org()
+    for label, task in tasks.items():
+        key = (label, token, org)
+        if label == active or key in _submitted:
+            continue
+        _submitted[key] = PREFETCH_POOL.submit(_run_prefetch, label, task, org)
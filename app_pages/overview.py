@@ -3,6 +3,11 @@ import streamlit as st
 from app_pages.scope1 import scope1_page
 from app_pages.scope2 import scope2_page
 from app_pages.scope3 import scope3_page
+from common import get_db_path
+from session_store import persist_key
+
+# The open calculator page is restored on any replica
+persist_key("current_page")
 
 def overview_page():
     # Check if user is logged in
@@ -72,7 +77,7 @@ def overview_page():
 
     event_name =  st.text_input("Enter event name",key="event_name")
     if st.button("Save"):
-        with sqlite3.connect("data/emissions.db") as conn:
+        with sqlite3.connect(get_db_path()) as conn:
                 c = conn.cursor()
                 c.execute("INSERT INTO Events (name) VALUES (?)",(event_name,))
                 conn.commit()   
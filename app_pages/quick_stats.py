@@ -0,0 +1,98 @@
+import sqlite3
+import logging
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+import streamlit as st
+from common import cached_query, db_pool, get_db_path
+from visualizations.filters import local_today
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PERIOD_DAYS = 30  # Footprint window, compared with the window before it
+
+
+@dataclass(frozen=True)
+class QuickStats:
+    """Sidebar figures, in kg CO₂e."""
+    period_total: float  # Last PERIOD_DAYS days, today included
+    previous_total: float  # The PERIOD_DAYS days before that
+    year_total: float
+    target: Optional[float]  # Annual budget from EmissionTargets
+    year_elapsed: float  # Share of the year gone by
+
+    @property
+    def delta_pct(self) -> Optional[float]:
+        """Change against the previous period, in percent."""
+        if not self.previous_total:
+            return None
+        return (self.period_total - self.previous_total) / self.previous_total * 100
+
+    @property
+    def progress_pct(self) -> Optional[float]:
+        """Share of the annual target already emitted, in percent."""
+        return self.year_total / self.target * 100 if self.target else None
+
+    @property
+    def pace_pts(self) -> Optional[float]:
+        """Progress minus the share of the year elapsed, in percentage points (above zero is over pace)."""
+        return self.progress_pct - self.year_elapsed * 100 if self.target else None
+
+
+def quick_stats(today: Optional[date] = None) -> QuickStats:
+    """Footprint and target progress from the LedgerDaily rollup and EmissionTargets.
+
+    Periods are local days in the display timezone, the days LedgerDaily is keyed on. One small
+    query over at most a year of daily rows; its result is cached per data version, so reruns
+    with unchanged data only check ``PRAGMA data_version``.
+    """
+    today = today or local_today()
+    period_start = today - timedelta(days=PERIOD_DAYS - 1)
+    previous_start = period_start - timedelta(days=PERIOD_DAYS)
+    year_start = date(today.year, 1, 1)
+    try:
+        row = cached_query(
+            "SELECT SUM(CASE WHEN Day >= ? THEN Total END), SUM(CASE WHEN Day >= ? AND Day < ? THEN Total END), "
+            "SUM(CASE WHEN Day >= ? THEN Total END), (SELECT Target FROM EmissionTargets WHERE Year = ?) "
+            "FROM LedgerDaily WHERE Day >= ? AND Day <= ?",
+            (period_start.isoformat(), previous_start.isoformat(), period_start.isoformat(), year_start.isoformat(),
+             today.year, min(previous_start, year_start).isoformat(), today.isoformat()),
+        )[0]
+    except sqlite3.Error as e:
+        logging.error(f"Error reading quick stats: {e}")
+        row = (None, None, None, None)
+    period_total, previous_total, year_total, target = row
+    days_in_year = (date(today.year + 1, 1, 1) - year_start).days
+    return QuickStats(period_total or 0.0, previous_total or 0.0, year_total or 0.0, target,
+                      ((today - year_start).days + 1) / days_in_year)
+
+
+def set_annual_target(year: int, target: float, db_path: Optional[str] = None) -> bool:
+    """Store the emission budget (kg CO₂e) for a year."""
+    try:
+        with db_pool(db_path or get_db_path()).connection() as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO EmissionTargets (Year, Target) VALUES (?, ?)", (year, target))
+        return True
+    except sqlite3.Error as e:
+        st.error(f"Database error: {e}")
+        logging.error(f"Error saving emission target: {e}")
+        return False
+
+
+# 📊 Quick Stats
+def show_quick_stats():
+    """The two sidebar metrics; lower emissions show as green deltas."""
+    stats = quick_stats()
+    col1, col2 = st.sidebar.columns(2)
+    with col1:
+        st.metric(label="Carbon Footprint", value=f"{stats.period_total / 1000:,.1f} t",
+                  delta=None if stats.delta_pct is None else f"{stats.delta_pct:+.1f}%", delta_color="inverse",
+                  help=f"Last {PERIOD_DAYS} days, compared with the {PERIOD_DAYS} days before")
+    with col2:
+        if stats.target:
+            st.metric(label="Target Progress", value=f"{stats.progress_pct:.0f}%",
+                      delta=f"{stats.pace_pts:+.0f} pts vs pace", delta_color="inverse",
+                      help=f"{stats.year_total / 1000:,.1f} t of this year's {stats.target / 1000:,.1f} t target")
+        else:
+            st.metric(label="Target Progress", value="–", help="Set this year's target on the Profile page")
@@ -1,22 +1,25 @@
-import sqlite3
 import streamlit as st
 from modules.sc1_emissions import display_scope1
 from visualizations.scope_1Visual import display
+from visualizations.filters import filter_bar
 import logging
+from common import cached_query
+from app_pages.fragments import calculator_fragment, view_fragment
 
 
 
 def get_latest_event():
     """Fetch the latest event name from the Events table."""
-    conn = sqlite3.connect("data/emissions.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM Events ORDER BY id DESC LIMIT 1")
-    event = cursor.fetchone()
-    return event[0] if event else None
+    rows = cached_query("SELECT name FROM Events ORDER BY id DESC LIMIT 1")
+    return rows[0][0] if rows else None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# 🧩 Page fragments and the tables they read/write
+scope1_calculator = calculator_fragment("Scope 1 calculator", writes=["Scope1"], reads=["Scope1"])(display_scope1)
+scope1_analysis = view_fragment("Scope 1 analysis")(display)
+
 def scope1_page():
     # Check if user is logged in
     if "logged_in_user" not in st.session_state:
@@ -29,11 +32,11 @@ def scope1_page():
     try:
         event = get_latest_event()
         # Display Scope 1 calculator
-        display_scope1(event)
+        scope1_calculator(event)
 
         # Display Scope 1 visualizations
         st.header("Scope 1 Emission Analysis")
-        display()
+        scope1_analysis(filter_bar("Scope1"))
     except Exception as e:
         st.error(f"An error occurred: {e}")
         logging.error(f"Error in scope1_page: {e}")
\ No newline at end of file
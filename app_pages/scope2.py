@@ -1,19 +1,23 @@
-import sqlite3
 import streamlit as st
 from modules.electricity import show_electricity_hvac_calculator
 from visualizations.electricity_visualization import electricity_visual
+from visualizations.filters import filter_bar
 import logging
+from common import cached_query
+from app_pages.fragments import calculator_fragment, view_fragment
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 def get_latest_event():
     """Fetch the latest event name from the Events table."""
-    conn = sqlite3.connect("data/emissions.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM Events ORDER BY id DESC LIMIT 1")
-    event = cursor.fetchone()
-    return event[0] if event else None
+    rows = cached_query("SELECT name FROM Events ORDER BY id DESC LIMIT 1")
+    return rows[0][0] if rows else None
+
+# 🧩 Page fragments and the tables they read/write
+SCOPE2_TABLES = ["ElectricityEmissions", "HVACEmissions"]
+scope2_calculator = calculator_fragment("Scope 2 calculator", writes=SCOPE2_TABLES, reads=SCOPE2_TABLES)(show_electricity_hvac_calculator)
+scope2_analysis = view_fragment("Scope 2 analysis")(electricity_visual)
 
 def scope2_page():
     # Check if user is logged in
@@ -28,11 +32,11 @@ def scope2_page():
         # Display Scope 2 calculator
         st.subheader("Scope 2 Calculator")
         event = get_latest_event()
-        show_electricity_hvac_calculator(event)
+        scope2_calculator(event)
 
         # Display Scope 2 visualizations
         st.header("Scope 2 Emission Analysis")
-        electricity_visual()
+        scope2_analysis(filter_bar("Scope2"))
     except Exception as e:
         st.error(f"An error occurred: {e}")
         logging.error(f"Error in scope2_page: {e}")
\ No newline at end of file
@@ -2,26 +2,68 @@ import streamlit as st
 from modules.material import show_material_calculator
 from modules.transport import show_transport_calculator
 from modules.food import show_food_calculator
-from visualizations.material_visualization import visualize
-from visualizations.transportation_visualization import transport_visual
-from visualizations.food_visualization import food_visual
+from visualizations.material_visualization import fetch_material_data, visualize
+from visualizations.transportation_visualization import prefetch_transport_data, transport_visual
+from visualizations.food_visualization import food_visual, prefetch_food_data
 from visualizations.logistics import logist_vis
-import sqlite3
-import pandas as pd
-import plotly.express as px
-from streamlit_extras.dataframe_explorer import dataframe_explorer
+from modules.routing import get_routing_engine
+from visualizations.aggregations import aggregate
+from visualizations.data_grid import data_grid
+from visualizations.filters import filter_bar
 import logging
+from common import cached_query, get_db_path, query_cache
+from app_pages.fragments import calculator_fragment, view_fragment
+from app_pages.lazy_tabs import lazy_tabs, prefetch_tabs
+from visualizations import charts
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 def get_latest_event():
     """Fetch the latest event name from the Events table."""
-    conn = sqlite3.connect("data/emissions.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM Events ORDER BY id DESC LIMIT 1")
-    event = cursor.fetchone()
-    return event[0] if event else None
+    rows = cached_query("SELECT name FROM Events ORDER BY id DESC LIMIT 1")
+    return rows[0][0] if rows else None
+
+
+def fetch_materials(filters):
+    """Per-event Materials totals for the active filters."""
+    return aggregate("Materials", {"event": "event"}, {"Emission": "SUM(Emission)"}, filters=filters)
+
+
+def prefetch_materials(filters):
+    """Warm the query cache for the Materials tab (default category)."""
+    fetch_materials(filters)
+    fetch_material_data("Trophies", filters)
+
+
+def materials_analysis(filters):
+    """Materials table, per-event breakdown and per-category analytics."""
+    by_event = fetch_materials(filters)
+
+    st.subheader("Data:")
+    data_grid("Materials", {
+        "id": "id", "event": "event", "Category": "Category", "Weight": "Weight",
+        "Quantity": "Quantity", "Emission": "Emission", "Timestamp": "Timestamp",
+    }, key="materials_grid", filters=filters)
+
+    fig = charts.pie(by_event, names='event', values="Emission", title="Emissions Breakdown", hole=0.3)
+    charts.plot(fig)
+
+    category = st.selectbox("Select a category", ["Trophies", "Banners", "Momentoes", "Kit"], key="Hake")
+    visualize(category, filters)
+
+
+# 🧩 Page fragments and the tables they read/write
+SCOPE3_VIEW_TABLES = ["TransportEmissions", "Materials", "FoodItemsEmissions", "FoodItems"]
+
+material_calculator = calculator_fragment("Material calculator", writes=["Materials"], reads=SCOPE3_VIEW_TABLES)(show_material_calculator)
+transport_calculator = calculator_fragment("Transport calculator", writes=["TransportEmissions"], reads=SCOPE3_VIEW_TABLES)(show_transport_calculator)
+food_calculator = calculator_fragment("Food calculator", writes=["FoodItemsEmissions", "FoodItems"], reads=SCOPE3_VIEW_TABLES)(show_food_calculator)
+logistics_calculator = calculator_fragment("Logistics calculator", writes=["Shipments", "ShipmentLegs"], reads=SCOPE3_VIEW_TABLES)(logist_vis)
+
+transport_analysis = view_fragment("Transport analysis")(transport_visual)
+materials_view = view_fragment("Materials analysis")(materials_analysis)
+food_analysis = view_fragment("Food analysis")(food_visual)
 
 
 def scope3_page():
@@ -42,59 +84,36 @@ def scope3_page():
     ])
 
     with calc_tab1:
-        show_material_calculator(event)
+        material_calculator(event)
 
     with calc_tab2:
-        show_transport_calculator(event)
+        transport_calculator(event)
 
     with calc_tab3:
-        show_food_calculator(event)
+        food_calculator(event)
 
-    # Emission Analysis Section: Tabs for visualizations
+    # Emission Analysis Section: only the selected view is computed
     st.header("Emission Analysis")
-    vis_tab1, vis_tab2, vis_tab3, vis_tab4 = st.tabs([
-        "Transportation", "Logistics", "Materials", "Foods and Vegetables"
-    ])
-
-    with vis_tab1:
-        try:
-            transport_visual("TransportEmissions")
-        except Exception as e:
-            st.error(f"An error occurred while loading transportation visualizations: {e}")
-            logging.error(f"Error in transportation visualization: {e}")
-
-    with vis_tab2:
-        try:
-            logist_vis()
-        except Exception as e:
-            st.error(f"An error occurred while loading logistics visualizations: {e}")
-            logging.error(f"Error in logistics visualization: {e}")
-
-    with vis_tab3:
-        try:
-            conn = sqlite3.connect("data/emissions.db")
-            cur = conn.cursor()
-            cur.execute("SELECT * FROM Materials")
-            data1 = cur.fetchall()
-            conn.close()
-
-            st.subheader("Data:")
-            df = pd.DataFrame(data1, columns=["id", "event", "Category", "Weight", "Quantity", "Emission", "Timestamp"])
-            dataframe = dataframe_explorer(df)
-            st.dataframe(dataframe, use_container_width=True)
-
-            fig = px.pie(df, names='event', values="Emission", color="Weight", title="Emissions Breakdown", hole=0.3)
-            st.plotly_chart(fig, use_container_width=True)
-
-            category = st.selectbox("Select a category", ["Trophies", "Banners", "Momentoes", "Kit"], key="Hake")
-            visualize(category)
-        except Exception as e:
-            st.error(f"An error occurred while loading materials data: {e}")
-            logging.error(f"Error in materials visualization: {e}")
-
-    with vis_tab4:
-        try:
-            food_visual()
-        except Exception as e:
-            st.error(f"An error occurred while loading food visualizations: {e}")
-            logging.error(f"Error in food visualization: {e}")
\ No newline at end of file
+    filters = filter_bar("Scope3")
+    views = {
+        "Transportation": (lambda: transport_analysis("TransportEmissions", filters), "transportation visualizations"),
+        "Logistics": (lambda: logistics_calculator(event), "logistics visualizations"),
+        "Materials": (lambda: materials_view(filters), "materials data"),
+        "Foods and Vegetables": (lambda: food_analysis(filters), "food visualizations"),
+    }
+    active = lazy_tabs(list(views), key="scope3_view")
+
+    render, description = views[active]
+    try:
+        render()
+    except Exception as e:
+        st.error(f"An error occurred while loading {description}: {e}")
+        logging.error(f"Error in {active} view: {e}")
+
+    # Warm the other views in the background while the page is idle
+    prefetch_tabs({
+        "Transportation": lambda: prefetch_transport_data("TransportEmissions", filters),
+        "Logistics": get_routing_engine,
+        "Materials": lambda: prefetch_materials(filters),
+        "Foods and Vegetables": lambda: prefetch_food_data(filters),
+    }, active, token=(filters, query_cache.data_version(get_db_path())))
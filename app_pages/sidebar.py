@@ -1,5 +1,13 @@
 import streamlit as st
+from datetime import date
 from app_pages.chatbot import chatbot_ui
+from resources import registry
+from app_pages.quick_stats import quick_stats, set_annual_target, show_quick_stats
+from session_store import clear_session, persist_key
+from tenancy import CONSULTANTS, ORG_STATE_KEY, list_orgs
+from visualizations.filters import reset_filters
+
+persist_key("sidebar_page")
 
 def render_sidebar(username):
     """Render the complete sidebar with functional components and enhanced UI."""
@@ -119,16 +127,16 @@ def render_sidebar(username):
             st.session_state.sidebar_page = "contact"
             st.rerun()
         
+        # Consultants work on one client organization's shard at a time
+        if username in CONSULTANTS:
+            show_org_switcher()
+
         # Analytics metrics summary
         st.sidebar.markdown("""<div class="sidebar-divider"></div>""", unsafe_allow_html=True)
         st.sidebar.markdown("### Quick Stats")
         
-        # Display key metrics
-        col1, col2 = st.sidebar.columns(2)
-        with col1:
-            st.metric(label="Carbon Footprint", value="72.5 mt", delta="-2.3%")
-        with col2:
-            st.metric(label="Target Progress", value="68%", delta="+4%")
+        # Display key metrics (from the daily ledger rollup, cached per data version)
+        show_quick_stats()
         
         # Add divider before the chatbot
         st.sidebar.markdown("""<div class="sidebar-divider"></div>""", unsafe_allow_html=True)
@@ -142,9 +150,11 @@ def render_sidebar(username):
         st.sidebar.markdown("""<div class="sidebar-divider"></div>""", unsafe_allow_html=True)
         if st.sidebar.button("🚪 Logout", key="logout_button", use_container_width=True,
                            help="End your session"):
-            if "logged_in_user" in st.session_state:
-                del st.session_state.logged_in_user
+            if "chat_history" in st.session_state:
+                st.session_state.chat_history.flush()
+            clear_session()  # Also drops logged_in_user on every replica
             st.markdown("<meta http-equiv='refresh' content='0'>", unsafe_allow_html=True)
+            st.stop()  # Nothing below may run without a logged-in user
     
     # Profile page view
     elif st.session_state.sidebar_page == "profile":
@@ -164,6 +174,20 @@ def render_sidebar(username):
         # Display contact form in the main area
         show_contact_us()
 
+def show_org_switcher():
+    """Organization selector; switching drops state that belongs to the previous shard."""
+    orgs = list_orgs()
+    current = st.session_state.get(ORG_STATE_KEY)
+    selected = st.sidebar.selectbox("🏢 Organization", orgs, index=orgs.index(current) if current in orgs else 0,
+                                    key="org_switcher")
+    if selected != current:
+        st.session_state[ORG_STATE_KEY] = selected
+        history = st.session_state.pop("chat_history", None)
+        if history is not None:
+            history.flush()  # Into the previous organization's transcript
+        reset_filters()
+        st.rerun()
+
 # Keep the other functions as they are
 def show_profile(username):
     """Display user profile information."""
@@ -186,6 +210,21 @@ def show_profile(username):
     st.write("**Dashboard Theme:** Dark")
     st.write("**Notifications:** Enabled")
     
+    # Annual emission target behind the sidebar's Target Progress
+    st.subheader("Emission Target")
+    stats = quick_stats()
+    year = date.today().year
+    target_t = st.number_input(f"Target for {year} (t CO₂e)", min_value=0.0,
+                               value=(stats.target or 0.0) / 1000, step=1.0, key="target_input")
+    if st.button("Save Target", key="save_target") and target_t > 0:
+        if set_annual_target(year, target_t * 1000):
+            st.success(f"Target for {year} saved.")
+
+    # Shared resources of this server process
+    with st.expander("🩺 Service Health"):
+        for resource, status in registry.health().items():
+            st.write(f"{'✅' if status == 'ok' else '❌'} **{resource}**: {status}")
+
     # Recent activity
     st.subheader("Recent Activity")
     st.info("Analyzed Scope 1 emissions - Today at 10:15 AM")
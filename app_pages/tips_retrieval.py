@@ -0,0 +1,200 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+from common import cached_query, db_pool, get_db_path
+from resources import registry
+from app_pages.chat_intents import tokenize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PROFILE_WEIGHT = 0.5  # Boost for a tip about the source with the largest share of emissions
+_ARRAYS = ("data", "indices", "indptr")
+
+STOP_WORDS = frozenset("""
+a an and are as at be by can could do does for from give have how i in into is it its me more my
+of on or our should so some than that the their them there these this to us we what which with would you your
+carbon cut emission emissions footprint lower reduce reducing reduction suggest suggestion tip tips way ways
+""".split())  # Also the words every tips question shares, which would otherwise outrank the topic
+
+
+def terms(text: str) -> List[str]:
+    """Index terms of a text: word tokens without stop words, with a plain plural 's' removed."""
+    words = (token for token in tokenize(text) if token not in STOP_WORDS)
+    return [word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word for word in words]
+
+
+@dataclass(frozen=True)
+class IndexState:
+    """One consistent version of the index; replaced as a whole, so readers never see half an update."""
+    ids: List[int]
+    kinds: List[str]
+    sources: List[Optional[str]]
+    vocabulary: Dict[str, int]
+    counts: sparse.csr_matrix  # Term counts, one row per tip
+    idf: np.ndarray
+    norms: np.ndarray  # Length of every TF-IDF row
+
+
+def index_state(ids, kinds, sources, vocabulary, counts) -> IndexState:
+    """State with the smoothed IDF and row lengths derived from the counts."""
+    df = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = np.log((1 + len(ids)) / (1 + df)) + 1
+    norms = np.sqrt(counts.multiply(counts) @ (idf ** 2))
+    norms[norms == 0] = 1
+    return IndexState(ids, kinds, sources, vocabulary, counts, idf, norms)
+
+
+EMPTY_INDEX = index_state([], [], [], {}, sparse.csr_matrix((0, 0)))
+
+
+class TipsIndex:
+    """Sparse TF-IDF index over ``reduction_tips_table``, kept as memory-mapped ``.npy`` files.
+
+    Only raw term counts are stored (one CSR row per tip), so adding tips appends rows and
+    new vocabulary columns without re-reading the existing ones. IDF weights and row lengths
+    are two small vectors derived from the mapped counts whenever the index is loaded.
+    """
+
+    def __init__(self, db_path: str, directory: Optional[str] = None):
+        self.db_path = db_path
+        self.directory = directory or os.path.join(os.path.dirname(db_path) or ".", "tips_index")
+        self._lock = threading.Lock()
+        self.state = self._load()
+
+    # 📌 Storage
+    def _load(self) -> IndexState:
+        """Map the stored index, if there is one."""
+        manifest = os.path.join(self.directory, "manifest.json")
+        if not os.path.exists(manifest):
+            return EMPTY_INDEX
+        try:
+            with open(manifest) as file:
+                meta = json.load(file)
+            data, indices, indptr = (np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS)
+            counts = sparse.csr_matrix((data, indices, indptr), shape=(len(meta["ids"]), len(meta["vocabulary"])), copy=False)
+            return index_state(meta["ids"], meta["kinds"], meta["sources"], meta["vocabulary"], counts)
+        except (OSError, ValueError, KeyError) as e:
+            logging.error(f"Error loading tips index, rebuilding it: {e}")
+            return EMPTY_INDEX
+
+    def _save(self, state: IndexState):
+        """Write the arrays and manifest (each file replaced atomically)."""
+        os.makedirs(self.directory, exist_ok=True)
+        for name in _ARRAYS:
+            temporary = os.path.join(self.directory, f"{name}.tmp.npy")
+            np.save(temporary, getattr(state.counts, name))
+            os.replace(temporary, os.path.join(self.directory, f"{name}.npy"))
+        temporary = os.path.join(self.directory, "manifest.tmp.json")
+        with open(temporary, "w") as file:
+            json.dump({"ids": state.ids, "kinds": state.kinds, "sources": state.sources, "vocabulary": state.vocabulary}, file)
+        os.replace(temporary, os.path.join(self.directory, "manifest.json"))
+
+    # 🔄 Incremental build
+    def refresh(self) -> int:
+        """Index tips added since the last build (everything again if tips were deleted); returns how many were indexed."""
+        try:
+            count, last_id = cached_query("SELECT COUNT(*), MAX(id) FROM reduction_tips_table")[0]
+        except sqlite3.Error as e:
+            logging.error(f"Error reading reduction tips: {e}")
+            return 0
+        if count == len(self.state.ids) and (last_id or 0) == (self.state.ids[-1] if self.state.ids else 0):
+            return 0
+
+        with self._lock:
+            current = self.state
+            rebuild = count < len(current.ids) or bool(current.ids and (last_id or 0) < current.ids[-1])
+            if rebuild:
+                current = EMPTY_INDEX
+            try:
+                with db_pool(self.db_path).connection() as conn:
+                    rows = conn.execute(
+                        "SELECT id, tip, kind, SourceTable FROM reduction_tips_table WHERE id > ? ORDER BY id",
+                        (current.ids[-1] if current.ids else 0,),
+                    ).fetchall()
+            except sqlite3.Error as e:
+                logging.error(f"Error reading reduction tips: {e}")
+                return 0
+            if not rows and not rebuild:
+                return 0
+
+            ids, kinds, sources, vocabulary = list(current.ids), list(current.kinds), list(current.sources), dict(current.vocabulary)
+            data, indices, indptr = [], [], [0]
+            for id_, text, kind, source in rows:
+                for term, n in Counter(terms(text)).items():
+                    indices.append(vocabulary.setdefault(term, len(vocabulary)))
+                    data.append(n)
+                indptr.append(len(indices))
+                ids.append(id_)
+                kinds.append(kind)
+                sources.append(source)
+
+            counts = sparse.csr_matrix(
+                (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+                shape=(len(rows), len(vocabulary)),
+            )
+            if current.ids:
+                # Existing rows as mapped, widened to the new vocabulary
+                existing = sparse.csr_matrix((current.counts.data, current.counts.indices, current.counts.indptr),
+                                             shape=(len(current.ids), len(vocabulary)))
+                counts = sparse.vstack([existing, counts], format="csr")
+
+            self._save(index_state(ids, kinds, sources, vocabulary, counts))
+            self.state = self._load()
+            logging.info(f"Indexed {len(rows)} reduction tips ({'rebuilt' if rebuild else 'incremental'})")
+            return len(rows)
+
+    # 🔎 Retrieval
+    def search(self, text: str = "", kind: str = "tip", profile: Optional[Dict[str, float]] = None,
+               k: int = 3) -> List[Tuple[str, float]]:
+        """Up to ``k`` matching texts of ``kind`` by cosine similarity to ``text`` plus a bonus for the user's biggest sources.
+
+        ``profile`` maps ledger SourceTable names to emissions; a tip's score is raised by
+        ``PROFILE_WEIGHT`` times its source's share of the largest one.
+        """
+        self.refresh()
+        state = self.state
+        if not state.ids:
+            return []
+
+        # Cosine of the TF-IDF vectors: counts @ (query counts * idf²), over both lengths
+        query = np.zeros(state.counts.shape[1])
+        for term, n in Counter(terms(text)).items():
+            column = state.vocabulary.get(term)
+            if column is not None:
+                query[column] = n
+        query_norm = np.linalg.norm(query * state.idf)
+        if query_norm:
+            scores = state.counts @ (query * state.idf ** 2) / (state.norms * query_norm)
+        else:
+            scores = np.zeros(len(state.ids))
+
+        if profile:
+            # Relevant tips about big sources rank first; with no matching words the profile alone decides
+            largest = max(profile.values()) or 1
+            shares = np.array([profile.get(source, 0) / largest if source else 0 for source in state.sources])
+            scores = scores * (1 + PROFILE_WEIGHT * shares) if query_norm else PROFILE_WEIGHT * shares
+
+        candidates = [row for row in np.argsort(-scores, kind="stable") if state.kinds[row] == kind and scores[row] > 0][:k]
+        if not candidates:
+            return []
+        wanted = [state.ids[row] for row in candidates]
+        texts = dict(cached_query(
+            f"SELECT id, tip FROM reduction_tips_table WHERE id IN ({', '.join('?' for _ in wanted)})", wanted))
+        return [(texts[state.ids[row]], float(scores[row])) for row in candidates if state.ids[row] in texts]
+
+
+registry.register("tips_index", TipsIndex, per_database=True,
+                  health=lambda index: len(index.state.ids) == index.state.counts.shape[0])
+
+
+def get_tips_index(db_path: Optional[str] = None) -> TipsIndex:
+    """One shared index per database."""
+    return registry.get("tips_index", db_path or get_db_path())
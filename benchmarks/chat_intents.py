@@ -0,0 +1,87 @@
+import json
+import time
+import random
+import sqlite3
+import argparse
+import logging
+import statistics
+from datetime import datetime, timedelta, timezone
+from benchmarks.scratch import best_ms, scratch_database, use_org, BENCH_ORG
+from app_pages.chat_intents import get_intent_router
+from app_pages.chatbot import EmissionResponseGenerator, load_emission_data
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+CORPUS = [
+    "What is my total carbon footprint?", "total emissions", "Show scope 1 emissions", "scope 2 emissions this year",
+    "What are my scope breakdown numbers?", "category breakdown", "monthly trend", "Scope 2 trend this year",
+    "scope 3 quarterly trend", "top 5 sources for event E3 in March", "top 3 events last year", "top 10 items",
+    "biggest sources this month", "top foods", "which fuels emit the most", "how much did Diesel emit in 2025",
+    "electricity emissions for event E7", "daily trend for event E1 last month", "weekly emissions trend for materials",
+    "yearly trend", "break down emissions for event E3", "tips to reduce emissions", "what is carbon emission",
+    "explain scope", "hvac emissions in october", "top 5 vehicles this year", "R-410A leaks this year",
+    "Trophies emissions in 2024", "hello there", "scope 1 emissions for event E5 yesterday",
+]
+
+# (table, columns, row factory) for every calculator feeding the ledger
+TABLES = [
+    ("ElectricityEmissions", "Usage, Value, Emission",
+     lambda rng: (rng.choice(["Lighting", "Cooling", "Heating"]), rng.random() * 100, rng.random() * 80)),
+    ("Materials", "Category, Weight, Quantity, Emission",
+     lambda rng: (rng.choice(["Trophies", "Kit", "Banners"]), rng.random() * 5, rng.randint(1, 9), rng.random() * 3)),
+    ("TransportEmissions", "Mode, Vehicle, WeightOrDistance, Emission",
+     lambda rng: ("Road", rng.choice(["Car", "Bus", "Truck"]), rng.random() * 100, rng.random() * 30)),
+    ("HVACEmissions", "Refrigerant, MassLeak, Emission",
+     lambda rng: (rng.choice(["R-22", "R-410A"]), rng.random(), rng.random() * 1000)),
+    ("FoodItems", "FoodItem, Quantity, Emission",
+     lambda rng: (rng.choice(["Rice", "Dal", "Beef"]), rng.random() * 5, rng.random() * 3)),
+    ("Scope1", "fuels, consumptions, emissions, total_emission",
+     lambda rng: (json.dumps(["Diesel", "LPG"]), json.dumps([1.0, 2.0]), json.dumps([2.5, 3.0]), 5.5)),
+]
+
+
+def populate(db_path: str, rows: int, events: int = 20, days: int = 3 * 365):
+    """``rows`` line items spread over every calculator table, ``events`` events and the last ``days`` days."""
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO Events (name) VALUES (?)", [(f"E{i}",) for i in range(events)])
+        for table, columns, row in TABLES:
+            placeholders = ", ".join("?" for _ in range(columns.count(",") + 3))
+            conn.executemany(
+                f"INSERT INTO {table} (event, {columns}, Timestamp) VALUES ({placeholders})",
+                [(f"E{i % events}", *row(rng), (now - timedelta(seconds=rng.random() * days * 86400)).strftime("%Y-%m-%d %H:%M:%S"))
+                 for i in range(rows // len(TABLES))],
+            )
+
+
+def answer_latencies(generator: EmissionResponseGenerator):
+    times = []
+    for question in CORPUS:
+        start = time.perf_counter()
+        generator.generate_response(question)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), sorted(times)[int(len(times) * 0.95)], max(times)
+
+
+# 📌 Command line: python -m benchmarks.chat_intents [--rows N] [-v] from the repository root
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chatbot question parsing and answer latency over a question corpus")
+    parser.add_argument("--rows", type=int, default=600_000, help="Line items across the calculator tables")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print each question's intent and answer")
+    args = parser.parse_args()
+
+    with use_org(BENCH_ORG):
+        populate(scratch_database(), args.rows)
+        router = get_intent_router()
+        generator = EmissionResponseGenerator(load_emission_data())
+
+        parse = best_ms(lambda: [router.parse(question) for question in CORPUS], 20) / len(CORPUS)
+        print(f"parse: {parse * 1000:.1f} us per question")
+        for label in ("cold", "warm"):
+            median, p95, worst = answer_latencies(generator)
+            print(f"{label} answers: median {median:.2f} ms, p95 {p95:.2f} ms, max {worst:.1f} ms")
+        if args.verbose:
+            for question in CORPUS:
+                print(f"{question!r} -> {router.parse(question).intent}: {generator.generate_response(question)[:160]}")
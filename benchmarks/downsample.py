@@ -0,0 +1,58 @@
+import time
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from visualizations.downsample import downsample, lttb, minmax
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+Y = "Emission (kg CO₂)"
+
+
+def synthetic_series(rows: int) -> pd.DataFrame:
+    """Per-minute random walk for three vehicles, like the transport time series."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "Timestamp": pd.date_range("2020-01-01", periods=rows, freq="min").strftime("%Y-%m-%d %H:%M:%S"),
+        Y: np.cumsum(rng.normal(size=rows)) + 100,
+        "Vehicle": rng.choice(["Car", "Bus", "Truck"], rows),
+        "Distance (km)": rng.random(rows) * 500,
+    })
+
+
+CHARTS = {
+    "line": lambda df: px.line(df, x="Timestamp", y=Y, color="Vehicle"),
+    "line lttb": lambda df: px.line(downsample(df, "Timestamp", Y, by="Vehicle"), x="Timestamp", y=Y, color="Vehicle"),
+    "scatter": lambda df: px.scatter(df, x="Distance (km)", y=Y, color="Vehicle"),
+    "scatter minmax": lambda df: px.scatter(downsample(df, "Distance (km)", Y, by="Vehicle", method="minmax"),
+                                            x="Distance (km)", y=Y, color="Vehicle"),
+}
+
+
+def check_shape():
+    """Min/max bucketing keeps the extremes; LTTB keeps the x order."""
+    x = np.arange(100_000.0)
+    y = np.sin(np.linspace(0, 50, len(x)))
+    kept = minmax(x, y, 400)
+    assert y[kept].max() == y.max() and y[kept].min() == y.min()
+    kept = lttb(x, y, 2400)
+    assert (np.diff(kept) > 0).all()
+
+
+# 📌 Command line: python -m benchmarks.downsample [--rows N ...] from the repository root
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Figure payload and build+serialize time with and without downsampling")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    args = parser.parse_args()
+
+    check_shape()
+    print(f"{'rows':>9} {'chart':<15} {'payload MB':>10} {'seconds':>8}")
+    for rows in args.rows:
+        df = synthetic_series(rows)
+        for label, build in CHARTS.items():
+            start = time.perf_counter()
+            payload = build(df).to_json()  # What st.plotly_chart ships to the browser
+            print(f"{rows:>9,} {label:<15} {len(payload) / 1e6:10.2f} {time.perf_counter() - start:8.2f}")
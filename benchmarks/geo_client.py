@@ -0,0 +1,67 @@
+import time
+import asyncio
+import argparse
+import logging
+from benchmarks.ors_stub import serve
+from modules.geo_client import GEOCODE_CACHE, ROUTE_CACHE, BatchRoutingClient
+from openrouteservice.exceptions import ApiError, HTTPError
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+RETRIES = 3
+
+
+def client(base_url: str, concurrency: int, rate: float) -> BatchRoutingClient:
+    return BatchRoutingClient(api_key="stub", base_url=base_url, rate_per_second=rate, burst=concurrency,
+                              concurrency=concurrency, max_retries=RETRIES, backoff=0.01)
+
+
+def check_retries(server, base_url: str):
+    """Client errors fail on the first request; 429 is retried."""
+    batch = client(base_url, 1, 1000)
+
+    async def geocode(text: str):
+        batch._start()
+        await batch._call(batch.client.pelias_search, text)  # The retrying wrapper, so errors surface
+
+    for text, error in (("status-404", ApiError), ("status-403-html", HTTPError), ("status-429", ApiError)):
+        try:
+            asyncio.run(geocode(text))
+        except error:
+            pass
+    assert server.requests["status-404"] == 1, server.requests
+    assert server.requests["status-403-html"] == 1, server.requests
+    assert server.requests["status-429"] == RETRIES + 1, server.requests
+
+
+def run(base_url: str, pairs: int, concurrency: int, rate: float) -> float:
+    """Seconds to geocode and route ``pairs`` cold origin/destination pairs."""
+    GEOCODE_CACHE.clear()
+    ROUTE_CACHE.clear()
+    trips = [(f"Depot {i}", f"Venue {i}") for i in range(pairs)]
+    start = time.perf_counter()
+    distances = client(base_url, concurrency, rate).run(trips)
+    elapsed = time.perf_counter() - start
+    assert all(distances.values()), "every stub pair should route"
+    return elapsed
+
+
+# 📌 Command line: python -m benchmarks.geo_client [--pairs N] [--latency S] from the repository root
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch geocoding/routing against a local ORS stub")
+    parser.add_argument("--pairs", type=int, default=100, help="Unique origin/destination pairs")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub seconds per request")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rate", type=float, default=1000.0, help="Requests per second allowed by the limiter")
+    args = parser.parse_args()
+
+    server = serve(args.latency)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    check_retries(server, base_url)
+    print(f"{args.pairs} pairs = {args.pairs * 3} ORS requests at {args.latency * 1000:.0f} ms each")
+    print(f"{'concurrency':>11} {'seconds':>8} {'req/s':>8}")
+    for concurrency in args.concurrency:
+        elapsed = run(base_url, args.pairs, concurrency, args.rate)
+        print(f"{concurrency:>11} {elapsed:8.2f} {args.pairs * 3 / elapsed:8.0f}")
+    server.shutdown()
@@ -0,0 +1,65 @@
+import ast
+import time
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from visualizations.ledger_transform import process_data
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# 📌 Synthetic ledger: one third JSON list rows (food line items), like MasterEmissions
+SAMPLE_ROWS = [
+    (1, "Scope1", "Scope1", "e1", "Diesel", 1.0, 0.0, 0.25, "2025-01-01 10:00:00"),
+    (2, "FoodItemsEmissions", "Scope3", "e2", '["Beef", "Rice"]', "[1, 2]", "0", "[27.0, 5.4]", "2025-01-02 10:00:00"),
+    (3, "Materials", "Scope3", "e1", "Trophies", 2.0, 1.0, 3.0, "2025-01-03 10:00:00"),
+]
+COLUMNS = ["id", "SourceTable", "Category", "Event", "Description", "Quantity", "Weight", "Emission", "Timestamp"]
+
+
+def synthetic_ledger(rows: int, events: int = 1000) -> pd.DataFrame:
+    df = pd.concat([pd.DataFrame(SAMPLE_ROWS, columns=COLUMNS)] * (rows // len(SAMPLE_ROWS)), ignore_index=True)
+    df["Event"] = np.random.default_rng(0).integers(0, events, len(df)).astype(str)
+    return df
+
+
+def row_loop_process_data(df: pd.DataFrame) -> pd.DataFrame:
+    """The iterrows/literal_eval transform process_data replaced, kept as the baseline."""
+    def convert(value):
+        return ast.literal_eval(value) if isinstance(value, str) and value.startswith("[") else value
+
+    processed = []
+    for _, row in df.iterrows():
+        _, source, category, event, description, quantity, weight, emission, timestamp = row
+        description, quantity, emission = convert(description), convert(quantity), convert(emission)
+        if isinstance(description, list):
+            for desc, qty, emi in zip(description, quantity, emission):
+                processed.append([source, category, event, desc, qty, weight, emi, timestamp])
+        else:
+            processed.append([source, category, event, description, quantity, weight, emission, timestamp])
+    out = pd.DataFrame(processed, columns=COLUMNS[1:])
+    totals = {event: out[out["Event"] == event]["Emission"].sum() for event in out["Event"].unique()}
+    out["Cumulative Emission"] = out["Event"].map(totals)
+    return out
+
+
+def timed(fn, df: pd.DataFrame) -> float:
+    start = time.perf_counter()
+    fn(df)
+    return time.perf_counter() - start
+
+
+# 📌 Command line: python -m benchmarks.ledger_transform [--rows N ...] from the repository root
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ledger transform: vectorized process_data vs the row loop")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--baseline-max", type=int, default=100_000, help="Largest size also run through the row loop")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'vectorized s':>13} {'row loop s':>11}")
+    for rows in args.rows:
+        df = synthetic_ledger(rows)
+        vectorized = timed(process_data, df)
+        baseline = f"{timed(row_loop_process_data, df):11.2f}" if rows <= args.baseline_max else f"{'-':>11}"
+        print(f"{rows:>9,} {vectorized:13.2f} {baseline}")
@@ -0,0 +1,100 @@
+import json
+import math
+import time
+import zlib
+import argparse
+import logging
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+ROAD_FACTOR = 1.3  # Stub road distance over the great-circle distance
+
+
+def _coordinates(place: str) -> Tuple[float, float]:
+    """Stable pseudo-random (lon, lat) for a place name, spread over Europe."""
+    digest = zlib.crc32(place.lower().encode())
+    return -10 + (digest % 4000) / 100, 36 + (digest // 4000 % 2400) / 100
+
+
+def _failure(text: str) -> Tuple[int, bool]:
+    """Places named ``status-<code>`` (or ``status-<code>-html``) make the stub answer that status."""
+    parts = text.split("-")
+    if len(parts) >= 2 and parts[0] == "status" and parts[1].isdigit():
+        return int(parts[1]), parts[-1] == "html"
+    return 0, False
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """The two OpenRouteService endpoints BatchRoutingClient uses, answered after ``server.latency`` seconds."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the public API
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body, html: bool = False):
+        data = b"<html>error</html>" if html else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html" if html else "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/geocode/search":
+            return self._send(404, {"error": "not found"})
+        text = parse_qs(url.query).get("text", [""])[0]
+        self.server.requests[text] += 1
+        time.sleep(self.server.latency)
+        status, html = _failure(text)
+        if status:
+            return self._send(status, {"error": f"stub {status}"}, html)
+        self._send(200, {"features": [{"geometry": {"coordinates": list(_coordinates(text))}}]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.startswith("/v2/directions/"):
+            return self._send(404, {"error": "not found"})
+        self.server.requests["directions"] += 1
+        time.sleep(self.server.latency)
+        (lon1, lat1), (lon2, lat2) = body["coordinates"][:2]
+        a = (math.sin(math.radians(lat2 - lat1) / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2))
+             * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+        meters = 2 * 6371008.8 * math.asin(math.sqrt(a)) * ROAD_FACTOR
+        self._send(200, {"routes": [{"summary": {"distance": meters}}]})
+
+
+def serve(latency: float = 0.05, port: int = 0) -> ThreadingHTTPServer:
+    """Start the stub in a background thread; its base URL is ``f"http://127.0.0.1:{server.server_port}"``.
+
+    ``server.requests`` counts requests per geocoded text (directions under ``"directions"``).
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.requests = Counter()
+    threading.Thread(target=server.serve_forever, daemon=True, name="ors-stub").start()
+    return server
+
+
+# 📌 Command line: python -m benchmarks.ors_stub [--latency S] [--port N], then run with ORS_BASE_URL pointing at it
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenRouteService stub with simulated latency")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request")
+    parser.add_argument("--port", type=int, default=8700)
+    args = parser.parse_args()
+
+    server = serve(args.latency, args.port)
+    logging.info(f"ORS stub on http://127.0.0.1:{server.server_port} ({args.latency * 1000:.0f} ms per request)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
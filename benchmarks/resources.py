@@ -0,0 +1,67 @@
+import gc
+import sqlite3
+import argparse
+import logging
+import tracemalloc
+from contextlib import closing
+from benchmarks.scratch import best_ms, scratch_database, use_org, BENCH_ORG
+from streamlit.testing.v1 import AppTest
+from common import cached_query
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+MISS_SQL = "SELECT COUNT(*) FROM Events WHERE id > ?"
+QUESTIONS = ["total emissions", "top 3 sources", "tips for food", "scope 2", "monthly trend"]
+
+
+def chat_app():
+    """Chatbot page of one session, on the benchmark organization's shard."""
+    import streamlit as st
+    from app_pages.chatbot import chatbot_ui
+    st.session_state.setdefault("org", "bench")
+    chatbot_ui()
+
+
+def fresh_connections(db_path: str, queries: int):
+    """Query-cache misses as they ran before the pool: one new connection each."""
+    for i in range(queries):
+        with closing(sqlite3.connect(db_path)) as conn:
+            conn.execute(MISS_SQL, (i,)).fetchall()
+
+
+def pooled_misses(queries: int, offset: int):
+    for i in range(queries):
+        cached_query(MISS_SQL, (offset + i,))  # A new parameter is always a miss
+
+
+def chat_session() -> AppTest:
+    at = AppTest.from_function(chat_app, default_timeout=60).run()
+    for question in QUESTIONS:
+        at.chat_input[0].set_value(question).run()
+    return at
+
+
+# 📌 Command line: python -m benchmarks.resources [--misses N] [--sessions N] from the repository root
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pooled vs fresh connections on cache misses, and memory per chat session")
+    parser.add_argument("--misses", type=int, default=2000, help="Query-cache misses to time")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent chat sessions to measure")
+    args = parser.parse_args()
+
+    with use_org(BENCH_ORG):
+        db_path = scratch_database()
+        runs = iter(range(0, 10 ** 9, args.misses))
+        fresh = best_ms(lambda: fresh_connections(db_path, args.misses), 3)
+        pooled = best_ms(lambda: pooled_misses(args.misses, next(runs)), 3)
+        print(f"{args.misses} query-cache misses: fresh connections {fresh:,.0f} ms, pool {pooled:,.0f} ms")
+
+    chat_session()  # Warm up shared resources so they are not charged to the sessions
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    sessions = [chat_session() for _ in range(args.sessions)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    print(f"{args.sessions} chat sessions x {len(QUESTIONS)} questions: {used / len(sessions) / 1024:,.0f} KB per session "
+          "(including the AppTest element tree)")
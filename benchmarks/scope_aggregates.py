@@ -0,0 +1,66 @@
+import json
+import random
+import sqlite3
+import argparse
+import logging
+from benchmarks.scratch import best_ms, scratch_database, use_org, BENCH_ORG
+import pandas as pd
+from visualizations.aggregations import SCOPE1_ITEMS_SOURCE, aggregate
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+FUELS = ["Diesel", "Petrol", "LPG", "Natural Gas"]
+USAGES = ["Lighting", "Cooling", "Heating", "Kitchen"]
+
+
+def populate(db_path: str, rows: int, events: int = 20):
+    """Electricity rows and two-fuel Scope 1 records spread over ``events`` events."""
+    rng = random.Random(0)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO ElectricityEmissions (event, Usage, Value, Emission) VALUES (?, ?, ?, ?)",
+            [(f"E{i % events}", rng.choice(USAGES), rng.random() * 100, rng.random() * 80) for i in range(rows)],
+        )
+        conn.executemany(
+            "INSERT INTO Scope1 (event, fuels, consumptions, emissions, total_emission) VALUES (?, ?, ?, ?, ?)",
+            [(f"E{i % events}", json.dumps(rng.sample(FUELS, 2)), json.dumps([1.0, 2.0]), json.dumps([2.5, 3.0]), 5.5)
+             for i in range(rows)],
+        )
+
+
+# 📊 The pandas aggregation the scope pages ran on every rerun, kept as the baseline
+def pandas_by_usage(db_path: str) -> pd.DataFrame:
+    with sqlite3.connect(db_path) as conn:
+        df = pd.read_sql("SELECT * FROM ElectricityEmissions", conn)
+    return df.groupby("Usage", as_index=False)["Emission"].sum()
+
+
+def pandas_by_fuel(db_path: str) -> pd.DataFrame:
+    with sqlite3.connect(db_path) as conn:
+        df = pd.read_sql("SELECT * FROM Scope1", conn)
+    items = pd.DataFrame({"Fuel": df["fuels"].map(json.loads), "Emission": df["emissions"].map(json.loads)})
+    return items.explode(["Fuel", "Emission"]).astype({"Emission": float}).groupby("Fuel", as_index=False).sum()
+
+
+# 📌 Command line: python -m benchmarks.scope_aggregates [--rows N ...] from the repository root
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scope chart aggregates: SQL GROUP BY vs pandas over the raw table")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'chart':<16} {'pandas ms':>10} {'SQL ms':>8}")
+    with use_org(BENCH_ORG):
+        db_path = scratch_database()
+        loaded = 0
+        for rows in sorted(args.rows):
+            populate(db_path, rows - loaded)
+            loaded = rows
+            cases = {
+                "usage pie": (lambda: pandas_by_usage(db_path),
+                              lambda: aggregate("ElectricityEmissions", {"Usage": "Usage"}, {"Emission": "SUM(Emission)"})),
+                "fuel bar (JSON)": (lambda: pandas_by_fuel(db_path),
+                                    lambda: aggregate(SCOPE1_ITEMS_SOURCE, {"Fuel": "Fuel"}, {"Emission": "SUM(Emission)"})),
+            }
+            for label, (baseline, pushed) in cases.items():
+                print(f"{rows:>9,} {label:<16} {best_ms(baseline, 3):10.1f} {best_ms(pushed, 3, cold=True):8.1f}")
@@ -0,0 +1,36 @@
+import os
+import time
+import atexit
+import shutil
+import tempfile
+from typing import Callable
+
+# Benchmarks write to a throwaway shard, never to data/emissions.db; set before tenancy reads it
+SCRATCH_DIR = tempfile.mkdtemp(prefix="emissions-bench-")
+os.environ["EMISSIONS_SHARD_DIR"] = SCRATCH_DIR
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+
+from common import create_database, query_cache
+from tenancy import shard_path, use_org
+
+BENCH_ORG = "bench"
+
+
+def scratch_database(org: str = BENCH_ORG) -> str:
+    """Create a scratch shard with the current schema; wrap the run in ``use_org(org)`` to query it."""
+    path = shard_path(org)
+    if not create_database(path):
+        raise RuntimeError(f"Could not create scratch database {path}")
+    return path
+
+
+def best_ms(fn: Callable[[], object], repeat: int = 5, cold: bool = False) -> float:
+    """Fastest of ``repeat`` runs in milliseconds; ``cold`` clears the query cache before each run."""
+    best = float("inf")
+    for _ in range(repeat):
+        if cold:
+            query_cache.clear()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
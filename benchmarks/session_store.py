@@ -0,0 +1,61 @@
+import os
+import time
+import argparse
+import logging
+import multiprocessing as mp
+from benchmarks.scratch import SCRATCH_DIR, scratch_database, use_org, BENCH_ORG
+from session_store import LocalKVSessionBackend, SQLiteSessionBackend
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# A typical ~300 byte session: login, navigation, two calculator rows and the filter context
+SESSION = {
+    "logged_in_user": "ops_manager", "org": "default", "sidebar_page": "main", "current_page": "Scope 1",
+    "fuel_entries": [{"id": i, "fuel_type": "Diesel", "consumption": float(i)} for i in range(3)],
+    "filter_context": {"events": ["E1"], "start": None, "end": None},
+}
+
+
+def _backend(name: str, db_path: str):
+    if name == "kv":
+        return LocalKVSessionBackend(os.path.join(SCRATCH_DIR, "sessions"))
+    return SQLiteSessionBackend(db_path)
+
+
+def replica(name: str, db_path: str, index: int, duration: float, results):
+    """One app replica: restore then save sessions (as every rerun does) until ``duration`` is up."""
+    backend, data, done = _backend(name, db_path), dict(SESSION), 0
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        sid = f"r{index}-s{done % 200}"
+        backend.load(sid)
+        data["fuel_entries"][0]["consumption"] = done
+        backend.save(sid, data, 3600)
+        done += 1
+    results.put(done)
+
+
+def throughput(name: str, db_path: str, replicas: int, duration: float) -> float:
+    results = mp.Queue()
+    processes = [mp.Process(target=replica, args=(name, db_path, i, duration, results)) for i in range(replicas)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return sum(results.get() for _ in processes) / duration
+
+
+# 📌 Command line: python -m benchmarks.session_store [--replicas N ...] from the repository root
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Session store restore+save throughput per backend and replica count")
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per run")
+    args = parser.parse_args()
+
+    with use_org(BENCH_ORG):
+        db_path = scratch_database()  # WAL, as create_database sets it up
+    print(f"{'backend':<8} {'replicas':>8} {'ops/s':>8}")
+    for name in ("sqlite", "kv"):
+        for replicas in args.replicas:
+            print(f"{name:<8} {replicas:>8} {throughput(name, db_path, replicas, args.duration):8,.0f}")
@@ -0,0 +1,74 @@
+import bisect
+import random
+import sqlite3
+import argparse
+import logging
+from benchmarks.scratch import best_ms, scratch_database, use_org, BENCH_ORG
+from visualizations.filters import FilterContext
+from visualizations.sketches import KLLSketch, SKETCH_RANK_ERROR, emission_sketches, merge_sketches, sync_sketches
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+QUANTILES = (0.25, 0.5, 0.75, 0.9, 0.95)
+
+
+def populate(db_path: str, rows: int, events: int = 20):
+    rng = random.Random(0)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO Materials (event, Category, Weight, Quantity, Emission) VALUES (?, ?, ?, ?, ?)",
+            [(f"E{i % events}", "Kit", 1.0, 1.0, rng.lognormvariate(1, 1.2)) for i in range(rows)],
+        )
+
+
+def rank_error(ordered, value: float, q: float) -> float:
+    return abs(bisect.bisect_right(ordered, value) / len(ordered) - q)
+
+
+def merged_accuracy(trials: int = 20, values: int = 200_000, parts: int = 40) -> float:
+    """Max rank error of ``parts`` serialized day sketches merged back together."""
+    rng = random.Random(1)
+    worst = 0.0
+    for _ in range(trials):
+        data = [rng.lognormvariate(1, 1.2) for _ in range(values)]
+        sketches = []
+        for i in range(parts):
+            sketch = KLLSketch()
+            sketch.extend(data[i::parts])
+            sketches.append(KLLSketch.from_bytes(sketch.to_bytes()))
+        merged, ordered = merge_sketches(sketches), sorted(data)
+        worst = max(worst, max(rank_error(ordered, merged.quantile(q), q) for q in QUANTILES))
+    return worst
+
+
+# 📌 Command line: python -m benchmarks.sketches [--rows N] from the repository root
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="KLL sketch quantiles vs exact sorting, plus sketch upkeep costs")
+    parser.add_argument("--rows", type=int, default=500_000, help="Materials rows in the scratch database")
+    parser.add_argument("--trials", type=int, default=20, help="Trials of the merged-sketch accuracy check")
+    args = parser.parse_args()
+
+    with use_org(BENCH_ORG):
+        db_path = scratch_database()
+        populate(db_path, args.rows)
+        conn = sqlite3.connect(db_path)
+        folded_ms = best_ms(lambda: sync_sketches(db_path), 1)
+        print(f"initial fold of {args.rows:,} values: {folded_ms:,.0f} ms")
+        conn.execute("INSERT INTO Materials (event, Category, Weight, Quantity, Emission) VALUES ('E3', 'Kit', 1, 1, 2.0)")
+        conn.commit()
+        print(f"fold after one insert: {best_ms(lambda: sync_sketches(db_path), 1):.2f} ms; "
+              f"idle: {best_ms(lambda: sync_sketches(db_path), 5):.3f} ms")
+
+        for label, filters in (("all events", FilterContext()), ("one event", FilterContext(events=("E3",)))):
+            where, params = filters.sql()
+            ordered = sorted(row[0] for row in conn.execute(f"SELECT Emission FROM Materials{where}", params))
+            exact = best_ms(lambda: sorted(row[0] for row in conn.execute(f"SELECT Emission FROM Materials{where}", params)), 3)
+            sketch_ms = best_ms(lambda: merge_sketches(emission_sketches("Materials", filters).values()), 3, cold=True)
+            approx = merge_sketches(emission_sketches("Materials", filters).values()).quantiles(QUANTILES)
+            error = max(rank_error(ordered, value, q) for value, q in zip(approx, QUANTILES))
+            print(f"{label:<10} rows={len(ordered):>8,} exact sort {exact:7.1f} ms  sketch {sketch_ms:6.1f} ms  "
+                  f"max rank error {error:.2%}")
+
+        print(f"{args.trials} x 40 merged sketches: max rank error {merged_accuracy(args.trials):.2%} "
+              f"(published bound {SKETCH_RANK_ERROR:.2%})")
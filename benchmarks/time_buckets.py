@@ -0,0 +1,89 @@
+import random
+import sqlite3
+import argparse
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from benchmarks.scratch import best_ms, scratch_database, use_org, BENCH_ORG
+from visualizations.filters import FilterContext
+from visualizations.time_buckets import GRAINS, time_buckets
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+ZONES = ("UTC", "Asia/Kolkata", "America/New_York")
+
+
+def populate(db_path: str, rows: int, events: int = 20, years: int = 3):
+    """Materials rows with random UTC timestamps over ``years`` years from 2023."""
+    rng = random.Random(0)
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc).timestamp()
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO Materials (event, Category, Weight, Quantity, Emission, Timestamp) VALUES (?, ?, 1, 1, ?, ?)",
+            [(f"E{i % events}", "Kit", rng.random() * 3,
+              datetime.fromtimestamp(start + rng.random() * years * 365 * 86400, timezone.utc).strftime("%Y-%m-%d %H:%M:%S"))
+             for i in range(rows)],
+        )
+
+
+def reference_buckets(rows, grain: str, tz: str):
+    """Per-row zoneinfo conversion, the ground truth time_buckets must match."""
+    zone, totals = ZoneInfo(tz), defaultdict(float)
+    for timestamp, emission in rows:
+        local = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).astimezone(zone)
+        local = local.replace(tzinfo=None, minute=0, second=0)
+        day = local.replace(hour=0)
+        key = {
+            "hour": local, "day": day, "week": day - timedelta(days=day.weekday()),
+            "month": day.replace(day=1), "quarter": day.replace(month=3 * ((day.month - 1) // 3) + 1, day=1),
+            "year": day.replace(month=1, day=1),
+        }[grain]
+        totals[key] += emission
+    return totals
+
+
+def check_buckets(conn: sqlite3.Connection):
+    rows = conn.execute("SELECT Timestamp, Emission FROM Materials WHERE event = 'E1'").fetchall()
+    for tz in ZONES:
+        for grain in GRAINS:
+            got = time_buckets("Materials", grain, where="event = 'E1'", tz=tz)
+            got = dict(zip(got["Bucket"].dt.to_pydatetime(), got["Emission"]))
+            expected = reference_buckets(rows, grain, tz)
+            assert got.keys() == expected.keys(), (tz, grain)
+            assert all(abs(got[key] - expected[key]) < 1e-6 for key in expected), (tz, grain)
+
+
+# 📌 Command line: python -m benchmarks.time_buckets [--rows N] from the repository root
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Epoch vs Timestamp-text range scans and calendar bucketing")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Materials rows over three years")
+    args = parser.parse_args()
+
+    with use_org(BENCH_ORG):
+        db_path = scratch_database()
+        populate(db_path, args.rows)
+        conn = sqlite3.connect(db_path)
+        check_buckets(conn)
+        print(f"time_buckets matches the zoneinfo reference for {len(ZONES)} zones x {len(GRAINS)} grains")
+
+        # The (event, Timestamp) index the Epoch index replaced, rebuilt here as the baseline
+        conn.execute("CREATE INDEX bench_event_ts ON Materials (event, Timestamp)")
+        for days in (30, 365):
+            start, end = date(2024, 3, 1), date(2024, 3, 1) + timedelta(days=days)
+            text = best_ms(lambda: conn.execute(
+                "SELECT SUM(Emission), COUNT(*) FROM Materials INDEXED BY bench_event_ts "
+                "WHERE event = ? AND Timestamp >= ? AND Timestamp < ?", ("E1", start.isoformat(), end.isoformat()),
+            ).fetchall(), 20)
+            where, params = FilterContext(events=("E1",), start=start, end=end - timedelta(days=1)).where()
+            epoch = best_ms(lambda: conn.execute(f"SELECT SUM(Emission), COUNT(*) FROM Materials WHERE {where}", params).fetchall(), 20)
+            print(f"{days:>3}-day window, one event: Timestamp index {text:6.2f} ms  Epoch index {epoch:6.2f} ms")
+        conn.execute("DROP INDEX bench_event_ts")
+
+        for grain, pattern in (("day", "%Y-%m-%d"), ("month", "%Y-%m")):
+            bucketed = best_ms(lambda: time_buckets("Materials", grain, filters=FilterContext(events=("E1",))), 3, cold=True)
+            grouped = best_ms(lambda: conn.execute(
+                f"SELECT strftime('{pattern}', Timestamp), SUM(Emission) FROM Materials WHERE event = 'E1' GROUP BY 1",
+            ).fetchall(), 3)
+            print(f"{grain:<5} buckets, one event: strftime GROUP BY {grouped:6.1f} ms  time_buckets {bucketed:6.1f} ms")
@@ -1,11 +1,197 @@
 import os
+import queue
 import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Iterator, List, Sequence, Tuple
+from zoneinfo import ZoneInfo
+import pandas as pd
 import streamlit as st
 import logging
+from resources import registry
+from tenancy import DEFAULT_DB_PATH, current_org, shard_path
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+DB_PATH = DEFAULT_DB_PATH  # Default organization's shard; also holds the shared session store
+QUERY_CACHE_SIZE = 256  # Max cached result sets per process
+POOL_SIZE = 8  # Idle connections kept per database
+
+# Timezone of date filters, time buckets and the daily rollups (timestamps are stored in UTC)
+DISPLAY_TIMEZONE = os.environ.get("EMISSIONS_TIMEZONE", "UTC")
+OFFSETS_UNTIL_YEAR = 2100  # Last year DisplayOffsets lists transitions for
+
+# Triggers that key rollups on local days; older databases carry versions keyed on UTC days
+LOCAL_DAY_TRIGGERS = ("Update_EmissionStats", "Queue_EmissionSketches", "Update_LedgerDaily")
+
+# Rollups keyed on local days and the flags of their one-time backfills, cleared to rebuild them
+LOCAL_DAY_ROLLUPS = (
+    "EmissionStats", "EmissionStatsBackfill", "EmissionSketches", "EmissionSketchQueue", "EmissionSketchBackfill",
+    "LedgerDaily", "LedgerDailyBackfill",
+)
+
+# Tables that get an integer Epoch column (Unix seconds of Timestamp), indexed on
+# (event, Epoch) plus the columns trend queries read, so range scans never touch the table
+EPOCH_TABLES = {
+    "Materials": ("event", "Emission"),
+    "TransportEmissions": ("event", "Emission"),
+    "ElectricityEmissions": ("event", "Emission", "Value"),
+    "HVACEmissions": ("event", "Emission"),
+    "FoodItemsEmissions": ("event",),
+    "FoodItems": ("event", "Emission"),
+    "Scope1": ("event",),
+    "ShipmentLegs": ("event", "Emission"),
+    "MasterEmissions": ("Event", "Emission", "Category"),
+}
+
+# Raw-data grid sort keys (visualizations/data_grid.py), one index each; SQLite appends the rowid
+# (the id key column) to every index entry, so each serves ORDER BY/seek on (column, id)
+GRID_SORT_INDEXES = {
+    "Materials": ("Epoch", "Emission"),
+    "TransportEmissions": ("Epoch", "Emission"),
+    "ElectricityEmissions": ("Epoch", "Emission"),
+    "HVACEmissions": ("Epoch", "Emission"),
+    "FoodItems": ("Epoch", "Emission"),
+}
+
+# Indexes replaced by the Epoch indexes above, dropped from databases created before them
+SUPERSEDED_INDEXES = (
+    "idx_materials_event_ts", "idx_transport_event_ts", "idx_electricity_event_ts", "idx_hvac_event_ts",
+    "idx_fooditemsemissions_event_ts", "idx_fooditems_event_ts", "idx_scope1_event_ts",
+    "idx_shipmentlegs_event_ts", "idx_master_event_ts", "idx_master_ts", "idx_masteremissions_epoch",
+)
+
+def get_db_path() -> str:
+    """Path of the active emissions database: the shard of the current organization."""
+    return shard_path(current_org())
+
+class ConnectionPool:
+    """Reusable connections to one database, so queries skip opening a file and parsing the schema.
+
+    Connections are handed to one thread at a time; a borrowed connection is rolled back before
+    it goes back, and at most ``size`` idle ones are kept.
+    """
+
+    def __init__(self, db_path: str, size: int = POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self.opened = 0
+        self._idle = queue.LifoQueue()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self.opened += 1
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            if self._idle.qsize() < self.size:
+                self._idle.put(conn)
+            else:
+                conn.close()
+
+    def check(self) -> bool:
+        with self.connection() as conn:
+            return conn.execute("SELECT 1").fetchone() == (1,)
+
+    def close(self):
+        """Close the idle connections (borrowed ones close when they come back)."""
+        self.size = 0
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+registry.register("database", ConnectionPool, close=ConnectionPool.close, health=ConnectionPool.check, per_database=True)
+
+def db_pool(db_path: str = None) -> ConnectionPool:
+    """The process-wide connection pool of a database."""
+    return registry.get("database", db_path or get_db_path())
+
+class QueryCache:
+    """Process-wide LRU cache of query results, keyed by (database, SQL, params, data version).
+
+    The data version comes from ``PRAGMA data_version`` on a long-lived monitor connection,
+    which changes whenever any other connection commits, so cached results never go stale.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._monitors = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def data_version(self, db_path: str) -> int:
+        """Current change counter of a database as seen by its monitor connection."""
+        with self._lock:
+            conn = self._monitors.get(db_path)
+            if conn is None:
+                conn = sqlite3.connect(db_path, check_same_thread=False)
+                self._monitors[db_path] = conn
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+
+            # Drop result sets of older versions as soon as a write is seen
+            if self._versions.get(db_path, version) != version:
+                for key in [k for k in self._entries if k[0] == db_path]:
+                    del self._entries[key]
+            self._versions[db_path] = version
+            return version
+
+    def query(self, sql: str, params: Sequence = (), db_path: str = None) -> Tuple[List[str], List[tuple]]:
+        """Return (column names, rows) for a query, from cache when the data hasn't changed."""
+        db_path = db_path or get_db_path()
+        key = (db_path, sql, tuple(params), self.data_version(db_path))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        with db_pool(db_path).connection() as conn:
+            cursor = conn.execute(sql, tuple(params))
+            result = ([c[0] for c in cursor.description or ()], cursor.fetchall())
+
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        """Drop all cached results and close the monitor connections."""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            for conn in self._monitors.values():
+                conn.close()
+            self._monitors.clear()
+
+# Shared by every session served by this process
+query_cache = QueryCache()
+
+def cached_query(sql: str, params: Sequence = ()) -> List[tuple]:
+    """Fetch rows through the shared query cache."""
+    return query_cache.query(sql, params)[1]
+
+def cached_read_sql(sql: str, params: Sequence = ()) -> pd.DataFrame:
+    """Fetch a DataFrame through the shared query cache (a fresh frame per call)."""
+    columns, rows = query_cache.query(sql, params)
+    return pd.DataFrame(rows, columns=columns)
+
 def create_directory(directory: str):
     """Create a directory if it doesn't exist."""
     if not os.path.exists(directory):
@@ -28,32 +214,154 @@ def execute_sql_script(cursor, script_path: str):
     except sqlite3.Error as e:
         raise sqlite3.Error(f"Failed to execute SQL script: {e}")
 
-def create_database():
-    """Initialize the database and execute the schema script."""
+def add_epoch_columns(cursor):
+    """Add the indexed integer ``Epoch`` column to every emission table that lacks it.
+
+    It is a virtual generated column over the UTC ``Timestamp`` text, so existing inserts and
+    triggers keep working unchanged and the value can never drift from the timestamp.
+    """
+    for table, (event_column, *covered) in EPOCH_TABLES.items():
+        columns = [row[1] for row in cursor.execute(f"PRAGMA table_xinfo({table})")]
+        if "Epoch" not in columns:
+            cursor.execute(
+                f"ALTER TABLE {table} ADD COLUMN Epoch INTEGER "
+                "GENERATED ALWAYS AS (CAST(strftime('%s', Timestamp) AS INTEGER)) VIRTUAL"
+            )
+            logging.info(f"Added Epoch column to {table}")
+        index_columns = ", ".join([event_column, "Epoch", *covered])
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_event_epoch ON {table} ({index_columns})")
+    for table, sort_columns in GRID_SORT_INDEXES.items():
+        for column in sort_columns:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_sort_{column.lower()} ON {table} ({column})")
+    # Covers unfiltered time buckets and the chatbot's ledger totals without touching the table
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_masteremissions_epoch_totals "
+        "ON MasterEmissions (Epoch, SourceTable, Category, Emission)"
+    )
+
+def drop_superseded_indexes(cursor):
+    """Migration: drop the Timestamp/Epoch indexes older databases still carry.
+
+    New databases never create them; only indexes that actually exist are dropped.
+    """
+    existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    for name in SUPERSEDED_INDEXES:
+        if name in existing:
+            cursor.execute(f"DROP INDEX {name}")
+            logging.info(f"Dropped superseded index {name}")
+
+def add_shipment_reference_index(cursor):
+    """Make shipment references unique per event, so a manifest cannot be saved twice.
+
+    Databases that already hold repeated references keep working without the index; saving
+    still skips references the event already has.
+    """
+    try:
+        cursor.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_shipments_event_reference ON Shipments (event, Reference)"
+        )
+    except sqlite3.IntegrityError as e:
+        logging.warning(f"Shipments has repeated references per event, unique index not created: {e}")
+
+@lru_cache(maxsize=None)
+def display_offsets(tz: str) -> Tuple[Tuple[int, int], ...]:
+    """(from epoch, UTC offset in seconds) rows for DisplayOffsets: one per offset change of ``tz``.
+
+    Days are scanned from 1970 to ``OFFSETS_UNTIL_YEAR``; a day whose offset changed is bisected
+    to the second of the transition. The first row also covers every earlier timestamp.
+    """
+    zone = ZoneInfo(tz)
+
+    def offset(epoch: int) -> int:
+        return int(datetime.fromtimestamp(epoch, timezone.utc).astimezone(zone).utcoffset().total_seconds())
+
+    rows = [(-2 ** 62, offset(0))]
+    until = int(datetime(OFFSETS_UNTIL_YEAR + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+    for day in range(0, until, 86400):
+        if offset(day + 86400) != rows[-1][1]:
+            low, high = day, day + 86400
+            while high - low > 1:
+                middle = (low + high) // 2
+                low, high = (middle, high) if offset(middle) == rows[-1][1] else (low, middle)
+            rows.append((high, offset(high)))
+    return tuple(rows)
+
+def sync_display_offsets(cursor, script_path: str):
+    """Migration: key the daily rollups on local days of ``DISPLAY_TIMEZONE``.
+
+    When the stored offsets differ from the timezone's (a new database, or EMISSIONS_TIMEZONE
+    changed) or the rollup triggers still use UTC days, the offsets are rewritten, the rollups
+    cleared and the schema script run again to recreate the triggers and backfill from the sources.
+    """
+    offsets = display_offsets(DISPLAY_TIMEZONE)
+    stored = tuple(cursor.execute("SELECT FromEpoch, Offset FROM DisplayOffsets ORDER BY FromEpoch").fetchall())
+    names = ", ".join("?" for _ in LOCAL_DAY_TRIGGERS)
+    stale = [name for name, sql in cursor.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({names})", LOCAL_DAY_TRIGGERS)
+        if "DisplayOffsets" not in sql]
+    if stored == offsets and not stale:
+        return
+    for name in stale:
+        cursor.execute(f"DROP TRIGGER {name}")
+    cursor.execute("DELETE FROM DisplayOffsets")
+    cursor.executemany("INSERT INTO DisplayOffsets (FromEpoch, Offset) VALUES (?, ?)", offsets)
+    for table in LOCAL_DAY_ROLLUPS:
+        cursor.execute(f"DELETE FROM {table}")
+    execute_sql_script(cursor, script_path)
+    logging.info(f"Rebuilt daily rollups on {DISPLAY_TIMEZONE} days")
+
+def create_database(db_path: str = None):
+    """Initialize a database (the active shard by default) and execute the schema script.
+
+    The script only creates what is missing, so running it again migrates an existing shard.
+    """
     try:
         # Create data directory if it doesn't exist
         data_dir = 'data'
         create_directory(data_dir)
 
         # Connect to the database
-        db_path = os.path.join(data_dir, 'emissions.db')
+        db_path = db_path or get_db_path()
+        create_directory(os.path.dirname(db_path) or data_dir)
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
 
+        # Write-ahead logging: app replicas sharing the file read while another one writes
+        cursor.execute("PRAGMA journal_mode=WAL")
+
         # Execute the SQL script
         sql_script_path = os.path.join(data_dir, 'emissions.sql')
         execute_sql_script(cursor, sql_script_path)
+        add_epoch_columns(cursor)
+        drop_superseded_indexes(cursor)
+        add_shipment_reference_index(cursor)
+        sync_display_offsets(cursor, sql_script_path)
 
         # Commit changes and close the connection
         conn.commit()
-        logging.info("Database initialized successfully.")
+        logging.info(f"Database initialized successfully: {db_path}")
+        return True
     except sqlite3.Error as e:
         st.error(f"An error occurred while creating the database: {e}")
         logging.error(f"Database initialization failed: {e}")
+        return False
     except Exception as e:
         st.error(f"An unexpected error occurred: {e}")
         logging.error(f"Unexpected error: {e}")
+        return False
     finally:
         if 'conn' in locals():
             conn.close()
-            logging.info("Database connection closed.")
\ No newline at end of file
+            logging.info("Database connection closed.")
+
+_initialized = set()
+_initialized_lock = threading.Lock()
+
+def ensure_database(db_path: str = None):
+    """Create or migrate a database once per process, instead of on every rerun."""
+    db_path = db_path or get_db_path()
+    with _initialized_lock:
+        if db_path in _initialized:
+            return
+        if create_database(db_path):
+            _initialized.add(db_path)
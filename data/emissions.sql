@@ -209,3 +209,367 @@ BEGIN
 
 END;
 
+
+-- Shipments Table (one row per consignment)
+CREATE TABLE IF NOT EXISTS Shipments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event TEXT NOT NULL,
+    Reference TEXT,
+    Material TEXT NOT NULL,
+    Weight REAL NOT NULL,  -- kg
+    Origin TEXT NOT NULL,
+    Destination TEXT NOT NULL,
+    Emission REAL NOT NULL,  -- Sum of leg emissions in kg CO₂
+    Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (event) REFERENCES Events(name) ON UPDATE CASCADE
+);
+
+-- Shipment Legs Table (truck → rail → truck, ...)
+CREATE TABLE IF NOT EXISTS ShipmentLegs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    shipment_id INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    LegNo INTEGER NOT NULL,
+    Mode TEXT NOT NULL,
+    Origin TEXT NOT NULL,
+    Destination TEXT NOT NULL,
+    Distance REAL NOT NULL,  -- km
+    Weight REAL NOT NULL,  -- kg
+    TonneKm REAL NOT NULL,
+    Emission REAL NOT NULL,  -- Emissions in kg CO₂
+    Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (shipment_id) REFERENCES Shipments(id) ON DELETE CASCADE,
+    FOREIGN KEY (event) REFERENCES Events(name) ON UPDATE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_shipmentlegs_shipment ON ShipmentLegs (shipment_id);
+
+-- Trigger for shipment legs (logistics is Scope 3)
+CREATE TRIGGER IF NOT EXISTS Insert_ShipmentLegs
+AFTER INSERT ON ShipmentLegs
+BEGIN
+    INSERT INTO MasterEmissions
+        (SourceTable, Category, Event, Description, Quantity, Weight, Emission, Timestamp)
+    VALUES
+        ('ShipmentLegs', 'Scope3', NEW.event, NEW.Mode, NEW.Distance, NEW.Weight, NEW.Emission, CURRENT_TIMESTAMP);
+END;
+
+-- Event/date indexes backing the shared visualization filters are built on the integer
+-- Epoch columns that common.add_epoch_columns() adds after this script runs
+
+-- UTC offset of the display timezone (EMISSIONS_TIMEZONE) from each of its transitions on, so the
+-- daily rollups below key on local days like the visualization filters do; written by
+-- common.sync_display_offsets(), which rebuilds the rollups whenever the offsets change
+CREATE TABLE IF NOT EXISTS DisplayOffsets (
+    FromEpoch INTEGER PRIMARY KEY,
+    Offset INTEGER NOT NULL  -- Seconds east of UTC
+);
+
+-- Running statistics per (source table, event, category, local day), maintained on insert
+-- Mean/M2 follow Welford's update, so variance stays exact without re-reading rows
+CREATE TABLE IF NOT EXISTS EmissionStats (
+    SourceTable TEXT NOT NULL,
+    Event TEXT NOT NULL,
+    Category TEXT NOT NULL,  -- Material category, vehicle, usage, refrigerant, food item, fuel or mode
+    Day TEXT NOT NULL,  -- Local date of Timestamp (DisplayOffsets)
+    Count INTEGER NOT NULL,
+    Total REAL NOT NULL,
+    Mean REAL NOT NULL,
+    M2 REAL NOT NULL,  -- Sum of squared deviations from Mean
+    MinValue REAL NOT NULL,
+    MaxValue REAL NOT NULL,
+    PeakTimestamp DATETIME,  -- Timestamp of MaxValue
+    LatestTimestamp DATETIME,
+    PRIMARY KEY (SourceTable, Event, Category, Day)
+);
+
+-- Every source trigger inserts its line items here; the INSTEAD OF trigger folds them into EmissionStats
+CREATE VIEW IF NOT EXISTS EmissionStatsFeed AS
+    SELECT SourceTable, Event, Category, LatestTimestamp AS Timestamp, MaxValue AS Value
+    FROM EmissionStats WHERE 0;
+
+CREATE TRIGGER IF NOT EXISTS Update_EmissionStats
+INSTEAD OF INSERT ON EmissionStatsFeed
+BEGIN
+    INSERT INTO EmissionStats
+        (SourceTable, Event, Category, Day, Count, Total, Mean, M2, MinValue, MaxValue, PeakTimestamp, LatestTimestamp)
+    VALUES
+        (NEW.SourceTable, NEW.Event, COALESCE(NEW.Category, ''),
+         date(NEW.Timestamp, COALESCE((SELECT Offset FROM DisplayOffsets WHERE FromEpoch <= CAST(strftime('%s', NEW.Timestamp) AS INTEGER)
+             ORDER BY FromEpoch DESC LIMIT 1), 0) || ' seconds'),
+         1, NEW.Value, NEW.Value, 0, NEW.Value, NEW.Value, NEW.Timestamp, NEW.Timestamp)
+    ON CONFLICT (SourceTable, Event, Category, Day) DO UPDATE SET
+        Count = Count + 1,
+        Total = Total + excluded.Total,
+        Mean = Mean + (excluded.Mean - Mean) / (Count + 1),
+        M2 = M2 + (excluded.Mean - Mean) * (excluded.Mean - Mean) * Count / (Count + 1),
+        MinValue = MIN(MinValue, excluded.MinValue),
+        MaxValue = MAX(MaxValue, excluded.MaxValue),
+        PeakTimestamp = CASE WHEN excluded.MaxValue > MaxValue THEN excluded.PeakTimestamp ELSE PeakTimestamp END,
+        LatestTimestamp = MAX(LatestTimestamp, excluded.LatestTimestamp);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Stats_Materials
+AFTER INSERT ON Materials
+BEGIN
+    INSERT INTO EmissionStatsFeed (SourceTable, Event, Category, Timestamp, Value)
+    VALUES ('Materials', NEW.event, NEW.Category, NEW.Timestamp, NEW.Emission);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Stats_TransportEmissions
+AFTER INSERT ON TransportEmissions
+BEGIN
+    INSERT INTO EmissionStatsFeed (SourceTable, Event, Category, Timestamp, Value)
+    VALUES ('TransportEmissions', NEW.event, NEW.Vehicle, NEW.Timestamp, NEW.Emission);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Stats_ElectricityEmissions
+AFTER INSERT ON ElectricityEmissions
+BEGIN
+    INSERT INTO EmissionStatsFeed (SourceTable, Event, Category, Timestamp, Value)
+    VALUES ('ElectricityEmissions', NEW.event, NEW.Usage, NEW.Timestamp, NEW.Emission);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Stats_HVACEmissions
+AFTER INSERT ON HVACEmissions
+BEGIN
+    INSERT INTO EmissionStatsFeed (SourceTable, Event, Category, Timestamp, Value)
+    VALUES ('HVACEmissions', NEW.event, NEW.Refrigerant, NEW.Timestamp, NEW.Emission);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Stats_FoodItems
+AFTER INSERT ON FoodItems
+BEGIN
+    INSERT INTO EmissionStatsFeed (SourceTable, Event, Category, Timestamp, Value)
+    VALUES ('FoodItems', NEW.event, NEW.FoodItem, NEW.Timestamp, NEW.Emission);
+END;
+
+CREATE TRIGGER IF NOT EXISTS Stats_FoodItemsEmissions
+AFTER INSERT ON FoodItemsEmissions
+BEGIN
+    INSERT INTO EmissionStatsFeed (SourceTable, Event, Category, Timestamp, Value)
+    SELECT 'FoodItemsEmissions', NEW.event, item.value, NEW.Timestamp, CAST(em.value AS REAL)
+    FROM json_each(NEW.food_items) AS item
+    JOIN json_each(NEW.emission) AS em ON em.key = item.key;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Stats_Scope1
+AFTER INSERT ON Scope1
+BEGIN
+    INSERT INTO EmissionStatsFeed (SourceTable, Event, Category, Timestamp, Value)
+    SELECT 'Scope1', NEW.event, fuel.value, NEW.Timestamp, CAST(em.value AS REAL)
+    FROM json_each(NEW.fuels) AS fuel
+    JOIN json_each(NEW.emissions) AS em ON em.key = fuel.key;
+END;
+
+CREATE TRIGGER IF NOT EXISTS Stats_ShipmentLegs
+AFTER INSERT ON ShipmentLegs
+BEGIN
+    INSERT INTO EmissionStatsFeed (SourceTable, Event, Category, Timestamp, Value)
+    VALUES ('ShipmentLegs', NEW.event, NEW.Mode, NEW.Timestamp, NEW.Emission);
+END;
+
+-- Line items of every source, as the statistics see them (used to roll up rows older than the triggers)
+CREATE VIEW IF NOT EXISTS EmissionStatsSource AS
+    SELECT 'Materials' AS SourceTable, event AS Event, Category, Timestamp, Emission AS Value FROM Materials
+    UNION ALL SELECT 'TransportEmissions', event, Vehicle, Timestamp, Emission FROM TransportEmissions
+    UNION ALL SELECT 'ElectricityEmissions', event, Usage, Timestamp, Emission FROM ElectricityEmissions
+    UNION ALL SELECT 'HVACEmissions', event, Refrigerant, Timestamp, Emission FROM HVACEmissions
+    UNION ALL SELECT 'FoodItems', event, FoodItem, Timestamp, Emission FROM FoodItems
+    UNION ALL SELECT 'FoodItemsEmissions', f.event, item.value, f.Timestamp, CAST(em.value AS REAL)
+        FROM FoodItemsEmissions AS f, json_each(f.food_items) AS item
+        JOIN json_each(f.emission) AS em ON em.key = item.key
+    UNION ALL SELECT 'Scope1', s.event, fuel.value, s.Timestamp, CAST(em.value AS REAL)
+        FROM Scope1 AS s, json_each(s.fuels) AS fuel
+        JOIN json_each(s.emissions) AS em ON em.key = fuel.key
+    UNION ALL SELECT 'ShipmentLegs', event, Mode, Timestamp, Emission FROM ShipmentLegs;
+
+-- One-time rollup of the rows that predate the statistics triggers
+CREATE TABLE IF NOT EXISTS EmissionStatsBackfill (done INTEGER NOT NULL);
+
+INSERT INTO EmissionStats
+    (SourceTable, Event, Category, Day, Count, Total, Mean, M2, MinValue, MaxValue, PeakTimestamp, LatestTimestamp)
+SELECT SourceTable, Event, Category, Day, COUNT(*), SUM(Value), AVG(Value),
+       SUM((Value - GroupMean) * (Value - GroupMean)), MIN(Value), MAX(Value), MAX(Peak), MAX(Timestamp)
+FROM (
+    SELECT SourceTable, Event, Category, Day, Value, Timestamp,
+           AVG(Value) OVER day_group AS GroupMean,
+           FIRST_VALUE(Timestamp) OVER (day_group ORDER BY Value DESC, Timestamp) AS Peak
+    FROM (
+        SELECT SourceTable, Event, COALESCE(Category, '') AS Category, Value, Timestamp,
+               date(Timestamp, COALESCE((SELECT Offset FROM DisplayOffsets WHERE FromEpoch <= CAST(strftime('%s', Timestamp) AS INTEGER)
+                   ORDER BY FromEpoch DESC LIMIT 1), 0) || ' seconds') AS Day
+        FROM (SELECT 1 WHERE NOT EXISTS (SELECT 1 FROM EmissionStatsBackfill)) AS pending  -- Checked once, before the scan
+        CROSS JOIN EmissionStatsSource
+        WHERE Event IS NOT NULL AND Value IS NOT NULL
+    )
+    WINDOW day_group AS (PARTITION BY SourceTable, Event, Category, Day)
+)
+GROUP BY SourceTable, Event, Category, Day;
+
+INSERT INTO EmissionStatsBackfill (done) SELECT 1 WHERE NOT EXISTS (SELECT 1 FROM EmissionStatsBackfill);
+
+-- Serialized KLL quantile sketches per (source table, event, category, local day)
+CREATE TABLE IF NOT EXISTS EmissionSketches (
+    SourceTable TEXT NOT NULL,
+    Event TEXT NOT NULL,
+    Category TEXT NOT NULL,
+    Day TEXT NOT NULL,
+    Count INTEGER NOT NULL,
+    Sketch BLOB NOT NULL,  -- visualizations.sketches.KLLSketch.to_bytes()
+    PRIMARY KEY (SourceTable, Event, Category, Day)
+);
+
+-- Values waiting to be folded into EmissionSketches (the sketch update runs in Python)
+CREATE TABLE IF NOT EXISTS EmissionSketchQueue (
+    id INTEGER PRIMARY KEY,
+    SourceTable TEXT NOT NULL,
+    Event TEXT NOT NULL,
+    Category TEXT NOT NULL,
+    Day TEXT NOT NULL,
+    Value REAL NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS Queue_EmissionSketches
+INSTEAD OF INSERT ON EmissionStatsFeed
+BEGIN
+    INSERT INTO EmissionSketchQueue (SourceTable, Event, Category, Day, Value)
+    VALUES (NEW.SourceTable, NEW.Event, COALESCE(NEW.Category, ''),
+            date(NEW.Timestamp, COALESCE((SELECT Offset FROM DisplayOffsets WHERE FromEpoch <= CAST(strftime('%s', NEW.Timestamp) AS INTEGER)
+                ORDER BY FromEpoch DESC LIMIT 1), 0) || ' seconds'),
+            NEW.Value);
+END;
+
+-- One-time queueing of the rows that predate the sketches
+CREATE TABLE IF NOT EXISTS EmissionSketchBackfill (done INTEGER NOT NULL);
+
+INSERT INTO EmissionSketchQueue (SourceTable, Event, Category, Day, Value)
+SELECT SourceTable, Event, COALESCE(Category, ''),
+       date(Timestamp, COALESCE((SELECT Offset FROM DisplayOffsets WHERE FromEpoch <= CAST(strftime('%s', Timestamp) AS INTEGER)
+           ORDER BY FromEpoch DESC LIMIT 1), 0) || ' seconds'),
+       Value
+FROM (SELECT 1 WHERE NOT EXISTS (SELECT 1 FROM EmissionSketchBackfill)) AS pending  -- Checked once, before the scan
+CROSS JOIN EmissionStatsSource
+WHERE Event IS NOT NULL AND Value IS NOT NULL;
+
+INSERT INTO EmissionSketchBackfill (done) SELECT 1 WHERE NOT EXISTS (SELECT 1 FROM EmissionSketchBackfill);
+
+-- Reduction tips and methodology notes searched by the chatbot (app_pages/tips_retrieval.py)
+CREATE TABLE IF NOT EXISTS reduction_tips_table (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tip TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'tip' CHECK (kind IN ('tip', 'methodology')),
+    SourceTable TEXT  -- Ledger source the text is about; NULL for general advice
+);
+
+-- One-time seed of the built-in corpus
+CREATE TABLE IF NOT EXISTS ReductionTipsSeed (done INTEGER NOT NULL);
+
+INSERT INTO reduction_tips_table (tip, kind, SourceTable)
+SELECT column1, column2, column3
+FROM (SELECT 1 WHERE NOT EXISTS (SELECT 1 FROM ReductionTipsSeed)) AS pending
+CROSS JOIN (VALUES
+    ('Use public transportation instead of driving alone', 'tip', NULL),
+    ('Switch to LED light bulbs', 'tip', NULL),
+    ('Reduce meat consumption, especially beef', 'tip', NULL),
+    ('Buy locally produced goods when possible', 'tip', NULL),
+    ('Use a programmable thermostat to reduce energy use', 'tip', NULL),
+    ('Properly insulate your home', 'tip', NULL),
+    ('Reduce, reuse, recycle in that order', 'tip', NULL),
+    ('Consider offsetting your carbon footprint through verified programs', 'tip', NULL),
+    ('Replace metal trophies and momentoes with recycled or plastic-free alternatives; metal has the highest material factor', 'tip', 'Materials'),
+    ('Print fewer banners and reuse generic banners across events instead of printing event-specific ones', 'tip', 'Materials'),
+    ('Hand out seed-paper and recycled-paper kits instead of new plastic merchandise', 'tip', 'Materials'),
+    ('Encourage attendees to carpool or take buses and trains to the event instead of private cars', 'tip', 'TransportEmissions'),
+    ('Prefer electric two-wheelers and four-wheelers for staff and shuttle travel', 'tip', 'TransportEmissions'),
+    ('Pick a venue reachable by local train or metro to cut road travel emissions', 'tip', 'TransportEmissions'),
+    ('Switch lighting to LEDs and turn off lights and electrical equipment when halls are empty', 'tip', 'ElectricityEmissions'),
+    ('Source electricity from solar, wind or hydroelectric supply; their factors are a fraction of grid power', 'tip', 'ElectricityEmissions'),
+    ('Raise cooling set points by one or two degrees and close doors while air conditioning is running', 'tip', 'ElectricityEmissions'),
+    ('Check air conditioning units for refrigerant leaks before every event season', 'tip', 'HVACEmissions'),
+    ('Replace units running R-404A or R-410A with low global warming refrigerants such as R-290 or R-1234yf', 'tip', 'HVACEmissions'),
+    ('Have refrigerant recovered by certified technicians when servicing or scrapping HVAC equipment', 'tip', 'HVACEmissions'),
+    ('Serve vegetarian menus; beef, butter and paneer dishes have the highest food factors', 'tip', 'FoodItems'),
+    ('Plan catering quantities from registrations to avoid food waste', 'tip', 'FoodItems'),
+    ('Buy seasonal vegetables and grains from local suppliers for catering', 'tip', 'FoodItems'),
+    ('Cut diesel generator hours by connecting to grid or renewable power', 'tip', 'Scope1'),
+    ('Service generators and LPG burners regularly so they burn fuel efficiently', 'tip', 'Scope1'),
+    ('Replace coal and diesel fired equipment with electric alternatives', 'tip', 'Scope1'),
+    ('Consolidate shipments and ship full loads instead of several partial ones', 'tip', 'ShipmentLegs'),
+    ('Move freight legs from road and air to rail or sea where delivery times allow', 'tip', 'ShipmentLegs'),
+    ('Carbon emissions are the carbon dioxide (CO₂) and other greenhouse gases released into the atmosphere, mostly by burning fossil fuels in vehicles, power plants and industry. They drive the greenhouse effect and climate change.', 'methodology', NULL),
+    ('Scope 1 emissions are direct emissions from sources you own or control, such as diesel generators, LPG and coal burned on site. They are calculated as fuel consumed times the fuel emission factor.', 'methodology', 'Scope1'),
+    ('Scope 2 emissions are indirect emissions from purchased energy: electricity used for lighting and cooling, and refrigerant leaks from HVAC units, counted as consumption or mass leaked times its emission factor.', 'methodology', 'ElectricityEmissions'),
+    ('Scope 3 emissions are other indirect emissions in your value chain: attendee and staff transport, materials such as trophies and banners, catering food and shipments.', 'methodology', NULL),
+    ('Emission factors convert an activity into kilograms of CO₂ equivalent (kg CO₂e), for example kg CO₂ per kWh, per km travelled or per kg of food. Every emission is the activity amount times its factor.', 'methodology', NULL),
+    ('Refrigerant leaks are counted with the global warming potential of the refrigerant: one kilogram of R-404A leaked equals 3922 kg CO₂e, one kilogram of R-290 only 3 kg CO₂e.', 'methodology', 'HVACEmissions'),
+    ('Transport emissions are calculated from the distance travelled times the vehicle emission factor per km, divided among passengers when a vehicle is shared; electric vehicles use their energy per km times the grid electricity factor.', 'methodology', 'TransportEmissions'),
+    ('Food emissions are calculated as the quantity of each food item or dish times its emission factor per kg or per serving.', 'methodology', 'FoodItemsEmissions'),
+    ('Every calculator writes to its own table, and triggers copy each line item into the MasterEmissions ledger with its scope, event and timestamp. Totals, trends and the chatbot read from that ledger.', 'methodology', NULL)
+);
+
+INSERT INTO ReductionTipsSeed (done) SELECT 1 WHERE NOT EXISTS (SELECT 1 FROM ReductionTipsSeed);
+
+-- Full chatbot transcripts; sessions keep only a recent window in memory (app_pages/chat_history.py)
+CREATE TABLE IF NOT EXISTS ChatTranscripts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    SessionId TEXT NOT NULL,
+    Username TEXT,
+    Seq INTEGER NOT NULL,  -- Position of the message within its session
+    Role TEXT NOT NULL CHECK (Role IN ('user', 'assistant')),
+    Content TEXT NOT NULL,
+    Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_chattranscripts_session_seq ON ChatTranscripts (SessionId, Seq);
+
+-- Small, critical session keys shared by every app replica (session_store.py); rows expire by TTL
+CREATE TABLE IF NOT EXISTS SessionStore (
+    SessionId TEXT PRIMARY KEY,
+    Data TEXT NOT NULL,  -- JSON of the persisted session_state keys
+    Expires REAL NOT NULL  -- Unix time
+);
+
+CREATE INDEX IF NOT EXISTS idx_sessionstore_expires ON SessionStore (Expires);
+
+-- Daily ledger totals (local days) behind the sidebar Quick Stats, maintained on insert
+CREATE TABLE IF NOT EXISTS LedgerDaily (
+    Day TEXT PRIMARY KEY,  -- Local date of Timestamp (DisplayOffsets)
+    Count INTEGER NOT NULL,
+    Total REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS Update_LedgerDaily
+AFTER INSERT ON MasterEmissions
+WHEN NEW.Timestamp IS NOT NULL
+BEGIN
+    INSERT INTO LedgerDaily (Day, Count, Total)
+    VALUES (date(NEW.Timestamp, COALESCE((SELECT Offset FROM DisplayOffsets WHERE FromEpoch <= CAST(strftime('%s', NEW.Timestamp) AS INTEGER)
+                ORDER BY FromEpoch DESC LIMIT 1), 0) || ' seconds'),
+            1, NEW.Emission)
+    ON CONFLICT (Day) DO UPDATE SET Count = Count + 1, Total = Total + excluded.Total;
+END;
+
+-- One-time rollup of ledger rows that predate the trigger
+CREATE TABLE IF NOT EXISTS LedgerDailyBackfill (done INTEGER NOT NULL);
+
+INSERT INTO LedgerDaily (Day, Count, Total)
+SELECT Day, COUNT(*), SUM(Emission)
+FROM (
+    SELECT date(Timestamp, COALESCE((SELECT Offset FROM DisplayOffsets WHERE FromEpoch <= CAST(strftime('%s', Timestamp) AS INTEGER)
+               ORDER BY FromEpoch DESC LIMIT 1), 0) || ' seconds') AS Day,
+           Emission
+    FROM (SELECT 1 WHERE NOT EXISTS (SELECT 1 FROM LedgerDailyBackfill)) AS pending
+    CROSS JOIN MasterEmissions
+    WHERE Timestamp IS NOT NULL
+)
+GROUP BY Day
+ON CONFLICT (Day) DO UPDATE SET Count = Count + excluded.Count, Total = Total + excluded.Total;
+
+INSERT INTO LedgerDailyBackfill (done) SELECT 1 WHERE NOT EXISTS (SELECT 1 FROM LedgerDailyBackfill);
+
+-- Annual emission budgets the Quick Stats measure progress against
+CREATE TABLE IF NOT EXISTS EmissionTargets (
+    Year INTEGER PRIMARY KEY,
+    Target REAL NOT NULL CHECK (Target > 0)  -- kg CO₂e allowed for the calendar year
+);
@@ -2,6 +2,7 @@ import streamlit as st
 import sqlite3
 import logging
 from typing import Dict, Tuple
+from common import get_db_path
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -62,7 +63,7 @@ def calculate_hvac_emission(refrigerant: str, mass_leak: float) -> float:
 def insert_electricity_data(event: str, category: str, value: float, emission: float):
     """Insert electricity emission data into the database."""
     try:
-        with sqlite3.connect("data/emissions.db") as conn:
+        with sqlite3.connect(get_db_path()) as conn:
             c = conn.cursor()
             c.execute(
                 "INSERT INTO ElectricityEmissions (event, Usage, Value, Emission) VALUES (?, ?, ?, ?)",
@@ -78,7 +79,7 @@ def insert_electricity_data(event: str, category: str, value: float, emission: f
 def insert_hvac_data(event: str, refrigerant: str, mass_leak: float, emission: float):
     """Insert HVAC emission data into the database."""
     try:
-        with sqlite3.connect("data/emissions.db") as conn:
+        with sqlite3.connect(get_db_path()) as conn:
             c = conn.cursor()
             c.execute(
                 "INSERT INTO HVACEmissions (event, Refrigerant, MassLeak, Emission) VALUES (?, ?, ?, ?)",
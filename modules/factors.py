@@ -0,0 +1,63 @@
+import math
+import logging
+from types import MappingProxyType
+from typing import Iterator, Mapping, Optional
+from modules.electricity import ELECTRICITY_EMISSION_FACTORS, HVAC_REFRIGERANTS
+from modules.food import DISHES_EMISSION_FACTORS, FOOD_EMISSION_FACTORS
+from modules.material import EMISSION_FACTORS as MATERIAL_EMISSION_FACTORS
+from modules.sc1_emissions import EMISSION_FACTORS as FUEL_EMISSION_FACTORS
+from modules.transport import ELECTRIC_CONSUMPTION, EMISSION_FACTORS as TRANSPORT_EMISSION_FACTORS
+from resources import registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class FactorRegistry:
+    """Read-only view of every calculator's emission factors, keyed by ledger SourceTable and item.
+
+    Materials map each category to its per-material factors; every other source maps an item
+    (as stored in MasterEmissions.Description) straight to its factor.
+    """
+
+    def __init__(self):
+        tables = {
+            "Materials": {category: MappingProxyType(dict(materials))
+                          for category, materials in MATERIAL_EMISSION_FACTORS.items()},
+            "TransportEmissions": {vehicle: factor for vehicles in TRANSPORT_EMISSION_FACTORS.values()
+                                   for vehicle, factor in vehicles.items()},
+            "ElectricConsumption": dict(ELECTRIC_CONSUMPTION),
+            "ElectricityEmissions": dict(ELECTRICITY_EMISSION_FACTORS),
+            "HVACEmissions": {name: factors["EF (kg CO₂eq/kg)"] for name, factors in HVAC_REFRIGERANTS.items()},
+            "FoodItemsEmissions": dict(FOOD_EMISSION_FACTORS),
+            "FoodItems": dict(DISHES_EMISSION_FACTORS),
+            "Scope1": dict(FUEL_EMISSION_FACTORS),
+        }
+        self.tables: Mapping[str, Mapping] = MappingProxyType(
+            {source: MappingProxyType(table) for source, table in tables.items()})
+
+    def items(self) -> Iterator[str]:
+        """Every item name, source by source."""
+        for table in self.tables.values():
+            yield from table
+
+    def factor(self, source: str, item: str, material: Optional[str] = None) -> Optional[float]:
+        """Factor of an item (and, for Materials, one of its materials); None when unknown."""
+        value = self.tables.get(source, {}).get(item)
+        if isinstance(value, Mapping):
+            return value.get(material) if material else None
+        return value
+
+    def check(self) -> bool:
+        """True when every factor is a finite, non-negative number."""
+        values = [v for table in self.tables.values() for entry in table.values()
+                  for v in (entry.values() if isinstance(entry, Mapping) else (entry,))]
+        return all(isinstance(v, (int, float)) and math.isfinite(v) and v >= 0 for v in values)
+
+
+registry.register("emission_factors", FactorRegistry, health=FactorRegistry.check)
+
+
+def get_emission_factors() -> FactorRegistry:
+    """The shared factor registry."""
+    return registry.get("emission_factors")
@@ -3,6 +3,8 @@ import sqlite3
 import json
 import logging
 from typing import List  # Only import what is needed
+from common import get_db_path
+from session_store import persist_key
 
 
 # Configure logging
@@ -40,6 +42,9 @@ DISHES_EMISSION_FACTORS = {
     "Strawberry ice cream": 1.98 * 3.94 * 11.52,  # oil, fresh cream, butter
 }
 
+# Food rows entered but not yet saved survive a move to another app replica
+persist_key("food_entries")
+
 # 🧮 Calculate Food Emission
 def calculate_food_emission(food_item: str, quantity: float) -> float:
     """Calculate emissions based on food consumption."""
@@ -54,7 +59,7 @@ def calculate_dish_emission(dish: str, quantity: float) -> float:
 def insert_food_data(event: str, food_items: List[str], quantities: List[float], emissions: List[float], total_emission: float):
     """Insert multiple food entries into the database."""
     try:
-        with sqlite3.connect("data/emissions.db") as conn:
+        with sqlite3.connect(get_db_path()) as conn:
             c = conn.cursor()
 
             # Convert lists to JSON strings for storage
@@ -79,7 +84,7 @@ def insert_food_data(event: str, food_items: List[str], quantities: List[float],
 def insert_dish_data(event: str, dish: str, quantity: float, emission: float):
     """Insert dish emission data into the database."""
     try:
-        with sqlite3.connect("data/emissions.db") as conn:
+        with sqlite3.connect(get_db_path()) as conn:
             c = conn.cursor()
             c.execute(
                 "INSERT INTO FoodItems (event, FoodItem, Quantity, Emission) VALUES (?, ?, ?, ?)",
@@ -131,7 +136,7 @@ def show_food_calculator(event):
             with cols[2]:  # Remove Entry Button
                 if st.button("Remove", key=f"remove_{index}"):
                     st.session_state.food_entries = [e for e in st.session_state.food_entries if e["id"] != index]
-                    st.rerun()
+                    st.rerun(scope="fragment")
 
             emission = calculate_food_emission(food_item, quantity)
             total_emission += emission
@@ -155,7 +160,7 @@ def show_food_calculator(event):
         if st.button("Add Another Food Item"):
             new_id = max([e["id"] for e in st.session_state.food_entries], default=-1) + 1
             st.session_state.food_entries.append({"id": new_id, "food_item": "Beef", "quantity": 1.0})
-            st.rerun()
+            st.rerun(scope="fragment")
 
     with tab2:
         st.subheader("Dishes & Curries")
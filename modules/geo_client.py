@@ -0,0 +1,259 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import streamlit as st
+import openrouteservice
+from requests.adapters import HTTPAdapter
+from openrouteservice.exceptions import ApiError, HTTPError, Timeout
+
+from modules.routing import get_routing_engine
+from resources import registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# API Key for OpenRouteService; without it only the offline network is used for routing
+ORS_API_KEY = os.getenv("ORS_API_KEY")
+ORS_BASE_URL = os.getenv("ORS_BASE_URL", "https://api.openrouteservice.org")
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", 20000))  # Places kept per process
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", 20000))  # Routed pairs kept per process
+
+if not ORS_API_KEY:
+    logging.warning("ORS_API_KEY is not set: places outside the offline network cannot be routed")
+
+MISSING = object()  # Cache miss marker (None is a cached "not found")
+
+
+class LRUCache:
+    """Thread-safe mapping that keeps only the ``max_entries`` most recently used items."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# 📦 Process-wide geocode and route caches, shared with the interactive calculator
+GEOCODE_CACHE = LRUCache(GEOCODE_CACHE_SIZE)  # place key -> (lat, lon) or None
+ROUTE_CACHE = LRUCache(ROUTE_CACHE_SIZE)  # (origin, destination, profile) -> km
+
+ProgressCallback = Callable[[int, int, str], None]
+
+
+def _close_ors_client(client: openrouteservice.Client):
+    session = getattr(client, "_session", None)
+    if session is not None:
+        session.close()
+
+
+# One interactive client (and its HTTP connection pool) for the whole process
+registry.register("ors_client", lambda: openrouteservice.Client(key=ORS_API_KEY), close=_close_ors_client,
+                  health=lambda client: bool(ORS_API_KEY))
+
+
+def get_ors_client() -> Optional[openrouteservice.Client]:
+    """The shared OpenRouteService client used by the interactive calculators, or None without a key."""
+    return registry.get("ors_client") if ORS_API_KEY else None
+
+
+def place_key(place: str) -> str:
+    """Normalise a place name for deduplication and cache lookups."""
+    return " ".join(place.split()).lower()
+
+
+def route_key(origin: str, destination: str, profile: str) -> Tuple[str, str, str]:
+    """Cache key for a routed distance."""
+    return (place_key(origin), place_key(destination), profile)
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter (``rate`` requests per second, bursts up to ``capacity``)."""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class BatchRoutingClient:
+    """Concurrent, rate-limited geocoding and routing against OpenRouteService.
+
+    Point ``base_url`` at a local stub server to benchmark without hitting the public API.
+    """
+
+    def __init__(self, api_key: Optional[str] = ORS_API_KEY, base_url: str = ORS_BASE_URL,
+                 rate_per_second: float = 40 / 60, burst: int = 5, concurrency: int = 8,
+                 max_retries: int = 3, backoff: float = 1.0):
+        # Fail fast inside the ORS client; retries go through the shared rate limit + backoff below
+        self.client = openrouteservice.Client(key=api_key, base_url=base_url, retry_timeout=1,
+                                              retry_over_query_limit=False) if api_key else None
+        if self.client is not None:
+            # One kept-alive connection per concurrent call (requests pools 10 by default)
+            self.client._session.mount(base_url, HTTPAdapter(pool_maxsize=concurrency))
+        # Own worker threads: asyncio's default executor has only cpu_count + 4 of them
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ors-batch")
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    async def _call(self, fn, *args, **kwargs):
+        """Run a blocking ORS call under the rate limit, retrying transient failures with backoff."""
+        for attempt in range(self.max_retries + 1):
+            await self._bucket.acquire()
+            try:
+                async with self._semaphore:
+                    return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args, **kwargs))
+            except (ApiError, HTTPError, Timeout) as e:
+                # ApiError carries ``status``, HTTPError (non-JSON error bodies) ``status_code``
+                status = getattr(e, "status", None) or getattr(e, "status_code", None)
+                retryable = isinstance(e, Timeout) or status is None or status == 429 or status >= 500
+                if not retryable or attempt == self.max_retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (1 + random.random())
+                logging.warning(f"ORS request failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _geocode(self, place: str) -> Optional[Tuple[float, float]]:
+        key = place_key(place)
+        cached = GEOCODE_CACHE.get(key, MISSING)
+        if cached is not MISSING:
+            return cached
+
+        coords = get_routing_engine().coordinates(place)
+        if coords is None and self.client is not None:
+            try:
+                response = await self._call(self.client.pelias_search, place)
+                features = response.get("features") if response else None
+                if features:
+                    location = features[0]["geometry"]["coordinates"]
+                    coords = (location[1], location[0])  # (lat, lon)
+            except Exception as e:
+                logging.error(f"Geocoding error for {place}: {e}")
+                return None  # Don't cache failures
+        GEOCODE_CACHE[key] = coords
+        return coords
+
+    async def _route(self, origin: str, destination: str, profile: str) -> Optional[float]:
+        key = route_key(origin, destination, profile)
+        cached = ROUTE_CACHE.get(key, MISSING)
+        if cached is not MISSING:
+            return cached
+
+        coords_origin = GEOCODE_CACHE.get(place_key(origin))
+        coords_dest = GEOCODE_CACHE.get(place_key(destination))
+        if not coords_origin or not coords_dest or self.client is None:
+            return None
+        try:
+            routes = await self._call(
+                self.client.directions,
+                coordinates=[coords_origin[::-1], coords_dest[::-1]],  # ORS expects (lon, lat)
+                profile=profile,
+            )
+            distance = round(routes["routes"][0]["summary"]["distance"] / 1000, 2)
+        except Exception as e:
+            logging.error(f"ORS routing error for {origin} -> {destination}: {e}")
+            return None
+        ROUTE_CACHE[key] = distance
+        return distance
+
+    async def _gather(self, coros: List, label: str, on_progress: Optional[ProgressCallback]):
+        """Await coroutines concurrently, reporting progress as each completes."""
+        total, done = len(coros), 0
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        for finished in asyncio.as_completed(tasks):
+            await finished
+            done += 1
+            if on_progress:
+                on_progress(done, total, label)
+        return [task.result() for task in tasks]
+
+    def _start(self):
+        """Fresh limiter state per run (asyncio primitives are bound to one event loop)."""
+        self._bucket = TokenBucket(self.rate_per_second, self.burst)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def geocode_many(self, places: Iterable[str],
+                           on_progress: Optional[ProgressCallback] = None) -> Dict[str, Optional[Tuple[float, float]]]:
+        """Geocode every unique place."""
+        self._start()
+        unique_places = list({place_key(p): p for p in places}.values())
+        coords = await self._gather([self._geocode(p) for p in unique_places], "Geocoding", on_progress)
+        return dict(zip(unique_places, coords))
+
+    async def route_many(self, pairs: Iterable[Tuple[str, str]], profile: str = "driving-car",
+                         on_progress: Optional[ProgressCallback] = None) -> Dict[Tuple[str, str], Optional[float]]:
+        """Geocode and route every unique origin/destination pair."""
+        unique_pairs = list(dict.fromkeys((o, d) for o, d in pairs))
+        await self.geocode_many([p for pair in unique_pairs for p in pair], on_progress)
+        distances = await self._gather(
+            [self._route(o, d, profile) for o, d in unique_pairs], "Routing", on_progress
+        )
+        return dict(zip(unique_pairs, distances))
+
+    def geocode(self, places: Iterable[str],
+                on_progress: Optional[ProgressCallback] = None) -> Dict[str, Optional[Tuple[float, float]]]:
+        """Synchronous wrapper around ``geocode_many``."""
+        return asyncio.run(self.geocode_many(places, on_progress))
+
+    def run(self, pairs: Iterable[Tuple[str, str]], profile: str = "driving-car",
+            on_progress: Optional[ProgressCallback] = None) -> Dict[Tuple[str, str], Optional[float]]:
+        """Synchronous entry point for Streamlit pages and scripts."""
+        return asyncio.run(self.route_many(pairs, profile, on_progress))
+
+
+def streamlit_progress() -> ProgressCallback:
+    """Progress callback that streams batch status into a Streamlit progress bar."""
+    bar = st.progress(0.0)
+
+    def update(done: int, total: int, label: str):
+        bar.progress(done / total if total else 1.0, text=f"{label}: {done}/{total}")
+
+    return update
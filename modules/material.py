@@ -2,6 +2,7 @@ import streamlit as st
 import sqlite3
 import logging
 from typing import Dict, Optional
+from common import get_db_path
 
 
 # Configure logging
@@ -19,7 +20,7 @@ EMISSION_FACTORS = {
 def insert_material_data(event: str, category: str, weight: float, quantity: int, emission: float):
     """Insert material emission data into the database."""
     try:
-        with sqlite3.connect("data/emissions.db") as conn:
+        with sqlite3.connect(get_db_path()) as conn:
             c = conn.cursor()
             c.execute(
                 "INSERT INTO Materials (event, Category, Weight, Quantity, Emission) VALUES (?, ?, ?, ?, ?)",
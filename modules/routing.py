@@ -0,0 +1,119 @@
+import os
+import json
+import math
+import heapq
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from resources import registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# 🗺️ Bundled road/rail network extract (nodes, aliases and edge lengths in km)
+NETWORK_PATH = os.path.join("data", "transport_network.json")
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class CSRGraph:
+    """Undirected weighted graph stored as compressed sparse row (CSR) arrays."""
+
+    def __init__(self, num_nodes: int, edges: List[List[float]]):
+        edges = np.asarray(edges, dtype=np.float64).reshape(-1, 3)
+        src = np.concatenate([edges[:, 0], edges[:, 1]]).astype(np.int32)
+        dst = np.concatenate([edges[:, 1], edges[:, 0]]).astype(np.int32)
+        weights = np.concatenate([edges[:, 2], edges[:, 2]]).astype(np.float32)
+
+        order = np.argsort(src, kind="stable")
+        self.indices = dst[order]
+        self.weights = weights[order]
+        self.indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=self.indptr[1:])
+
+    def neighbours(self, node: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the neighbour ids and edge lengths of a node."""
+        start, end = self.indptr[node], self.indptr[node + 1]
+        return self.indices[start:end], self.weights[start:end]
+
+
+class RoutingEngine:
+    """Offline shortest-path distances over the bundled road and rail networks."""
+
+    def __init__(self, path: str = NETWORK_PATH):
+        with open(path, "r") as file:
+            network = json.load(file)
+
+        self.names = [node[0] for node in network["nodes"]]
+        self.lat = np.radians([node[1] for node in network["nodes"]])
+        self.lon = np.radians([node[2] for node in network["nodes"]])
+
+        self._lookup: Dict[str, int] = {name.lower(): i for i, name in enumerate(self.names)}
+        for alias, name in network.get("aliases", {}).items():
+            self._lookup[alias.lower()] = self._lookup[name.lower()]
+
+        self.graphs = {
+            mode: CSRGraph(len(self.names), edges)
+            for mode, edges in network["edges"].items()
+        }
+        # Cache distance queries per engine instance
+        self.distance = lru_cache(maxsize=4096)(self._distance)
+        logging.info(f"Loaded routing network: {len(self.names)} nodes, modes {list(self.graphs)}")
+
+    def locate(self, place: str) -> Optional[int]:
+        """Resolve a place name (or alias) to a node id."""
+        if not place:
+            return None
+        return self._lookup.get(place.strip().lower())
+
+    def coordinates(self, place: str) -> Optional[Tuple[float, float]]:
+        """Get (latitude, longitude) for a known place."""
+        node = self.locate(place)
+        if node is None:
+            return None
+        return (math.degrees(self.lat[node]), math.degrees(self.lon[node]))
+
+    def _heuristic(self, target: int) -> np.ndarray:
+        """Great-circle distance from every node to the target (admissible A* heuristic)."""
+        dlat = self.lat - self.lat[target]
+        dlon = self.lon - self.lon[target]
+        h = np.sin(dlat / 2) ** 2 + np.cos(self.lat) * np.cos(self.lat[target]) * np.sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))
+
+    def _distance(self, origin: str, destination: str, mode: str = "road") -> Optional[float]:
+        """Shortest-path distance (km) between two places using A* search."""
+        graph = self.graphs.get(mode)
+        source, target = self.locate(origin), self.locate(destination)
+        if graph is None or source is None or target is None:
+            return None
+        if source == target:
+            return 0.0
+
+        heuristic = self._heuristic(target)
+        best = {source: 0.0}
+        queue = [(heuristic[source], 0.0, source)]
+        while queue:
+            _, dist, node = heapq.heappop(queue)
+            if node == target:
+                return round(dist, 2)
+            if dist > best.get(node, math.inf):
+                continue
+            neighbours, weights = graph.neighbours(node)
+            for nxt, weight in zip(neighbours.tolist(), weights.tolist()):
+                candidate = dist + weight
+                if candidate < best.get(nxt, math.inf):
+                    best[nxt] = candidate
+                    heapq.heappush(queue, (candidate + heuristic[nxt], candidate, nxt))
+
+        logging.warning(f"No {mode} route between {origin} and {destination}")
+        return None
+
+
+registry.register("routing_engine", RoutingEngine, health=lambda engine: bool(engine.names and engine.graphs))
+
+
+def get_routing_engine() -> RoutingEngine:
+    """The bundled network, loaded once per process."""
+    return registry.get("routing_engine")
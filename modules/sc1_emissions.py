@@ -3,6 +3,8 @@ import sqlite3
 import json
 import logging
 from typing import List, Dict
+from common import get_db_path
+from session_store import persist_key
 
 
 # Configure logging
@@ -16,6 +18,9 @@ EMISSION_FACTORS = {
     "Electricity": 0.82,
 }
 
+# Fuel rows entered but not yet saved survive a move to another app replica
+persist_key("fuel_entries")
+
 # 🧮 Calculate Emission
 def calculate_emission(fuel_type: str, consumption: float) -> float:
     """Calculate emission based on fuel type and consumption."""
@@ -25,7 +30,7 @@ def calculate_emission(fuel_type: str, consumption: float) -> float:
 def insert_scope1_data(event: str, fuels: List[str], consumptions: List[float], emissions: List[float], total_emission: float):
     """Insert multiple fuel entries into the database."""
     try:
-        with sqlite3.connect("data/emissions.db") as conn:
+        with sqlite3.connect(get_db_path()) as conn:
             c = conn.cursor()
 
             # Convert lists to JSON strings
@@ -80,7 +85,7 @@ def display_scope1(event):
         with cols[2]:  # Remove Entry Button
             if st.button("Remove", key=f"remove_{index}"):
                 st.session_state.fuel_entries = [e for e in st.session_state.fuel_entries if e["id"] != index]
-                st.rerun()
+                st.rerun(scope="fragment")
 
         emission = calculate_emission(fuel_type, consumption)
         total_emission += emission
@@ -105,4 +110,4 @@ def display_scope1(event):
     if st.button("Add Another Fuel"):
         new_id = max([e["id"] for e in st.session_state.fuel_entries], default=-1) + 1
         st.session_state.fuel_entries.append({"id": new_id, "fuel_type": "Diesel", "consumption": 0.0})
-        st.rerun()
\ No newline at end of file
+        st.rerun(scope="fragment")
\ No newline at end of file
@@ -0,0 +1,217 @@
+import streamlit as st
+import sqlite3
+import logging
+from typing import Optional
+
+import pandas as pd
+from geopy.distance import geodesic
+
+from common import get_db_path
+from modules.routing import get_routing_engine
+from modules.geo_client import BatchRoutingClient, GEOCODE_CACHE, ProgressCallback, place_key, streamlit_progress
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+EMISSION_FACTOR = 1.58  # Emission factor per km per kg
+RAIL_ROAD_RATIO = 0.968  # Rail vs HGV road distance, used outside the rail network
+
+# Transport modes and efficiency
+TRANSPORT_MODES = {
+    "Truck": {"profile": "driving-car", "network": "road", "efficiency": 1.9},
+    "Rail": {"profile": "driving-hgv", "network": "rail", "efficiency": 0.6},  # HGV profile only used outside the rail network
+    "Air": {"profile": None, "network": None, "efficiency": 3.0}  # Geodesic Distance for Air
+}
+
+# 📑 Manifest layout: one row per leg, legs of a shipment share the same reference
+MANIFEST_COLUMNS = ["shipment", "material", "weight_kg", "leg", "mode", "origin", "destination"]
+BATCH_SIZE = 500  # Shipments written per transaction
+
+
+# 🧮 Calculate Leg Emissions (vectorized)
+def calculate_leg_emissions(legs: pd.DataFrame) -> pd.DataFrame:
+    """Add tonne-km and emission columns to legs with Distance (km) and Weight (kg)."""
+    efficiency = legs["Mode"].map({mode: info["efficiency"] for mode, info in TRANSPORT_MODES.items()})
+    legs["TonneKm"] = (legs["Weight"] / 1000) * legs["Distance"]
+    legs["Emission"] = (legs["Distance"] * legs["Weight"] * EMISSION_FACTOR * efficiency).round(2)
+    return legs
+
+
+def resolve_leg_distances(legs: pd.DataFrame, on_progress: Optional[ProgressCallback] = None) -> pd.Series:
+    """Distance (km) for each leg: offline network first, batched ORS calls for the rest."""
+    engine = get_routing_engine()
+    unique = legs[["Mode", "Origin", "Destination"]].drop_duplicates()
+
+    distances, missing = {}, {mode: [] for mode in TRANSPORT_MODES}
+    for mode, origin, destination in unique.itertuples(index=False):
+        network = TRANSPORT_MODES[mode]["network"]
+        if network:
+            distance = engine.distance(origin, destination, network)
+        else:
+            coords_origin, coords_dest = engine.coordinates(origin), engine.coordinates(destination)
+            distance = round(geodesic(coords_origin, coords_dest).km, 2) if coords_origin and coords_dest else None
+        if distance is None:
+            missing[mode].append((origin, destination))
+        distances[(mode, origin, destination)] = distance
+
+    if any(missing.values()):
+        client = BatchRoutingClient()
+        for mode in ("Truck", "Rail"):
+            if missing[mode]:
+                routed = client.run(missing[mode], TRANSPORT_MODES[mode]["profile"], on_progress)
+                for (origin, destination), distance in routed.items():
+                    if distance is not None and mode == "Rail":
+                        distance = round(distance * RAIL_ROAD_RATIO, 2)
+                    distances[(mode, origin, destination)] = distance
+        if missing["Air"]:
+            client.geocode([place for pair in missing["Air"] for place in pair], on_progress)
+            for origin, destination in missing["Air"]:
+                coords_origin = GEOCODE_CACHE.get(place_key(origin))
+                coords_dest = GEOCODE_CACHE.get(place_key(destination))
+                distances[("Air", origin, destination)] = (
+                    round(geodesic(coords_origin, coords_dest).km, 2) if coords_origin and coords_dest else None
+                )
+
+    lookup = pd.DataFrame(
+        [(mode, origin, destination, distance) for (mode, origin, destination), distance in distances.items()],
+        columns=["Mode", "Origin", "Destination", "Distance"],
+    )
+    merged = legs[["Mode", "Origin", "Destination"]].merge(lookup, how="left", on=["Mode", "Origin", "Destination"])
+    return pd.Series(merged["Distance"].to_numpy(dtype="float64"), index=legs.index)
+
+
+def cost_manifest(manifest: pd.DataFrame, on_progress: Optional[ProgressCallback] = None) -> pd.DataFrame:
+    """Validate a shipment manifest and cost every leg."""
+    manifest = manifest.rename(columns=lambda c: str(c).strip().lower())
+    missing_columns = [c for c in MANIFEST_COLUMNS if c not in manifest.columns]
+    if missing_columns:
+        raise ValueError(f"Manifest is missing columns: {', '.join(missing_columns)}")
+
+    legs = pd.DataFrame({
+        "Shipment": manifest["shipment"].astype(str),
+        "Material": manifest["material"].astype(str),
+        "Weight": pd.to_numeric(manifest["weight_kg"], errors="coerce"),
+        "LegNo": pd.to_numeric(manifest["leg"], errors="coerce"),
+        "Mode": manifest["mode"].astype(str).str.strip().str.title(),
+        "Origin": manifest["origin"].astype(str).str.strip(),
+        "Destination": manifest["destination"].astype(str).str.strip(),
+    })
+    unknown_modes = sorted(set(legs["Mode"]) - set(TRANSPORT_MODES))
+    if unknown_modes:
+        raise ValueError(f"Unknown transport modes: {', '.join(unknown_modes)}")
+    if legs["Weight"].isna().any() or legs["LegNo"].isna().any():
+        raise ValueError("weight_kg and leg must be numeric for every row.")
+    if (legs["Weight"] <= 0).any():
+        raise ValueError("weight_kg must be positive; check shipments: "
+                         + ", ".join(legs.loc[legs["Weight"] <= 0, "Shipment"].drop_duplicates().head(20)))
+    repeated = legs.duplicated(["Shipment", "LegNo"], keep=False)
+    if repeated.any():
+        raise ValueError("Each leg number may appear once per shipment; repeated in: "
+                         + ", ".join(legs.loc[repeated, "Shipment"].drop_duplicates().head(20)))
+
+    legs = legs.sort_values(["Shipment", "LegNo"], kind="stable").reset_index(drop=True)
+    legs["Distance"] = resolve_leg_distances(legs, on_progress)
+    return calculate_leg_emissions(legs)
+
+
+def unresolved_shipments(legs: pd.DataFrame) -> list:
+    """References of shipments with at least one leg that could not be routed."""
+    return legs.loc[legs["Distance"].isna(), "Shipment"].drop_duplicates().tolist()
+
+
+# 📌 Insert Shipments into DB (batched)
+def insert_shipments(event: str, legs: pd.DataFrame) -> Optional[int]:
+    """Persist costed shipments and their legs in one transaction; returns the number saved, or None on failure.
+
+    Shipments with any unrouted leg are skipped whole, so totals and endpoints are never partial, and so are
+    references already saved for the event, so uploading a manifest twice does not count it twice.
+    """
+    legs = legs[~legs["Shipment"].isin(unresolved_shipments(legs))]
+    if legs.empty:
+        return 0
+
+    shipments = legs.groupby("Shipment", sort=False).agg(
+        Material=("Material", "first"), Weight=("Weight", "first"),
+        Origin=("Origin", "first"), Destination=("Destination", "last"), Emission=("Emission", "sum"),
+    ).reset_index()
+
+    try:
+        conn = sqlite3.connect(get_db_path())
+        with conn:  # Commits once at the end, or rolls every batch back
+            c = conn.cursor()
+            existing = {row[0] for row in c.execute("SELECT Reference FROM Shipments WHERE event = ?", (event,))}
+            duplicates = shipments["Shipment"].isin(existing)
+            shipments = shipments[~duplicates]
+            if duplicates.any():
+                st.info(f"{int(duplicates.sum())} shipments were already saved for {event} and are skipped.")
+
+            saved = 0
+            for start in range(0, len(shipments), BATCH_SIZE):
+                batch = shipments.iloc[start:start + BATCH_SIZE]
+                shipment_ids = {}
+                for row in batch.itertuples(index=False):
+                    # OR IGNORE: the (event, Reference) unique index settles a concurrent save of the same manifest
+                    c.execute(
+                        "INSERT OR IGNORE INTO Shipments (event, Reference, Material, Weight, Origin, Destination, Emission) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (event, row.Shipment, row.Material, float(row.Weight), row.Origin, row.Destination,
+                         round(float(row.Emission), 2)),
+                    )
+                    if c.rowcount:
+                        shipment_ids[row.Shipment] = c.lastrowid
+
+                batch_legs = legs[legs["Shipment"].isin(shipment_ids.keys())]
+                c.executemany(
+                    "INSERT INTO ShipmentLegs (shipment_id, event, LegNo, Mode, Origin, Destination, Distance, Weight, TonneKm, Emission) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (shipment_ids[row.Shipment], event, int(row.LegNo), row.Mode, row.Origin, row.Destination,
+                         float(row.Distance), float(row.Weight), float(row.TonneKm), float(row.Emission))
+                        for row in batch_legs.itertuples(index=False)
+                    ],
+                )
+                saved += len(shipment_ids)
+        logging.info(f"Inserted {saved} shipments for event: {event}")
+        return saved
+    except sqlite3.Error as e:
+        st.error(f"Database error: {e}")
+        logging.error(f"Failed to insert shipments, nothing was saved: {e}")
+        return None
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+# 📑 Show Bulk Manifest Upload
+def show_shipment_upload(event):
+    """Upload, cost and save a multi-leg shipment manifest."""
+    st.subheader("📑 Bulk Shipment Manifest")
+    st.caption("CSV with one row per leg: " + ", ".join(MANIFEST_COLUMNS) + ". Modes: " + ", ".join(TRANSPORT_MODES))
+
+    uploaded = st.file_uploader("Upload Manifest (CSV)", type="csv", key="shipment_manifest")
+    if not uploaded:
+        return
+
+    try:
+        legs = cost_manifest(pd.read_csv(uploaded), streamlit_progress())
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    skipped = unresolved_shipments(legs)
+    if skipped:
+        shown = ", ".join(skipped[:20]) + (f" and {len(skipped) - 20} more" if len(skipped) > 20 else "")
+        st.warning(f"{int(legs['Distance'].isna().sum())} legs could not be routed, so these shipments "
+                   f"will not be saved: {shown}")
+
+    st.dataframe(legs, use_container_width=True)
+    st.metric(label="Total CO₂ Emission (kg)", value=round(legs["Emission"].sum(), 2))
+
+    if st.button("Save Shipments", key="save_shipments"):
+        if not event:
+            st.warning("Event name is not set. Please go to the Overview page and save an event first.")
+        else:
+            saved = insert_shipments(event, legs)
+            if saved is not None:
+                st.success(f"Saved {saved} shipments to the emissions ledger.")
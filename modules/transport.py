@@ -2,6 +2,7 @@ import streamlit as st
 import sqlite3
 import logging
 from typing import Dict, Optional
+from common import get_db_path
 
 
 # Configure logging
@@ -38,7 +39,7 @@ def calculate_transport_emission(mode: str, vehicle: str, distance: float) -> fl
 def insert_transport_data(mode: str, vehicle: str, distance: float, emission: float):
     """Insert transport emission data into the database."""
     try:
-        with sqlite3.connect("data/emissions.db") as conn:
+        with sqlite3.connect(get_db_path()) as conn:
             c = conn.cursor()
             c.execute(
                 "INSERT INTO TransportEmissions (Mode, Vehicle, WeightOrDistance, Emission) VALUES (?, ?, ?, ?)",
@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+import streamlit as st
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+@dataclass(frozen=True)
+class ResourceSpec:
+    """How to create, check and dispose of one kind of process-wide resource."""
+    name: str
+    factory: Callable[..., Any]  # Called with the database path for per-database resources
+    close: Optional[Callable[[Any], None]] = None
+    health: Optional[Callable[[Any], Any]] = None  # Raises, or returns False, when the resource is unusable
+    per_database: bool = False
+
+
+@dataclass(frozen=True)
+class ResourceHandle:
+    """A created resource together with its spec, as stored in the Streamlit resource cache."""
+    spec: ResourceSpec
+    key: str
+    value: Any
+    created: float
+
+
+def _release(handle: ResourceHandle):
+    """Run a resource's close hook when Streamlit drops it from the cache."""
+    registry.forget(handle.spec.name, handle.key)
+    if handle.spec.close:
+        try:
+            handle.spec.close(handle.value)
+        except Exception as e:
+            logging.error(f"Error closing resource {handle.spec.name}: {e}")
+    logging.info(f"Released resource {handle.spec.name} {handle.key}".rstrip())
+
+
+@st.cache_resource(show_spinner=False, on_release=_release)
+def _instance(name: str, key: str) -> ResourceHandle:
+    """One handle per (resource, database), shared by every session and thread of the process."""
+    spec = registry.spec(name)
+    value = spec.factory(key) if spec.per_database else spec.factory()
+    registry.remember(name, key)
+    logging.info(f"Created resource {name} {key}".rstrip())
+    return ResourceHandle(spec, key, value, time.time())
+
+
+class ResourceRegistry:
+    """Process-wide singletons (connection pools, factor tables, clients, chatbot indexes).
+
+    Modules register a factory plus optional ``close`` and ``health`` hooks under a name; instances
+    are created on first use and live in ``st.cache_resource``, so clearing that cache (or calling
+    ``release``) runs the close hooks. Sessions keep at most the name, never the object.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, ResourceSpec] = {}
+        self._live: Dict[Tuple[str, str], None] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[..., Any], close: Optional[Callable[[Any], None]] = None,
+                 health: Optional[Callable[[Any], Any]] = None, per_database: bool = False) -> ResourceSpec:
+        """Declare a resource; registering a name again replaces its spec (e.g. on module reload)."""
+        spec = ResourceSpec(name, factory, close, health, per_database)
+        with self._lock:
+            self._specs[name] = spec
+        return spec
+
+    def spec(self, name: str) -> ResourceSpec:
+        with self._lock:
+            if name not in self._specs:
+                raise KeyError(f"Unknown resource: {name}")
+            return self._specs[name]
+
+    def get(self, name: str, db_path: Optional[str] = None) -> Any:
+        """The shared instance of a resource (for ``db_path`` when it is per database)."""
+        spec = self.spec(name)
+        if spec.per_database and not db_path:
+            raise ValueError(f"Resource {name} needs a database path")
+        return _instance(name, db_path if spec.per_database else "").value
+
+    def remember(self, name: str, key: str):
+        with self._lock:
+            self._live[(name, key)] = None
+
+    def forget(self, name: str, key: str):
+        with self._lock:
+            self._live.pop((name, key), None)
+
+    def live(self) -> Dict[str, Any]:
+        """Created instances by label, e.g. ``database data/emissions.db``."""
+        with self._lock:
+            keys = list(self._live)
+        return {f"{name} {key}".rstrip(): _instance(name, key).value for name, key in keys}
+
+    def health(self) -> Dict[str, str]:
+        """'ok' or the failure for every created resource, by label."""
+        with self._lock:
+            keys = list(self._live)
+        report = {}
+        for name, key in keys:
+            handle = _instance(name, key)
+            label = f"{name} {key}".rstrip()
+            try:
+                healthy = handle.spec.health(handle.value) if handle.spec.health else True
+                report[label] = "ok" if healthy is not False else "unhealthy"
+            except Exception as e:
+                report[label] = f"error: {e}"
+                logging.error(f"Health check of {label} failed: {e}")
+        return report
+
+    def release(self, name: Optional[str] = None, db_path: Optional[str] = None):
+        """Close and drop one resource (all databases unless ``db_path`` is given), or everything."""
+        with self._lock:
+            keys = [k for k in self._live if name is None or (k[0] == name and (db_path is None or k[1] == db_path))]
+        for key in keys:
+            _instance.clear(*key)
+
+
+# Shared by every session served by this process
+registry = ResourceRegistry()
@@ -0,0 +1,279 @@
+import os
+import hmac
+import json
+import time
+import secrets
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+import streamlit as st
+from common import DB_PATH, db_pool
+from resources import registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")  # "sqlite" or "kv"
+SESSION_KV_PATH = os.getenv("SESSION_KV_PATH", os.path.join("data", "sessions"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 8 * 3600))
+PURGE_INTERVAL_SECONDS = 60  # Expired sessions are deleted at most this often per replica
+SESSION_PARAM = "sid"  # Query parameter carrying the session id, so any replica can pick it up
+# Signing key for session ids, shared by every replica: SESSION_SECRET, else a key file created once
+SESSION_SECRET_PATH = os.getenv("SESSION_SECRET_PATH", os.path.join("data", "session_secret"))
+
+# Bookkeeping keys (never persisted): hash/time of the last save, and this session's verified id
+_SAVED_STATE_KEY = "_session_store_saved"
+_SESSION_ID_KEY = "_session_store_id"
+_BINDING_FIELD = "_client"  # Stored next to the keys: fingerprint of the browser that saved them
+
+# 📌 Persisted keys: session key -> (encode to JSON-able, decode from it)
+_PERSISTED: Dict[str, Tuple[Callable[[Any], Any], Callable[[Any], Any]]] = {}
+_AUTH_KEYS = set()  # Restored only into the browser that saved them
+
+
+def persist_key(key: str, encode: Callable[[Any], Any] = None, decode: Callable[[Any], Any] = None,
+                auth: bool = False):
+    """Keep ``st.session_state[key]`` in the shared session store (values must be small and JSON-able
+    after ``encode``). ``auth`` keys (login, organization) are only restored for the same browser."""
+    _PERSISTED[key] = (encode or (lambda value: value), decode or (lambda value: value))
+    if auth:
+        _AUTH_KEYS.add(key)
+
+
+class SQLiteSessionBackend:
+    """Sessions in the ``SessionStore`` table of the default database, shared by every replica using it.
+
+    It stays out of the organization shards: a session's organization is only known once it is restored.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._purged = 0.0
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with db_pool(self.db_path).connection() as conn:
+            row = conn.execute("SELECT Data FROM SessionStore WHERE SessionId = ? AND Expires > ?",
+                               (session_id, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id: str, data: Dict[str, Any], ttl: int):
+        now = time.time()
+        with db_pool(self.db_path).connection() as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO SessionStore (SessionId, Data, Expires) VALUES (?, ?, ?)",
+                         (session_id, json.dumps(data), now + ttl))
+            if now - self._purged > PURGE_INTERVAL_SECONDS:
+                conn.execute("DELETE FROM SessionStore WHERE Expires <= ?", (now,))
+                self._purged = now
+
+    def delete(self, session_id: str):
+        with db_pool(self.db_path).connection() as conn, conn:
+            conn.execute("DELETE FROM SessionStore WHERE SessionId = ?", (session_id,))
+
+    def check(self) -> bool:
+        with db_pool(self.db_path).connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM SessionStore").fetchone() is not None
+
+
+class LocalKVSessionBackend:
+    """Stand-in for a shared key-value store (GET/SETEX/DEL with expiry) on a shared directory.
+
+    Each session is one JSON file replaced atomically, so replicas on the same host or volume
+    share it; swap in a networked store by implementing the same four methods.
+    """
+
+    def __init__(self, directory: str = SESSION_KV_PATH):
+        self.directory = directory
+        self._purged = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(session_id.encode()).hexdigest() + ".json")
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(session_id)) as file:
+                record = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return record["data"] if record.get("expires", 0) > time.time() else None
+
+    def save(self, session_id: str, data: Dict[str, Any], ttl: int):
+        now = time.time()
+        path = self._path(session_id)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            json.dump({"data": data, "expires": now + ttl}, file)
+        os.replace(temporary, path)
+        if now - self._purged > PURGE_INTERVAL_SECONDS:
+            self._purged = now
+            for name in os.listdir(self.directory):
+                try:
+                    with open(os.path.join(self.directory, name)) as file:
+                        if json.load(file).get("expires", 0) <= now:
+                            os.remove(os.path.join(self.directory, name))
+                except (OSError, ValueError):
+                    continue
+
+    def delete(self, session_id: str):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def check(self) -> bool:
+        return os.access(self.directory, os.W_OK)
+
+
+def _create_backend():
+    if SESSION_BACKEND == "kv":
+        return LocalKVSessionBackend()
+    return SQLiteSessionBackend(DB_PATH)
+
+
+def _load_secret() -> bytes:
+    secret = os.getenv("SESSION_SECRET")
+    if secret:
+        return secret.encode()
+    if not os.path.exists(SESSION_SECRET_PATH):
+        # Written aside and linked into place, so concurrent replicas all end up with the same key
+        temporary = f"{SESSION_SECRET_PATH}.{os.getpid()}.tmp"
+        with open(os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as file:
+            file.write(secrets.token_hex(32))
+        try:
+            os.link(temporary, SESSION_SECRET_PATH)
+            logging.info(f"Created session signing key {SESSION_SECRET_PATH}")
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temporary)
+    with open(SESSION_SECRET_PATH) as file:
+        return file.read().strip().encode()
+
+
+registry.register("session_store", _create_backend, health=lambda backend: backend.check())
+registry.register("session_secret", _load_secret)
+
+
+def _sign(value: str) -> str:
+    return hmac.new(registry.get("session_secret"), value.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def _issue_id() -> str:
+    """A new server-issued id: ``<random>.<expiry>.<signature>``."""
+    body = f"{secrets.token_urlsafe(16)}.{int(time.time()) + SESSION_TTL_SECONDS}"
+    return f"{body}.{_sign(body)}"
+
+
+def _expires(sid: Optional[str]) -> int:
+    """Expiry (Unix time) of an id this deployment issued; 0 for forged or altered ids."""
+    body, _, signature = (sid or "").rpartition(".")
+    expires = body.rpartition(".")[2]
+    return int(expires) if expires.isdigit() and hmac.compare_digest(signature, _sign(body)) else 0
+
+
+def _verify_id(sid: Optional[str]) -> bool:
+    return _expires(sid) > time.time()
+
+
+def _client_binding() -> str:
+    """Keyed fingerprint of this browser (user agent, language, address), so a leaked URL carries no login."""
+    headers = st.context.headers
+    return _sign(f"{headers.get('User-Agent', '')}\n{headers.get('Accept-Language', '')}\n{st.context.ip_address or ''}")
+
+
+def session_id() -> str:
+    """This browser session's id: the verified one from the URL, or a newly issued one added to it."""
+    sid = st.session_state.get(_SESSION_ID_KEY)
+    if sid is None:
+        sid = st.query_params.get(SESSION_PARAM)
+        if not _verify_id(sid):
+            sid = _issue_id()
+        st.session_state[_SESSION_ID_KEY] = sid
+    if st.query_params.get(SESSION_PARAM) != sid:
+        st.query_params[SESSION_PARAM] = sid
+    return sid
+
+
+def rotate_session(drop_old: bool = True):
+    """Move this session to a newly issued id and drop the old record (at login and logout),
+    so an id planted or seen before cannot reach the new state."""
+    old = st.session_state.get(_SESSION_ID_KEY) or st.query_params.get(SESSION_PARAM)
+    if old and drop_old:
+        try:
+            registry.get("session_store").delete(old)
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Error dropping rotated session: {e}")
+    st.session_state[_SESSION_ID_KEY] = _issue_id()
+    st.query_params[SESSION_PARAM] = st.session_state[_SESSION_ID_KEY]
+    st.session_state[_SAVED_STATE_KEY] = (None, 0.0)  # Save under the new id at the end of the run
+
+
+def _encoded() -> Dict[str, Any]:
+    return {key: encode(st.session_state[key]) for key, (encode, _) in _PERSISTED.items() if key in st.session_state}
+
+
+def restore_session():
+    """Fill in persisted keys missing from this (new) Streamlit session, e.g. after landing on another replica."""
+    if _SAVED_STATE_KEY in st.session_state:
+        return
+    try:
+        data = registry.get("session_store").load(session_id()) or {}
+    except (sqlite3.Error, OSError, ValueError) as e:
+        logging.error(f"Error restoring session: {e}")
+        data = {}
+    trusted = bool(data) and hmac.compare_digest(str(data.get(_BINDING_FIELD, "")), _client_binding())
+    if data and not trusted and _AUTH_KEYS & data.keys():
+        logging.warning("Session restored from another browser; login keys not restored")
+    for key, value in data.items():
+        if key in _AUTH_KEYS and not trusted:
+            continue
+        if key in _PERSISTED and key not in st.session_state:
+            try:
+                st.session_state[key] = _PERSISTED[key][1](value)
+            except (TypeError, ValueError, KeyError) as e:
+                logging.warning(f"Dropping stored session key {key}: {e}")
+    st.session_state[_SAVED_STATE_KEY] = (_digest(_encoded()), time.time())
+    if data and not trusted:
+        rotate_session(drop_old=False)  # Leave the owner's record alone and never write over it
+
+
+def _digest(data: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def save_session():
+    """Write the persisted keys when they changed (or the stored copy is a quarter of its TTL old)."""
+    if _expires(session_id()) - time.time() < SESSION_TTL_SECONDS / 2:
+        rotate_session()  # Renew the id while the session is in use
+    data = _encoded()
+    digest = _digest(data)
+    saved_digest, saved_at = st.session_state.get(_SAVED_STATE_KEY, (None, 0.0))
+    if digest == saved_digest and time.time() - saved_at < SESSION_TTL_SECONDS / 4:
+        return
+    try:
+        registry.get("session_store").save(session_id(), {**data, _BINDING_FIELD: _client_binding()},
+                                            SESSION_TTL_SECONDS)
+        st.session_state[_SAVED_STATE_KEY] = (digest, time.time())
+    except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+        logging.error(f"Error saving session: {e}")
+
+
+def clear_session():
+    """Forget this session everywhere and move to a fresh id (on logout)."""
+    for key in _PERSISTED:
+        st.session_state.pop(key, None)
+    rotate_session()
+    st.session_state[_SAVED_STATE_KEY] = (_digest({}), time.time())  # Nothing left to save
+
+
+@contextmanager
+def synced_session():
+    """Restore persisted keys before a run and save them after it, including runs ended by
+    ``st.rerun()`` or ``st.stop()``."""
+    restore_session()
+    try:
+        yield
+    finally:
+        save_session()
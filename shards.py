@@ -0,0 +1,139 @@
+import os
+import re
+import sys
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Dict, Iterable, List, Optional, Sequence
+import pandas as pd
+from common import create_database, query_cache
+from tenancy import list_orgs, shard_path, validate_org
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", 4))  # Shard batches queried at once
+ATTACH_LIMIT = 8  # Shards attached per connection (SQLite allows 10 by default)
+CROSS_SHARD_CACHE_SIZE = 64  # Combined results kept per process
+
+# Measures that can be computed per shard and combined afterwards, with how partials combine
+_COMBINE = {"SUM": "sum", "COUNT": "sum", "TOTAL": "sum", "MIN": "min", "MAX": "max"}
+_MEASURE = re.compile(r"\s*(SUM|COUNT|TOTAL|MIN|MAX)\s*\(.*\)\s*", re.IGNORECASE | re.DOTALL)
+_TABLE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+SHARD_POOL = ThreadPoolExecutor(max_workers=SHARD_WORKERS, thread_name_prefix="shard-query")
+_results: OrderedDict = OrderedDict()
+_results_lock = threading.Lock()
+
+
+# 📌 Shard tooling
+def create_shard(org: str) -> str:
+    """Create an organization's shard with the current schema; returns its path."""
+    path = shard_path(validate_org(org))
+    if os.path.exists(path):
+        raise FileExistsError(f"Shard already exists: {path}")
+    if not create_database(path):
+        raise sqlite3.Error(f"Could not create shard {path}")
+    logging.info(f"Created shard for {org}: {path}")
+    return path
+
+
+def migrate_shards(orgs: Optional[Iterable[str]] = None) -> Dict[str, bool]:
+    """Apply the schema script to every shard (or just ``orgs``); returns success per organization."""
+    return {org: create_database(shard_path(org)) for org in (orgs or list_orgs())}
+
+
+# 📌 Cross-shard aggregates
+def _shard_batch(batch: Sequence[str], sql: str, params: Sequence) -> List[tuple]:
+    """Run the per-shard query once per attached shard, as one UNION ALL statement."""
+    with closing(sqlite3.connect("file::memory:", uri=True, check_same_thread=False)) as conn:
+        for i, org in enumerate(batch):
+            # Read-only, so a consultant query can never write to or lock out a tenant's writers
+            conn.execute(f"ATTACH DATABASE ? AS shard{i}", (f"file:{shard_path(org)}?mode=ro",))
+        union = " UNION ALL ".join(sql.replace("{schema}", f"shard{i}") for i in range(len(batch)))
+        rows = conn.execute(union, [value for org in batch for value in (org, *params)]).fetchall()
+        for i in range(len(batch)):
+            conn.execute(f"DETACH DATABASE shard{i}")
+    return rows
+
+
+def cross_shard_aggregate(source: str, group_by: Dict[str, str], measures: Dict[str, str],
+                          where: str = "", params: Sequence = (), orgs: Optional[Sequence[str]] = None,
+                          by_org: bool = True) -> pd.DataFrame:
+    """Aggregate a table over several organizations' shards, like ``aggregations.aggregate`` does for one.
+
+    Shards are attached read-only in batches of at most ``ATTACH_LIMIT`` and the batches run in parallel,
+    each computing per-shard partial aggregates; only SUM/COUNT/TOTAL/MIN/MAX measures are accepted,
+    since those combine exactly. With ``by_org`` the result has an ``Organization`` column, otherwise
+    partials are combined across organizations. Results are cached until any shard changes.
+    """
+    if not _TABLE.fullmatch(source):
+        raise ValueError(f"Cross-shard source must be a table name: {source!r}")
+    for name, expr in measures.items():
+        if not _MEASURE.fullmatch(expr):
+            raise ValueError(f"Measure {name} cannot be combined across shards: {expr}")
+    orgs = [validate_org(org) for org in (orgs or list_orgs())]
+    orgs = [org for org in orgs if os.path.exists(shard_path(org))]
+
+    versions = tuple(query_cache.data_version(shard_path(org)) for org in orgs)
+    key = (source, tuple(group_by.items()), tuple(measures.items()), where, tuple(params), tuple(orgs), by_org, versions)
+    with _results_lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key].copy()
+
+    columns = [f'{expr} AS "{name}"' for name, expr in {**group_by, **measures}.items()]
+    sql = f"SELECT ? AS Organization, {', '.join(columns)} FROM {{schema}}.{source}"
+    if where:
+        sql += f" WHERE {where}"
+    if group_by:
+        sql += " GROUP BY " + ", ".join(str(i + 2) for i in range(len(group_by)))
+    size = max(1, min(ATTACH_LIMIT, -(-len(orgs) // SHARD_WORKERS)))  # Spread shards over every worker
+    batches = [orgs[i:i + size] for i in range(0, len(orgs), size)]
+    rows = [row for part in SHARD_POOL.map(lambda batch: _shard_batch(batch, sql, params), batches) for row in part]
+    df = pd.DataFrame(rows, columns=["Organization", *group_by, *measures])
+
+    if not by_org:
+        combine = {name: _COMBINE[_MEASURE.fullmatch(expr).group(1).upper()] for name, expr in measures.items()}
+        if group_by:
+            df = df.groupby(list(group_by), as_index=False, dropna=False).agg(combine)
+        else:
+            df = pd.DataFrame([{name: df[name].agg(how) for name, how in combine.items()}])
+
+    with _results_lock:
+        _results[key] = df
+        while len(_results) > CROSS_SHARD_CACHE_SIZE:
+            _results.popitem(last=False)
+    return df.copy()
+
+
+# 📌 Command line: python shards.py list | create <org> | migrate [org ...]
+def main(argv: Sequence[str]) -> int:
+    command, args = (argv[0], list(argv[1:])) if argv else ("list", [])
+    if command == "list":
+        for org in list_orgs():
+            path = shard_path(org)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            print(f"{org}\t{path}\t{size / 1e6:.1f} MB")
+    elif command == "create" and len(args) == 1:
+        try:
+            print(create_shard(args[0]))
+        except (FileExistsError, ValueError, sqlite3.Error) as e:
+            print(e)
+            return 1
+    elif command == "migrate":
+        results = migrate_shards(args or None)
+        for org, ok in results.items():
+            print(f"{org}\t{'ok' if ok else 'failed'}")
+        return 0 if all(results.values()) else 1
+    else:
+        print("Usage: python shards.py list | create <org> | migrate [org ...]")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,81 @@
+import os
+import re
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DEFAULT_ORG = "default"  # Keeps the original data/emissions.db, which also holds the session store
+DEFAULT_DB_PATH = os.path.join("data", "emissions.db")
+SHARD_DIR = os.getenv("EMISSIONS_SHARD_DIR", os.path.join("data", "shards"))  # One <org>/emissions.db per organization
+ORG_STATE_KEY = "org"
+CONSULTANTS = {"sustain_consultant"}  # Users who may switch organization and query across shards
+
+_ORG_NAME = re.compile(r"[a-z0-9][a-z0-9_-]{0,63}")
+
+# Set by tooling, the API and background threads, which have no Streamlit session to read
+_active_org: ContextVar[Optional[str]] = ContextVar("active_org", default=None)
+
+
+def _parse_user_orgs(value: str) -> Dict[str, str]:
+    """``"ops_manager:acme,event_coordinator:acme"`` -> {user: org}."""
+    pairs = (item.split(":", 1) for item in value.split(",") if ":" in item)
+    return {user.strip(): validate_org(org.strip()) for user, org in pairs}
+
+
+def validate_org(org: str) -> str:
+    """Organization names become directory names, so only lowercase slugs are accepted."""
+    if not _ORG_NAME.fullmatch(org or ""):
+        raise ValueError(f"Invalid organization name: {org!r}")
+    return org
+
+
+# Users without an entry belong to DEFAULT_ORG, as in a single-tenant deployment
+USER_ORGS = _parse_user_orgs(os.getenv("EMISSIONS_USER_ORGS", ""))
+
+
+def org_for_user(username: str) -> str:
+    """Home organization of a user."""
+    return USER_ORGS.get(username, DEFAULT_ORG)
+
+
+def shard_path(org: str) -> str:
+    """Database file of an organization's shard."""
+    if org == DEFAULT_ORG:
+        return DEFAULT_DB_PATH
+    return os.path.join(SHARD_DIR, validate_org(org), "emissions.db")
+
+
+def list_orgs() -> List[str]:
+    """Every organization with a shard on disk, DEFAULT_ORG first."""
+    orgs = [DEFAULT_ORG]
+    if os.path.isdir(SHARD_DIR):
+        orgs += sorted(name for name in os.listdir(SHARD_DIR)
+                       if _ORG_NAME.fullmatch(name) and name != DEFAULT_ORG
+                       and os.path.exists(os.path.join(SHARD_DIR, name, "emissions.db")))
+    return orgs
+
+
+def current_org() -> str:
+    """Organization of the running code: the ``use_org`` override, else this session's, else DEFAULT_ORG."""
+    org = _active_org.get()
+    if org:
+        return org
+    if get_script_run_ctx(suppress_warning=True) is not None:
+        return st.session_state.get(ORG_STATE_KEY) or DEFAULT_ORG
+    return DEFAULT_ORG
+
+
+@contextmanager
+def use_org(org: str) -> Iterator[str]:
+    """Route database access in this thread (or task) to ``org``'s shard."""
+    token = _active_org.set(validate_org(org))
+    try:
+        yield org
+    finally:
+        _active_org.reset(token)
@@ -1,12 +1,15 @@
-import ast
 import json
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import sqlite3
 import plotly.graph_objects as go
 import logging
-from streamlit_autorefresh import st_autorefresh
+from common import cached_read_sql
+from visualizations.ledger_transform import process_data
+from visualizations.filters import FilterContext, filter_bar, reset_filters
+from visualizations.time_buckets import grain_selector, time_buckets
+from visualizations.change_feed import LIVE_REFRESH_SECONDS, get_ledger_feed
+from visualizations import charts
 
 
 # Configure logging
@@ -14,105 +17,40 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 
 
 
-######################## - GET THE LATEST EVENT DETAILS - #############################
-def get_latest_event():
-    """Fetch the latest event name from the Events table."""
-    conn = sqlite3.connect("data/emissions.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM Events ORDER BY id DESC LIMIT 1")
-    event = cursor.fetchone()
-    return event[0] if event else None
-
-event_name = get_latest_event()
-
-
-
 ##############################################################################################
-def fetch_data(event_name):
-    """Fetch emissions data grouped by category."""
-    try:
-        conn = sqlite3.connect("data/emissions.db")
-        query = f"SELECT Category, SUM(Emission) AS TotalEmissions, Timestamp FROM MasterEmissions WHERE Event =? GROUP BY Category LIMIT 100;"
-        df = pd.read_sql_query(query, conn, params=(event_name,))
-        conn.close()
-        return df
-    except sqlite3.Error as e:
-        st.error(f"Database error: {e}")
-        logging.error(f"Error fetching data: {e}")
-        return pd.DataFrame()
-
-def fetch_total_data(event_name):
-    """Fetch all emissions data."""
+def fetch_total_data(filters: FilterContext):
+    """Fetch emissions data for the active filters."""
     try:
-        conn = sqlite3.connect("data/emissions.db")
-        query = f"SELECT * FROM MasterEmissions WHERE Event = ? LIMIT 100;"
-        df = pd.read_sql_query(query, conn, params=(event_name,))
-        conn.close()
-        return df
+        where, params = filters.sql(event_column="Event")
+        query = f"SELECT * FROM MasterEmissions{where} LIMIT 100;"
+        return cached_read_sql(query, params)
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         logging.error(f"Error fetching total data: {e}")
         return pd.DataFrame()
 
-def convert_to_list(value):
-    """Convert string representations of lists into actual lists."""
-    try:
-        if isinstance(value, str) and value.startswith("["):
-            return ast.literal_eval(value)
-        return value
-    except Exception as e:
-        logging.warning(f"Error converting to list: {e}")
-        return value
-
-def process_data(df):
-    """Process and transform the emissions data."""
-    processed_data = []
-    event_cumulative = {}
-
-    # Process only the first 100 rows for testing
-    for _, row in df.head(100).iterrows():
-        _, SourceTable, Category, Event, Description, Quantity, Weight, Emission, Timestamp = row
-        
-        # Convert lists
-        Description = convert_to_list(Description)
-        Quantity = convert_to_list(Quantity)
-        Emission = convert_to_list(Emission)
-
-        # If Description is a list, split into multiple rows
-        if isinstance(Description, list):
-            for desc, qty, emi in zip(Description, Quantity, Emission):
-                processed_data.append([SourceTable, Category, Event, desc, qty, Weight, emi, Timestamp])
-        else:
-            processed_data.append([SourceTable, Category, Event, Description, Quantity, Weight, Emission, Timestamp])
-    
-    # Convert to DataFrame
-    transformed_df = pd.DataFrame(processed_data, columns=["SourceTable", "Category", "Event", "Description", "Quantity", "Weight", "Emission", "Timestamp"])
-
-    # Compute cumulative emissions per event
-    for event in transformed_df["Event"].unique():
-        event_cumulative[event] = transformed_df[transformed_df["Event"] == event]["Emission"].sum()
-
-    # Add cumulative emissions column
-    transformed_df["Cumulative Emission"] = transformed_df["Event"].map(event_cumulative)
-
-    # Assign unique row numbers
-    transformed_df.insert(0, "ID", range(1, len(transformed_df) + 1))
-
-    return transformed_df
-
-def display_emissions_summary(df):
+def display_emissions_summary(filters: FilterContext):
     """Display emissions summary by scope."""
-    global event_name
     if st.button("🔄 Refresh Data"):
-        event_name = get_latest_event()
+        reset_filters()
         st.rerun()
-    st.title(f"Event: {event_name}")
+    st.title(f"Event: {', '.join(filters.events) or 'All events'}")
+    live_emissions_summary(filters)
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_emissions_summary(filters: FilterContext):
+    """Scope totals that re-render on their own as new ledger rows arrive."""
+    feed = get_ledger_feed()
+    feed.poll()
+    snapshot = feed.snapshot(filters)
+    totals, latest = snapshot["scope_totals"], snapshot["scope_latest"]
+    df = pd.DataFrame({"Category": list(totals), "TotalEmissions": list(totals.values())})
 
     col1, col2, col3 = st.columns(3)
     with col1:
-        Scope1_Emission = df[df['Category'] == 'Scope1']['TotalEmissions'].sum()
-        Scope2_Emission = df[df['Category'] == 'Scope2']['TotalEmissions'].sum()
-        Scope3_Emission = df[df['Category'] == 'Scope3']['TotalEmissions'].sum()
+        Scope1_Emission = totals.get('Scope1', 0)
+        Scope2_Emission = totals.get('Scope2', 0)
+        Scope3_Emission = totals.get('Scope3', 0)
 
         st.write("Emissions by Category")
         st.markdown(f"""
@@ -145,7 +83,7 @@ def display_emissions_summary(df):
                 "Scope2": "#824E6A", 
                 "Scope3": "white"
             }
-            fig = px.pie(
+            fig = charts.pie(
                 df, 
                 values='TotalEmissions', 
                 names='Category', 
@@ -153,15 +91,15 @@ def display_emissions_summary(df):
                 color='Category',  # Assign colors by category
                 color_discrete_map=custom_colors  # Map categories to colors
             )
-            st.plotly_chart(fig, use_container_width=True, key="emissions_pie_chart")
+            charts.plot(fig, key="emissions_pie_chart")
         else:
             st.warning("No records found.")
 
     with col3:
         st.write("Highest Emissions recorded on")
-        day_Scope1_Emission = df[df['Category'] == 'Scope1']['Timestamp'].max()
-        day_Scope2_Emission = df[df['Category'] == 'Scope2']['Timestamp'].max()
-        day_Scope3_Emission = df[df['Category'] == 'Scope3']['Timestamp'].max()
+        day_Scope1_Emission = latest.get('Scope1')
+        day_Scope2_Emission = latest.get('Scope2')
+        day_Scope3_Emission = latest.get('Scope3')
 
         st.markdown(f"""
             <div style="padding:1px; border-radius:7px; background-color:#824E6A; color:black; text-align:center; 
@@ -185,9 +123,18 @@ def display_emissions_summary(df):
             </div>
         """, unsafe_allow_html=True)
 
-def display_gauge_chart(transformed_df):
-    """Display a gauge chart for cumulative emissions."""
-    latest_emission = transformed_df["Cumulative Emission"].iloc[-1]  # Get latest emission value
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def display_gauge_chart(filters: FilterContext):
+    """Display a live gauge chart for cumulative emissions."""
+    feed = get_ledger_feed()
+    feed.poll()
+    snapshot = feed.snapshot(filters)
+    event_totals = snapshot["event_totals"]
+    if not event_totals:
+        st.warning("No records found.")
+        return
+    latest_emission = event_totals[snapshot["last_event"]]  # Cumulative emission of the most recently updated event
+    max_emission = max(event_totals.values())
 
     st.title("Total Emission")
     fig = go.Figure(go.Indicator(
@@ -195,12 +142,12 @@ def display_gauge_chart(transformed_df):
         value=latest_emission, 
         title={'text': "Emission Levels"}, 
         gauge={
-            'axis': {'range': [0, transformed_df["Cumulative Emission"].max()]}, 
+            'axis': {'range': [0, max_emission]}, 
             'bar': {'color': "#003171"},
             'steps': [
                 {'range': [0, 50], 'color': "green"},
                 {'range': [50, 100], 'color': "yellow"},
-                {'range': [100, transformed_df["Cumulative Emission"].max()], 'color': "red"}
+                {'range': [100, max_emission], 'color': "red"}
             ],
             'threshold': {
                 'line': {'color': "black", 'width': 4},
@@ -210,41 +157,43 @@ def display_gauge_chart(transformed_df):
         }
     ))
 
-    st.plotly_chart(fig, use_container_width=True, key="gauge_chart")
+    charts.plot(fig, key="gauge_chart")
 
 
 
 def vis():
     """Main function to display the overall analysis."""
+    filters = filter_bar()
     with st.spinner("Loading data..."):
-        df = fetch_data(event_name)
-        transformed = process_data(fetch_total_data(event_name))
+        transformed = process_data(fetch_total_data(filters))
 
-    # Display emissions summary
-    display_emissions_summary(df)
+    # Display emissions summary (live)
+    display_emissions_summary(filters)
 
     # Transformed data visualizations
     c, co = st.columns(2)
     with c:
         d = st.selectbox("Select", ["SourceTable", "Category", "Event", "Description"])
-        fig1 = px.bar(transformed, x=d, y="Emission", title="Emissions by Category")
+        fig1 = charts.bar(transformed, x=d, y="Emission", title="Emissions by Category")
         fig1.update_traces(marker_color="#5C0071")
-        st.plotly_chart(fig1, use_container_width=True, key="f1")
+        charts.plot(fig1, key="f1")
     with co:
-        display_gauge_chart(transformed)
+        display_gauge_chart(filters)
 
     # Emissions trend over time
     col4, col5 = st.columns(2)
     with col4:
         st.write("Emission breakdown")
         category = st.selectbox("Select", ["SourceTable", "Category", "Event", "Description", "Cumulative Emission", "Timestamp"])
-        fig1 = px.bar(transformed, x="Cumulative Emission", y=category, title="Emission Trend", color_discrete_sequence=["blue", "green", "purple"])
-        st.plotly_chart(fig1, use_container_width=True, key="f2")
+        fig1 = charts.bar(transformed, x="Cumulative Emission", y=category, title="Emission Trend", color_discrete_sequence=["blue", "green", "purple"])
+        charts.plot(fig1, key="f2")
     with col5:
         st.subheader("📈 Emissions Over Time")
-        fig2 = px.line(transformed, x="Timestamp", y="Cumulative Emission", title="Emission Trend", color_discrete_sequence=["red", "blue", "green", "purple"], markers=True)
-        fig2.update_layout(hovermode="x unified", xaxis_title="Timestamp", yaxis_title="Cumulative Emission", legend_title="Legend", hoverlabel=dict(bgcolor="black", font_size=12, font_family="Arial"))
-        st.plotly_chart(fig2, use_container_width=True, key="f3")
+        grain = grain_selector(key="overall_trend_grain")
+        trend = time_buckets("MasterEmissions", grain, {"Emission": "Emission"}, {"Scope": "Category"}, filters=filters)
+        fig2 = charts.line(trend, x="Bucket", y="Emission", color="Scope", title="Emission Trend", color_discrete_sequence=["red", "blue", "green", "purple"], markers=True)
+        fig2.update_layout(hovermode="x unified", xaxis_title=grain.title(), yaxis_title="Emission", legend_title="Legend", hoverlabel=dict(bgcolor="black", font_size=12, font_family="Arial"))
+        charts.plot(fig2, key="f3")
 
 # Run the app
 if __name__ == "__main__":
@@ -0,0 +1,52 @@
+import logging
+from typing import Dict, Optional, Sequence
+import pandas as pd
+from common import cached_read_sql
+from visualizations.filters import FilterContext
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Line-item views over the tables that store JSON lists, so SQL can group by item
+FOOD_ITEMS_SOURCE = """(
+    SELECT f.id AS id, item.key AS ItemIndex, f.event AS event, item.value AS FoodItem,
+           CAST(qty.value AS REAL) AS Quantity, CAST(em.value AS REAL) AS Emission,
+           f.total_emission AS TotalEmission, f.Timestamp AS Timestamp, f.Epoch AS Epoch
+    FROM FoodItemsEmissions AS f,
+         json_each(f.food_items) AS item
+         JOIN json_each(f.quantity) AS qty ON qty.key = item.key
+         JOIN json_each(f.emission) AS em ON em.key = item.key
+)"""
+
+SCOPE1_ITEMS_SOURCE = """(
+    SELECT s.id AS id, fuel.key AS ItemIndex, s.event AS event, fuel.value AS Fuel,
+           CAST(cons.value AS REAL) AS Consumption, CAST(em.value AS REAL) AS Emission,
+           s.total_emission AS TotalEmission, s.Timestamp AS Timestamp, s.Epoch AS Epoch
+    FROM Scope1 AS s,
+         json_each(s.fuels) AS fuel
+         JOIN json_each(s.consumptions) AS cons ON cons.key = fuel.key
+         JOIN json_each(s.emissions) AS em ON em.key = fuel.key
+)"""
+
+
+def aggregate(source: str, group_by: Dict[str, str], measures: Dict[str, str],
+              where: str = "", params: Sequence = (), order_by: str = "",
+              filters: Optional[FilterContext] = None) -> pd.DataFrame:
+    """Push a GROUP BY aggregation into SQLite and return only the grouped rows.
+
+    ``source`` is a table name or a parenthesised sub-select; ``group_by`` and ``measures``
+    map output column names to SQL expressions, e.g. ``{"Emission": "SUM(Emission)"}``.
+    ``filters`` is ANDed onto ``where``.
+    """
+    if filters:
+        where, params = filters.combine(where, params)
+    columns = [f'{expr} AS "{name}"' for name, expr in {**group_by, **measures}.items()]
+    sql = f"SELECT {', '.join(columns)} FROM {source}"
+    if where:
+        sql += f" WHERE {where}"
+    if group_by:
+        sql += " GROUP BY " + ", ".join(str(i + 1) for i in range(len(group_by)))
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    return cached_read_sql(sql, params)
+
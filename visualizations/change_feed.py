@@ -0,0 +1,120 @@
+import sqlite3
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+from common import db_pool, get_db_path, query_cache
+from resources import registry
+from visualizations.filters import DISPLAY_TIMEZONE, FilterContext
+from visualizations.time_buckets import slice_seconds
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+LIVE_REFRESH_SECONDS = 5  # Poll interval of the live dashboard fragments
+POLL_BATCH_SIZE = 10_000  # Max ledger rows read per poll query
+
+
+class LedgerFeed:
+    """Incremental aggregates over MasterEmissions, fed by rows with id above the last one seen.
+
+    MasterEmissions ids come from AUTOINCREMENT, so they only ever grow; a poll reads just the
+    new rows and adds them into running (event, scope, day) totals. Days are local calendar days
+    in ``DISPLAY_TIMEZONE``, like the date filters. Polls are skipped outright while
+    ``PRAGMA data_version`` says nothing was committed.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._zone = ZoneInfo(DISPLAY_TIMEZONE)
+        self._slice = slice_seconds(DISPLAY_TIMEZONE)
+        self._days: Dict[int, str] = {}  # UTC slice -> local day; slices never straddle local midnight
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _local_day(self, epoch: int) -> str:
+        """Local 'YYYY-MM-DD' of a Unix time, the same bucketing ``time_buckets`` applies."""
+        slice_ = epoch // self._slice
+        day = self._days.get(slice_)
+        if day is None:
+            day = datetime.fromtimestamp(slice_ * self._slice, self._zone).date().isoformat()
+            self._days[slice_] = day
+        return day
+
+    def _reset(self):
+        self.last_id = 0
+        self.data_version = None
+        self.totals: Dict[tuple, float] = defaultdict(float)  # (Event, Category, day) -> kg CO₂
+        self.latest: Dict[tuple, str] = {}  # (Event, Category, day) -> newest Timestamp
+        self.event_last_id: Dict[str, int] = {}  # Event -> id of its newest row
+
+    def poll(self) -> int:
+        """Fold rows inserted since the last poll into the aggregates; returns how many were read."""
+        with self._lock:
+            version = query_cache.data_version(self.db_path)
+            if version == self.data_version:
+                return 0
+
+            new_rows = 0
+            try:
+                with db_pool(self.db_path).connection() as conn:
+                    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'MasterEmissions'").fetchone()
+                    if seq is None or seq[0] < self.last_id:
+                        # Ledger was recreated; start over
+                        self._reset()
+                    while True:
+                        rows = conn.execute(
+                            "SELECT id, Event, Category, Emission, Timestamp, Epoch FROM MasterEmissions "
+                            "WHERE id > ? ORDER BY id LIMIT ?",
+                            (self.last_id, POLL_BATCH_SIZE),
+                        ).fetchall()
+                        for id_, event, category, emission, timestamp, epoch in rows:
+                            key = (event, category, self._local_day(epoch) if epoch is not None else str(timestamp)[:10])
+                            self.totals[key] += emission or 0
+                            self.latest[key] = max(self.latest.get(key, ""), str(timestamp))
+                            self.event_last_id[event] = id_
+                            self.last_id = id_
+                        new_rows += len(rows)
+                        if len(rows) < POLL_BATCH_SIZE:
+                            break
+            except sqlite3.Error as e:
+                logging.error(f"Error polling ledger change feed: {e}")
+                return 0
+
+            self.data_version = version
+            if new_rows:
+                logging.info(f"Ledger feed: {new_rows} new rows (last id {self.last_id})")
+            return new_rows
+
+    def snapshot(self, filters: FilterContext) -> Dict[str, object]:
+        """Per-scope totals/latest timestamps and per-event totals for the rows matching ``filters``."""
+        start = filters.start.isoformat() if filters.start else ""
+        end = filters.end.isoformat() if filters.end else "9999-12-31"
+        events = set(filters.events)
+
+        scope_totals, scope_latest, event_totals = defaultdict(float), {}, defaultdict(float)
+        with self._lock:
+            for (event, category, day), total in self.totals.items():
+                if (events and event not in events) or not (start <= day <= end):
+                    continue
+                scope_totals[category] += total
+                event_totals[event] += total
+                scope_latest[category] = max(scope_latest.get(category, ""), self.latest[(event, category, day)])
+            last_event = max(event_totals, key=self.event_last_id.get) if event_totals else None
+
+        return {
+            "scope_totals": dict(scope_totals),
+            "scope_latest": scope_latest,
+            "event_totals": dict(event_totals),
+            "last_event": last_event,
+        }
+
+
+registry.register("ledger_feed", LedgerFeed, per_database=True, health=lambda feed: feed.poll() >= 0)
+
+
+def get_ledger_feed(db_path: Optional[str] = None) -> LedgerFeed:
+    """One shared feed per database, so every session polls the same aggregates."""
+    return registry.get("ledger_feed", db_path or get_db_path())
@@ -0,0 +1,183 @@
+import json
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# 📊 Rendering limits
+WEBGL_THRESHOLD = 1000  # Points per chart above which traces switch to WebGL
+PAYLOAD_BUDGET_BYTES = 1_000_000  # Serialized figure size allowed per chart
+BYTES_PER_VALUE = 24  # Upper estimate of one serialized per-point value (dates are the widest)
+FIGURE_OVERHEAD_BYTES = 10_000  # Layout and template of an empty figure
+MEASURE_ABOVE = 0.5  # Serialize to measure only when the estimate exceeds this share of the budget
+
+# Recent per-chart telemetry (title, points, payload bytes, WebGL, thinning)
+CHART_TELEMETRY: deque = deque(maxlen=200)
+
+# Per-point trace attributes that are thinned together when a chart is over budget
+_POINT_ATTRIBUTES = ("x", "y", "z", "text", "hovertext", "customdata", "ids")
+_MARKER_ATTRIBUTES = ("size", "color", "symbol", "opacity")
+
+
+def _render_mode(df: pd.DataFrame) -> str:
+    return "webgl" if len(df) > WEBGL_THRESHOLD else "svg"
+
+
+def _pre_aggregate(df: pd.DataFrame, keys: List[Optional[str]], value: str) -> pd.DataFrame:
+    """Sum ``value`` per key combination so pie/bar traces get one row per slice or bar.
+
+    Numeric keys other than the first (e.g. a continuous ``color``) are summed rather than grouped on.
+    """
+    keys = [k for k in dict.fromkeys(keys) if k and k in df.columns and k != value]
+    if not keys:
+        return df
+    values = [value] + [k for k in keys[1:] if pd.api.types.is_numeric_dtype(df[k])]
+    keys = [k for k in keys if k not in values]
+    if not df.duplicated(keys).any():
+        return df
+    return df.groupby(keys, as_index=False, observed=True, sort=False)[values].sum()
+
+
+def scatter(df: pd.DataFrame, **kwargs):
+    """``px.scatter`` that renders through WebGL (Scattergl) for large inputs."""
+    return px.scatter(df, render_mode=_render_mode(df), **kwargs)
+
+
+def line(df: pd.DataFrame, **kwargs):
+    """``px.line`` that renders through WebGL for large inputs."""
+    return px.line(df, render_mode=_render_mode(df), **kwargs)
+
+
+def scatter_3d(df: pd.DataFrame, **kwargs):
+    """``px.scatter_3d`` (always WebGL); goes through the payload budget like the rest."""
+    return px.scatter_3d(df, **kwargs)
+
+
+def pie(df: pd.DataFrame, names: str, values: str, **kwargs):
+    """``px.pie`` built from one row per slice."""
+    return px.pie(_pre_aggregate(df, [names, kwargs.get("color")], values), names=names, values=values, **kwargs)
+
+
+def bar(df: pd.DataFrame, x: str, y: str, **kwargs):
+    """``px.bar`` built from one row per bar (and colour group)."""
+    if pd.api.types.is_numeric_dtype(df[y]):
+        df = _pre_aggregate(df, [x, kwargs.get("color")], y)
+    else:
+        # Horizontal bars: the numeric axis is x
+        df = _pre_aggregate(df, [y, kwargs.get("color")], x)
+    return px.bar(df, x=x, y=y, **kwargs)
+
+
+def quantile_box(df: pd.DataFrame, x: str, **layout):
+    """Box plot drawn from precomputed quartiles and whiskers (``q1``, ``median``, ``q3``,
+    ``lowerfence``, ``upperfence`` columns), e.g. from quantile sketches, so no raw rows are sent."""
+    fig = go.Figure(go.Box(
+        x=df[x], q1=df["q1"], median=df["median"], q3=df["q3"],
+        lowerfence=df["lowerfence"], upperfence=df["upperfence"], name="",
+    ))
+    fig.update_layout(**layout)
+    return fig
+
+
+def _points(trace) -> int:
+    """Number of plotted points in a trace (0 for traces without x/y arrays, e.g. pies)."""
+    values = getattr(trace, "x", None)
+    if values is None:
+        values = getattr(trace, "y", None)
+    return 0 if values is None or isinstance(values, str) else len(values)
+
+
+def _is_array(values, length: int) -> bool:
+    return values is not None and not isinstance(values, (str, int, float)) and len(values) == length
+
+
+def _thin_trace(trace, step: int):
+    """Keep every ``step``-th point of a trace (all per-point arrays stay aligned)."""
+    length = _points(trace)
+    for attribute in _POINT_ATTRIBUTES:
+        values = getattr(trace, attribute, None)
+        if _is_array(values, length):
+            setattr(trace, attribute, values[::step])
+    marker = getattr(trace, "marker", None)
+    for attribute in _MARKER_ATTRIBUTES:
+        values = getattr(marker, attribute, None) if marker is not None else None
+        if _is_array(values, length):
+            setattr(marker, attribute, values[::step])
+
+
+def estimate_payload(fig) -> int:
+    """Upper estimate of the serialized figure size from its per-point arrays, without serializing."""
+    size = FIGURE_OVERHEAD_BYTES
+    for trace in fig.data:
+        length = _points(trace)
+        if length:
+            marker = getattr(trace, "marker", None)
+            arrays = sum(_is_array(getattr(trace, a, None), length) for a in _POINT_ATTRIBUTES)
+            arrays += sum(_is_array(getattr(marker, a, None), length) for a in _MARKER_ATTRIBUTES) if marker is not None else 0
+            size += length * arrays * BYTES_PER_VALUE
+    return size
+
+
+def enforce_budget(fig, budget: int = PAYLOAD_BUDGET_BYTES) -> Dict[str, object]:
+    """Thin point traces so the serialized figure fits ``budget``; returns the chart's telemetry.
+
+    The size is estimated from point counts; the figure is only serialized when the estimate is near the budget.
+    """
+    payload = estimate_payload(fig)
+    measured = payload > budget * MEASURE_ABOVE
+    if measured:
+        payload = len(fig.to_json())
+    record = {
+        "title": fig.layout.title.text,
+        "points": sum(_points(t) for t in fig.data),
+        "bytes": payload,
+        "measured": measured,
+        "webgl": any(t.type in ("scattergl", "scatter3d") for t in fig.data),
+        "thinned": 1,
+    }
+    point_traces = [t for t in fig.data if t.type in ("scatter", "scattergl", "scatter3d")]
+    if payload > budget and point_traces:
+        step = -(-payload // budget)  # ceil
+        for trace in point_traces:
+            _thin_trace(trace, step)
+        record.update(thinned=step, bytes=estimate_payload(fig), measured=False,
+                      points=sum(_points(t) for t in fig.data))
+        logging.warning(f"Chart '{record['title']}' over payload budget ({payload} > {budget} bytes), kept every {step}th point")
+    CHART_TELEMETRY.append(record)
+    logging.info(f"Chart telemetry: {json.dumps(record, default=str)}")
+    return record
+
+
+def zoom_range(key: str) -> Optional[Tuple]:
+    """x-range a zoomable chart is zoomed to (its last box selection), or None for the full range.
+
+    Streamlit reports selections but not plotly's zoom, so charts plotted with ``zoom=True`` zoom by box
+    selection; pass the range to ``downsample`` (or the chart's query) to re-sample just that span.
+    """
+    state = st.session_state.get(key) or {}
+    boxes = (state.get("selection") or {}).get("box") or []
+    x = boxes[-1].get("x") if boxes else None
+    return (min(x), max(x)) if x and len(x) == 2 else None
+
+
+def plot(fig, key: Optional[str] = None, budget: int = PAYLOAD_BUDGET_BYTES, zoom: bool = False):
+    """Render a figure full width after applying the payload budget.
+
+    With ``zoom`` (which needs a ``key``), a box selection reruns the page and the x-axis shows ``zoom_range(key)``.
+    """
+    enforce_budget(fig, budget)
+    if not zoom:
+        st.plotly_chart(fig, use_container_width=True, key=key)
+        return
+    x_range = zoom_range(key)
+    if x_range:
+        fig.update_xaxes(range=list(x_range))
+    st.plotly_chart(fig, use_container_width=True, key=key, on_select="rerun", selection_mode="box")
+    st.caption("Zoomed to the selected range; double-click the chart to zoom out." if x_range
+               else "Drag a box over the chart to zoom in at full resolution.")
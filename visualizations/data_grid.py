@@ -0,0 +1,185 @@
+import logging
+import sqlite3
+from typing import Dict, List, Optional, Sequence
+import pandas as pd
+import streamlit as st
+from common import EPOCH_TABLES, cached_query, cached_read_sql
+from visualizations.filters import FilterContext
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PAGE_SIZES = (25, 50, 100)
+DISTINCT_OPTION_LIMIT = 100  # Text columns with more values get a "contains" box instead of a picklist
+# Sort columns with an indexed stand-in that orders rows the same way (common.GRID_SORT_INDEXES)
+SORT_SUBSTITUTES = {"Timestamp": "Epoch"}
+
+
+def _python(value):
+    """Plain Python scalar for a pandas/numpy value, so sqlite3 can bind it."""
+    return value.item() if hasattr(value, "item") else value
+
+
+def _column_kinds(source: str, columns: Dict[str, str]) -> Dict[str, str]:
+    """'number' or 'text' for every column, from the SQLite type of the first row."""
+    probe = ", ".join(f"typeof({expr})" for expr in columns.values())
+    rows = cached_query(f"SELECT {probe} FROM {source} LIMIT 1")
+    types = rows[0] if rows else ("text",) * len(columns)
+    return {name: "number" if kind in ("integer", "real") else "text" for name, kind in zip(columns, types)}
+
+
+def _sort_expression(source: str, expr: str) -> str:
+    """The indexed column to sort ``expr`` on, where the source has one."""
+    substitute = SORT_SUBSTITUTES.get(expr)
+    if substitute and (source in EPOCH_TABLES or f" AS {substitute}" in source):
+        return substitute
+    return expr
+
+
+def _bands(descending: bool) -> List[bool]:
+    """SQLite orders NULLs lowest: the NULL band (True) comes first ascending and last descending."""
+    return [False, True] if descending else [True, False]
+
+
+def _band_page(source: str, selected: List[str], where: str, params: List, sort_expr: str,
+               key_columns: Sequence[str], descending: bool, null_band: bool, after: Optional[List],
+               limit: int) -> pd.DataFrame:
+    """Up to ``limit`` rows of one band, after the ``after`` cursor values (sort value, then keys).
+
+    Each band is one index range: ``sort IS NOT NULL`` ordered by (sort, keys), or ``sort IS NULL``
+    ordered by the keys alone, so the seek is a plain row-value comparison.
+    """
+    order = list(key_columns) if null_band else [sort_expr, *key_columns]
+    clauses = [f"{sort_expr} IS {'' if null_band else 'NOT '}NULL"]
+    values = list(params)
+    if after is not None:
+        bound = after[1:] if null_band else after
+        clauses.append(f"({', '.join(order)}) {'<' if descending else '>'} ({', '.join('?' for _ in order)})")
+        values += bound
+    if where:
+        clauses.insert(0, f"({where})")
+    direction = "DESC" if descending else "ASC"
+    sql = (f"SELECT {', '.join(selected)} FROM {source} WHERE {' AND '.join(clauses)} "
+           f"ORDER BY {', '.join(f'{column} {direction}' for column in order)} LIMIT {limit}")
+    return cached_read_sql(sql, values)
+
+
+def _column_filters(source: str, columns: Dict[str, str], where: str, params: List, key: str):
+    """Widgets for the columns the user picked; returns their conditions ANDed onto ``where``."""
+    chosen = st.multiselect("Filter table on", list(columns), key=f"{key}_filter_on")
+    if not chosen:
+        return where, params
+
+    kinds = _column_kinds(source, columns)
+    base = f" WHERE {where}" if where else ""
+    clauses, values = [], []
+    for name in chosen:
+        expr = columns[name]
+        if kinds[name] == "number":
+            low, high = cached_query(f"SELECT MIN({expr}), MAX({expr}) FROM {source}{base}", params)[0]
+            if low is None or low == high:
+                continue
+            selected = st.slider(f"Values for {name}", float(low), float(high), (float(low), float(high)),
+                                 key=f"{key}_range_{name}")
+            clauses.append(f"{expr} BETWEEN ? AND ?")
+            values.extend(selected)
+            continue
+
+        options = [row[0] for row in cached_query(
+            f"SELECT DISTINCT {expr} FROM {source}{base} ORDER BY 1 LIMIT {DISTINCT_OPTION_LIMIT + 1}", params)]
+        if len(options) <= DISTINCT_OPTION_LIMIT:
+            selected = st.multiselect(f"Values for {name} (leave empty for all)", options, key=f"{key}_values_{name}")
+            if selected:
+                clauses.append(f"{expr} IN ({', '.join('?' for _ in selected)})")
+                values.extend(selected)
+        else:
+            text = st.text_input(f"{name} contains", key=f"{key}_contains_{name}")
+            if text:
+                clauses.append(f"{expr} LIKE ? ESCAPE '\\'")
+                escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                values.append(f"%{escaped}%")
+
+    parts = [part for part in (where, *clauses) if part]
+    return " AND ".join(f"({part})" for part in parts), list(params) + values
+
+
+# 📋 Data Grid
+def data_grid(source: str, columns: Dict[str, str], key: str, filters: Optional[FilterContext] = None,
+              where: str = "", params: Sequence = (), key_columns: Sequence[str] = ("id",),
+              sort: Optional[str] = "Timestamp", descending: bool = True) -> pd.DataFrame:
+    """Filterable, sortable table that fetches one page at a time from SQLite.
+
+    ``columns`` maps display names to SQL expressions over ``source`` (a table or sub-select, as in
+    ``aggregate``); ``key_columns`` must make rows unique. Pages are read with keyset pagination on the
+    raw sort column (``WHERE (sort, key) < (last row)``), so with an index on the sort column (Timestamp
+    sorts on the indexed Epoch) each rerun reads a single page however large the table is. Returns the
+    visible page.
+    """
+    if filters:
+        where, params = filters.combine(where, params)
+    params = list(params)
+
+    with st.expander("🔎 Table filters", expanded=False):
+        where, params = _column_filters(source, columns, where, params, key)
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        names = list(columns)
+        sort_name = st.selectbox("Sort by", names, index=names.index(sort) if sort in names else 0, key=f"{key}_sort")
+    with col2:
+        descending = st.toggle("Descending", value=descending, key=f"{key}_descending")
+    with col3:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size")
+
+    sort_expr = _sort_expression(source, columns[sort_name])
+    order = ["_sort", *(f"_key{i}" for i in range(len(key_columns)))]
+
+    # Start over from the first page whenever the query itself changes
+    signature = (source, where, tuple(params), sort_name, descending, page_size)
+    if st.session_state.get(f"{key}_signature") != signature:
+        st.session_state[f"{key}_signature"] = signature
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state[f"{key}_cursors"]
+
+    # A cursor is (in NULL band, sort value, *keys) of the last row shown; NULL sort values are a band of
+    # their own, since they drop out of row-value comparisons
+    selected = [f'{expr} AS "{name}"' for name, expr in columns.items()]
+    selected += [f"{sort_expr} AS _sort", *(f"{column} AS _key{i}" for i, column in enumerate(key_columns))]
+    bands = _bands(descending)
+    cursor = cursors[-1]
+    if cursor is not None:
+        bands = bands[bands.index(cursor[0]):]
+
+    try:
+        parts = []
+        for null_band in bands:
+            after = cursor[1:] if cursor is not None and null_band == cursor[0] else None
+            parts.append(_band_page(source, selected, where, params, sort_expr, key_columns, descending,
+                                    null_band, after, page_size + 1 - sum(len(part) for part in parts)))
+            if sum(len(part) for part in parts) > page_size:
+                break
+        page = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        total = cached_query(f"SELECT COUNT(*) FROM {source}" + (f" WHERE {where}" if where else ""), params)[0][0]
+    except sqlite3.Error as e:
+        st.error(f"Database error: {e}")
+        logging.error(f"Error fetching grid page from {source}: {e}")
+        return pd.DataFrame(columns=list(columns))
+
+    has_next = len(page) > page_size
+    page = page.head(page_size)
+    st.dataframe(page[list(columns)], use_container_width=True, hide_index=True)
+
+    first = (len(cursors) - 1) * page_size
+    nav1, nav2, nav3 = st.columns([1, 3, 1])
+    with nav1:
+        st.button("◀ Previous", key=f"{key}_previous", disabled=len(cursors) == 1, on_click=cursors.pop)
+    with nav2:
+        shown = f"{first + 1}–{first + len(page)}" if len(page) else "0"
+        st.caption(f"Rows {shown} of {total}")
+    with nav3:
+        last = None
+        if len(page):
+            values = [None if pd.isna(value) else _python(value) for value in page.iloc[-1][order]]
+            last = [values[0] is None, *values]
+        st.button("Next ▶", key=f"{key}_next", disabled=not has_next, on_click=cursors.append, args=(last,))
+
+    return page[list(columns)]
@@ -0,0 +1,104 @@
+import logging
+from typing import Optional, Sequence
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Charts are drawn with use_container_width, so assume a wide-layout column
+CHART_WIDTH_PX = 1200
+POINTS_PER_PX = 2  # More than this per horizontal pixel is invisible
+
+
+def target_points(width_px: int = CHART_WIDTH_PX, points_per_px: float = POINTS_PER_PX) -> int:
+    """Number of points worth sending for a chart of the given pixel width."""
+    return max(3, int(width_px * points_per_px))
+
+
+def _as_float(values: pd.Series, date_format: Optional[str] = None) -> np.ndarray:
+    """Numeric view of an x/y column; timestamps become epoch nanoseconds (NaN where unparseable)."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype="float64")
+    parsed = pd.to_datetime(values, errors="coerce", format=date_format)
+    if parsed.notna().any():
+        # Always nanoseconds, whatever resolution pandas inferred, so columns and ranges compare
+        nanos = parsed.to_numpy(dtype="datetime64[ns]").astype("int64").astype("float64")
+        nanos[parsed.isna().to_numpy()] = np.nan
+        return nanos
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of ``n_out`` points that keep the visual shape."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # Twice the triangle area between the last pick, each candidate and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Min/max bucketing: the lowest and highest point of each of ``n_out // 2`` equal-width x buckets."""
+    n = len(x)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+
+    buckets = max(1, n_out // 2)
+    span = x[-1] - x[0]
+    bucket = np.zeros(n, dtype=np.int64) if span == 0 else np.minimum(((x - x[0]) / span * buckets).astype(np.int64), buckets - 1)
+    frame = pd.DataFrame({"bucket": bucket, "y": y})
+    grouped = frame.groupby("bucket", sort=False)["y"]
+    return np.unique(np.concatenate([grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy(), [0, n - 1]]))
+
+
+METHODS = {"lttb": lttb, "minmax": minmax}
+
+
+def in_range(df: pd.DataFrame, x: str, x_range: Sequence) -> pd.DataFrame:
+    """Rows whose ``x`` lies within ``x_range`` (two values, as a chart reports them)."""
+    low, high = np.sort(_as_float(pd.Series(list(x_range)), date_format="mixed"))  # Charts send e.g. "2025-01-01 12:00"
+    xs = _as_float(df[x])
+    return df[(xs >= low) & (xs <= high)]
+
+
+def downsample(df: pd.DataFrame, x: str, y: str, n_out: Optional[int] = None,
+               by: Optional[str] = None, method: str = "lttb", x_range: Optional[Sequence] = None) -> pd.DataFrame:
+    """Reduce ``df`` to at most ``n_out`` rows per series before plotting.
+
+    Rows are sorted by ``x`` and picked whole, so other columns (colour, size, hover) still line up.
+    With ``by``, each series gets its own budget. ``n_out`` defaults to the chart width, spent on the
+    visible ``x_range`` only (e.g. ``charts.zoom_range``), so zooming in shows more detail.
+    """
+    if x_range is not None:
+        df = in_range(df, x, x_range)
+    n_out = n_out or target_points()
+    if len(df) <= n_out:
+        return df
+
+    pick = METHODS[method]
+    frames = []
+    groups = df.groupby(by, sort=False, observed=True) if by else [(None, df)]
+    for _, group in groups:
+        xs, ys = _as_float(group[x]), _as_float(group[y])
+        valid = ~(np.isnan(xs) | np.isnan(ys))
+        group, xs, ys = group[valid], xs[valid], ys[valid]
+        order = np.argsort(xs, kind="stable")
+        frames.append(group.iloc[order[pick(xs[order], ys[order], n_out)]])
+
+    sampled = pd.concat(frames) if frames else df.iloc[:0]
+    logging.debug(f"Downsampled {y} over {x}: {len(df)} -> {len(sampled)} points ({method})")
+    return sampled
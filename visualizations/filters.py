@@ -0,0 +1,129 @@
+import logging
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+import streamlit as st
+from common import DISPLAY_TIMEZONE, cached_query
+from session_store import persist_key
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Session key holding the filter context shared by every visualization page
+FILTER_STATE_KEY = "filter_context"
+
+
+def local_today(tz: Optional[str] = None) -> date:
+    """Today's date in ``tz`` (the display timezone by default), the day the daily rollups file new rows under."""
+    return datetime.now(ZoneInfo(tz or DISPLAY_TIMEZONE)).date()
+
+
+def day_start_epoch(day: date, tz: Optional[str] = None) -> int:
+    """Unix time of local midnight at the start of ``day``."""
+    return int(datetime(day.year, day.month, day.day, tzinfo=ZoneInfo(tz or DISPLAY_TIMEZONE)).timestamp())
+
+
+@dataclass(frozen=True)
+class FilterContext:
+    """Event set, date range and scope applied to every visualization query.
+
+    An empty ``events`` tuple means all events; ``start``/``end`` are inclusive dates.
+    """
+    events: Tuple[str, ...] = ()
+    start: Optional[date] = None
+    end: Optional[date] = None
+    scope: Optional[str] = None
+
+    def where(self, event_column: str = "event", timestamp_column: str = "Epoch",
+              scope_column: Optional[str] = None, epoch: bool = True) -> Tuple[str, List]:
+        """Render the filters as an index-friendly WHERE clause (without the keyword) and its params.
+
+        The date range is matched on the integer ``Epoch`` column by default, from local midnight
+        in ``DISPLAY_TIMEZONE``; with ``epoch=False`` it compares 'YYYY-MM-DD' text (e.g. a ``Day`` column).
+        """
+        clauses, params = [], []
+        if self.events:
+            clauses.append(f"{event_column} IN ({', '.join('?' for _ in self.events)})")
+            params.extend(self.events)
+        if self.start:
+            clauses.append(f"{timestamp_column} >= ?")
+            params.append(day_start_epoch(self.start) if epoch else self.start.isoformat())
+        if self.end:
+            # Everything before the start of the next day
+            clauses.append(f"{timestamp_column} < ?")
+            end = self.end + timedelta(days=1)
+            params.append(day_start_epoch(end) if epoch else end.isoformat())
+        if self.scope and scope_column:
+            clauses.append(f"{scope_column} = ?")
+            params.append(self.scope)
+        return " AND ".join(clauses), params
+
+    def combine(self, where: str = "", params: Sequence = (), **columns) -> Tuple[str, List]:
+        """AND an extra condition onto the filter clause."""
+        clause, filter_params = self.where(**columns)
+        parts = [part for part in (clause, where) if part]
+        return " AND ".join(f"({part})" for part in parts), filter_params + list(params)
+
+    def sql(self, **columns) -> Tuple[str, List]:
+        """The filter as a ``WHERE ...`` suffix, or an empty string when nothing is filtered."""
+        clause, params = self.where(**columns)
+        return (f" WHERE {clause}" if clause else ""), params
+
+
+def _encode_filters(filters: FilterContext) -> dict:
+    return {"events": list(filters.events), "start": filters.start and filters.start.isoformat(),
+            "end": filters.end and filters.end.isoformat()}
+
+
+def _decode_filters(value: dict) -> FilterContext:
+    return FilterContext(events=tuple(value["events"]),
+                         start=value["start"] and date.fromisoformat(value["start"]),
+                         end=value["end"] and date.fromisoformat(value["end"]))
+
+
+# The selected events and dates follow the user to any replica
+persist_key(FILTER_STATE_KEY, _encode_filters, _decode_filters)
+
+
+def list_events() -> List[str]:
+    """All event names, newest first."""
+    return [row[0] for row in cached_query("SELECT name FROM Events ORDER BY id DESC")]
+
+
+def get_filters() -> FilterContext:
+    """Current filter context; defaults to the latest event."""
+    if FILTER_STATE_KEY not in st.session_state:
+        events = list_events()
+        st.session_state[FILTER_STATE_KEY] = FilterContext(events=tuple(events[:1]))
+    return st.session_state[FILTER_STATE_KEY]
+
+
+def reset_filters():
+    """Drop the stored context (and widget state) so the next run starts from the latest event."""
+    for key in (FILTER_STATE_KEY, "filter_events", "filter_dates"):
+        st.session_state.pop(key, None)
+
+
+# 🔎 Filter Bar
+def filter_bar(scope: Optional[str] = None) -> FilterContext:
+    """Render the shared event/date filter and return the context for this page's scope."""
+    current = get_filters()
+    events = list_events()
+    with st.expander("🔎 Filters", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            selected = st.multiselect(
+                "Events (leave empty for all)", events,
+                default=[e for e in current.events if e in events], key="filter_events",
+            )
+        with col2:
+            date_range = st.date_input(
+                "Date range", value=tuple(d for d in (current.start, current.end) if d), key="filter_dates",
+            )
+
+    # A range picker returns 0, 1 or 2 dates while the user is still choosing
+    dates = tuple(date_range) if isinstance(date_range, (list, tuple)) else (date_range,)
+    filters = FilterContext(events=tuple(selected), start=dates[0] if dates else None, end=dates[-1] if dates else None)
+    st.session_state[FILTER_STATE_KEY] = filters
+    return replace(filters, scope=scope)
@@ -0,0 +1,101 @@
+import json
+import logging
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# MasterEmissions columns carried into the transformed ledger
+LEDGER_COLUMNS = ["SourceTable", "Category", "Event", "Description", "Quantity", "Weight", "Emission", "Timestamp"]
+
+# Columns that may hold JSON lists (one element per line item)
+LIST_COLUMNS = ["Description", "Quantity", "Emission"]
+
+# Low-cardinality columns stored as categoricals
+CATEGORICAL_COLUMNS = ["SourceTable", "Category", "Event", "Description"]
+
+
+def _loads(value):
+    """Parse a JSON list, leaving the raw value in place if it isn't one."""
+    try:
+        return json.loads(value)
+    except ValueError as e:
+        logging.warning(f"Error converting to list: {e}")
+        return value
+
+
+def _parse_list_column(values: pd.Series):
+    """Decode only the cells that look like JSON lists; returns (values, list lengths or NaN)."""
+    lengths = pd.Series(float("nan"), index=values.index)
+    if pd.api.types.is_numeric_dtype(values):
+        return values, lengths
+    if pd.api.types.is_string_dtype(values) and values.dtype != object:
+        is_list = values.str.startswith("[", na=False).astype(bool)
+    else:
+        # Mixed object column: only cells that aren't numbers can hold a list
+        candidates = pd.to_numeric(values, errors="coerce").isna() & values.notna()
+        is_list = pd.Series(False, index=values.index)
+        is_list[candidates] = values[candidates].astype(str).str.startswith("[")
+    values = values.astype(object)
+    if is_list.any():
+        cells = values[is_list]
+        try:
+            # One C-level parse for the whole column instead of one call per cell
+            parsed = json.loads("[" + ",".join(cells) + "]")
+        except ValueError:
+            parsed = [_loads(cell) for cell in cells]
+        values[is_list] = pd.Series(parsed, index=cells.index, dtype=object)
+        lengths[is_list] = [len(v) if isinstance(v, list) else float("nan") for v in parsed]
+    return values, lengths
+
+
+def _align_list_row(row: pd.Series) -> pd.Series:
+    """Zip a ragged row: broadcast scalars and truncate to the shortest list."""
+    lists = {c: row[c] for c in LIST_COLUMNS if isinstance(row[c], list)}
+    length = min(len(v) for v in lists.values())
+    for column in LIST_COLUMNS:
+        row[column] = row[column][:length] if column in lists else [row[column]] * length
+    return row
+
+
+def process_data(df: pd.DataFrame) -> pd.DataFrame:
+    """Explode list line items and add per-event cumulative emissions (vectorized)."""
+    if df.empty:
+        return pd.DataFrame(columns=["ID"] + LEDGER_COLUMNS + ["Cumulative Emission"])
+
+    transformed = df[LEDGER_COLUMNS].copy()
+    lengths = pd.DataFrame(index=transformed.index, columns=LIST_COLUMNS, dtype="float64")
+    for column in LIST_COLUMNS:
+        transformed[column], lengths[column] = _parse_list_column(transformed[column])
+
+    # A multi-column explode needs equal list lengths per row; fix up the rare ragged ones
+    has_list = lengths.notna().any(axis=1)
+    ragged = has_list & (lengths.isna().any(axis=1) | (lengths.max(axis=1) != lengths.min(axis=1)))
+    if ragged.any():
+        transformed.loc[ragged, LIST_COLUMNS] = transformed.loc[ragged, LIST_COLUMNS].apply(_align_list_row, axis=1)
+
+    # One output row per line item: list rows repeat per item (an empty list drops the row, where
+    # DataFrame.explode would leave an all-NaN one), scalar rows once; order is kept without a re-sort
+    counts = lengths.min(axis=1).fillna(1).astype("int64").to_numpy()
+    items = np.repeat(has_list.to_numpy(), counts)
+    exploded = transformed.iloc[np.repeat(np.arange(len(transformed)), counts)].reset_index(drop=True)
+    for column in LIST_COLUMNS:
+        if items.any():
+            values = exploded[column].to_numpy(dtype=object, copy=True)
+            values[items] = np.fromiter(chain.from_iterable(transformed.loc[has_list, column]), dtype=object,
+                                        count=int(items.sum()))
+            exploded[column] = values
+    transformed = exploded
+    transformed["Quantity"] = pd.to_numeric(transformed["Quantity"], errors="coerce")
+    transformed["Emission"] = pd.to_numeric(transformed["Emission"], errors="coerce")
+    for column in CATEGORICAL_COLUMNS:
+        transformed[column] = transformed[column].astype(str).astype("category")
+
+    # Cumulative emissions per event in a single grouped pass
+    transformed["Cumulative Emission"] = transformed.groupby("Event", observed=True)["Emission"].transform("sum")
+
+    # Assign unique row numbers
+    transformed.insert(0, "ID", range(1, len(transformed) + 1))
+    return transformed
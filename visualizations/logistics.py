@@ -1,27 +1,38 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from geopy.distance import geodesic
-import openrouteservice
 import logging
-import os
+from datetime import datetime
+from modules.routing import get_routing_engine
+from modules.geo_client import GEOCODE_CACHE, MISSING, ROUTE_CACHE, get_ors_client, place_key, route_key
+from modules.shipment import (
+    EMISSION_FACTOR, RAIL_ROAD_RATIO, TRANSPORT_MODES,
+    calculate_leg_emissions, insert_shipments, show_shipment_upload,
+)
+from visualizations import charts
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# API Key for OpenRouteService (Replace with your actual key)
-ORS_API_KEY = os.getenv("ORS_API_KEY", "5b3ce3597851110001cf6248afd4bb63fe3a470bb0061a1ac1d8a410")
-
-# Initialize OpenRouteService Client
-client = openrouteservice.Client(key=ORS_API_KEY)
-
 # Function to get coordinates using OpenRouteService
 def get_coordinates(place):
     """Get coordinates (latitude, longitude) for a given place."""
+    # Known hubs resolve offline from the bundled network extract
+    coords = get_routing_engine().coordinates(place)
+    if coords:
+        return coords
+    cached = GEOCODE_CACHE.get(place_key(place), MISSING)
+    if cached is not MISSING:
+        return cached
+    client = get_ors_client()
+    if client is None:
+        return None
+
     try:
         response = client.pelias_search(place)
         if response and 'features' in response and len(response['features']) > 0:
             location = response['features'][0]['geometry']['coordinates']
+            GEOCODE_CACHE[place_key(place)] = (location[1], location[0])
             return (location[1], location[0])  # Return (lat, lon)
     except Exception as e:
         st.error(f"Geocoding error: {e}")
@@ -31,6 +42,15 @@ def get_coordinates(place):
 # Function to calculate distance via OpenRouteService
 def calculate_distance_via_ors(origin, destination, profile):
     """Calculate distance between two locations using OpenRouteService."""
+    key = route_key(origin, destination, profile)
+    cached = ROUTE_CACHE.get(key, MISSING)
+    if cached is not MISSING:
+        return cached
+    client = get_ors_client()
+    if client is None:
+        st.warning("Online routing is disabled (ORS_API_KEY is not set); only places in the offline network can be routed.")
+        return None
+
     coords_origin = get_coordinates(origin)
     coords_dest = get_coordinates(destination)
 
@@ -39,7 +59,9 @@ def calculate_distance_via_ors(origin, destination, profile):
         try:
             routes = client.directions(coordinates=coordinates, profile=profile)
             distance_m = routes['routes'][0]['summary']['distance']
-            return round(distance_m / 1000, 2)  # Convert meters to kilometers
+            distance = round(distance_m / 1000, 2)  # Convert meters to kilometers
+            ROUTE_CACHE[key] = distance
+            return distance
         except Exception as e:
             st.error(f"Error fetching data from ORS: {e}")
             logging.error(f"ORS API error: {e}")
@@ -48,12 +70,27 @@ def calculate_distance_via_ors(origin, destination, profile):
         st.error("Could not geocode the provided locations.")
         return None
 
+# Function to calculate road distance
+def calculate_road_distance(origin, destination, profile="driving-car"):
+    """Calculate road distance, using the offline network before falling back to ORS."""
+    distance = get_routing_engine().distance(origin, destination, "road")
+    if distance is not None:
+        return distance
+    logging.info(f"{origin} -> {destination} not in road network, falling back to ORS")
+    return calculate_distance_via_ors(origin, destination, profile)
+
 # Function to calculate rail distance
 def calculate_rail_distance(origin, destination):
     """Calculate rail distance between two locations."""
+    distance = get_routing_engine().distance(origin, destination, "rail")
+    if distance is not None:
+        return distance
+
+    # Places outside the rail extract: approximate from the ORS HGV route
+    logging.info(f"{origin} -> {destination} not in rail network, approximating via ORS")
     raw_distance = calculate_distance_via_ors(origin, destination, 'driving-hgv')
     if raw_distance:
-        return round(raw_distance * 0.968, 2)  # Adjust for rail efficiency
+        return round(raw_distance * RAIL_ROAD_RATIO, 2)  # Adjust for rail efficiency
     return None
 
 # Function to calculate air distance
@@ -65,18 +102,8 @@ def calculate_air_distance(origin, destination):
         return round(geodesic(coords_origin, coords_dest).km, 2)
     return None
 
-# Constants
-EMISSION_FACTOR = 1.58  # Emission factor per km per kg
-
-# Transport modes and efficiency
-TRANSPORT_MODES = {
-    "Truck": {"profile": "driving-car", "efficiency": 1.9},
-    "Rail": {"profile": "driving-hgv", "efficiency": 0.6},  # Heavy Goods Vehicle as a proxy
-    "Air": {"profile": None, "efficiency": 3.0}  # Geodesic Distance for Air
-}
-
 # Streamlit UI
-def logist_vis():
+def logist_vis(event=None):
     """Display the logistics emission calculator."""
     st.title("📦 Logistics Emission Calculator")
     st.subheader("Auto-compute CO₂ emissions based on real-world distances")
@@ -97,7 +124,7 @@ def logist_vis():
             distance = calculate_rail_distance(origin, destination)
         else:
             profile = TRANSPORT_MODES[transport_mode]["profile"]
-            distance = calculate_distance_via_ors(origin, destination, profile)
+            distance = calculate_road_distance(origin, destination, profile)
 
         if distance:
             st.write(f"🚗 Estimated Distance: **{distance} km**")
@@ -123,12 +150,31 @@ def logist_vis():
 
         # Bar Chart
         st.subheader("Emission Comparison by Transport Mode")
-        fig = px.bar(data, x="Transport Mode", y="Emission (kg CO₂)", color="Transport Mode", text="Emission (kg CO₂)")
-        st.plotly_chart(fig, use_container_width=True)
+        fig = charts.bar(data, x="Transport Mode", y="Emission (kg CO₂)", color="Transport Mode", text="Emission (kg CO₂)")
+        charts.plot(fig)
 
         # Conclusion
         st.success(f"Transporting {weight} kg of {material} from {origin} to {destination} via {transport_mode} emits **{total_emission} kg CO₂**.")
 
+        # Persist as a single-leg shipment
+        if st.button("Save Shipment", key="save_single_shipment"):
+            if not event:
+                st.warning("Event name is not set. Please go to the Overview page and save an event first.")
+            else:
+                # References are unique per event; a double click within the same second is saved once
+                reference = f"{origin}-{destination} {material} {datetime.now():%Y-%m-%d %H:%M:%S}"
+                leg = calculate_leg_emissions(pd.DataFrame([{
+                    "Shipment": reference, "Material": material, "Weight": float(weight),
+                    "LegNo": 1, "Mode": transport_mode, "Origin": origin, "Destination": destination,
+                    "Distance": float(distance),
+                }]))
+                if insert_shipments(event, leg):
+                    st.success("Shipment saved to the emissions ledger.")
+
+    # Multi-leg shipments from a manifest
+    st.markdown("---")
+    show_shipment_upload(event)
+
 # Run the app
 if __name__ == "__main__":
     logist_vis()
\ No newline at end of file
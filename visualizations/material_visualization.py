@@ -1,55 +1,34 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import sqlite3
 import logging
+from typing import Optional
+from common import cached_query
+from visualizations.aggregations import aggregate
+from visualizations.data_grid import data_grid
+from visualizations.downsample import downsample
+from visualizations.filters import FilterContext, get_filters
+from visualizations.sketches import emission_sketches
+from visualizations.stats_engine import display_descriptive_analytics, emission_stats
+from visualizations import charts
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-def fetch_material_data(category):
-    """Fetch material emissions data from the database."""
+def fetch_material_data(category, filters: FilterContext):
+    """Fetch material emissions data for a category and the active filters."""
     try:
-        conn = sqlite3.connect("data/emissions.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, event, Weight, Quantity, Emission, Timestamp FROM Materials WHERE Category = ?", (category,))
-        data = cursor.fetchall()
-        conn.close()
-        return data
+        where, params = filters.combine("Category = ?", (category,))
+        return cached_query(f"SELECT id, event, Weight, Quantity, Emission, Timestamp FROM Materials WHERE {where}", params)
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         logging.error(f"Error fetching material data: {e}")
         return []
 
-def display_descriptive_analytics(df):
-    """Display descriptive analytics for material emissions."""
-    total_emission = round(df["Emission"].sum(), 3)
-    avg_emission = round(df["Emission"].mean(), 3)
-    max_emission = round(df["Emission"].max(), 3)
-    min_emission = round(df["Emission"].min(), 3)
-    day_with_highest_emission = df["Timestamp"].max()
-    no_of_emissions = df["Emission"].count()
-
-    st.subheader("Descriptive Analysis")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric(label='Total Emission (kg CO₂)', value=total_emission, delta_color="off")
-    with col2:
-        st.metric(label='Average Emission (kg CO₂)', value=avg_emission, delta_color="off")
-    with col3:
-        st.metric(label='Highest Recorded Emission (kg CO₂)', value=max_emission, delta_color="off")
-
-    col4, col5, col6 = st.columns(3)
-    with col4:
-        st.metric(label='Lowest Recorded Emission (kg CO₂)', value=min_emission, delta_color="off")
-    with col5:
-        st.metric(label='Number of Emissions Recorded', value=no_of_emissions, delta_color="off")
-    with col6:
-        st.metric(label='Day with Highest Emission', value=day_with_highest_emission, delta_color="off")
-
-def visualize(category):
+def visualize(category, filters: Optional[FilterContext] = None):
     """Display material emissions visualizations."""
-    data = fetch_material_data(category)
+    filters = filters or get_filters()
+    data = fetch_material_data(category, filters)
     if not data:
         st.write("No records found.")
         return
@@ -60,29 +39,41 @@ def visualize(category):
     df["Emission"] = df["Emission"].astype(float)
 
     st.subheader("Stored Data")
-    st.dataframe(df, use_container_width=True)
+    data_grid("Materials", {
+        "id": "id", "event": "event", "Weight": "Weight", "Quantity": "Quantity",
+        "Emission": "Emission", "Timestamp": "Timestamp",
+    }, key=f"material_grid_{category}", filters=filters, where="Category = ?", params=(category,))
 
     # Scatter Plot: Total Emission by Events
     st.subheader("Total Emission by Events")
-    fig = px.scatter(df, x="Timestamp", y="Emission", size="Quantity", color="Emission",
-                     title="Total Emission by Events", color_continuous_scale="Blues")
+    key = f"material_by_time_{category}"
+    fig = charts.scatter(downsample(df, "Timestamp", "Emission", method="minmax", x_range=charts.zoom_range(key)),
+                         x="Timestamp", y="Emission", size="Quantity", color="Emission",
+                         title="Total Emission by Events", color_continuous_scale="Blues")
     fig.update_traces(marker=dict(opacity=0.8, line=dict(width=1, color="black")))
-    st.plotly_chart(fig, use_container_width=True)
+    charts.plot(fig, key=key, zoom=True)
 
     # Descriptive Analytics
-    display_descriptive_analytics(df)
+    display_descriptive_analytics(
+        emission_stats("Materials", filters, categories=(category,)),
+        emission_sketches("Materials", filters, categories=(category,)),
+    )
 
     # Emissions Visualization
     st.subheader("Emissions Visualization")
     chart_type = st.selectbox("Select Chart Type:", ["Scatter", "Bar Plot"])
 
     if chart_type == "Scatter":
-        fig = px.scatter(df, x="Weight", y="Emission", size="Quantity", color="Emission",
-                         title="Weight vs CO₂ Emission", color_continuous_scale="Blues")
+        key = f"material_by_weight_{category}"
+        fig = charts.scatter(downsample(df, "Weight", "Emission", method="minmax", x_range=charts.zoom_range(key)),
+                             x="Weight", y="Emission", size="Quantity", color="Emission",
+                             title="Weight vs CO₂ Emission", color_continuous_scale="Blues")
         fig.update_traces(marker=dict(opacity=0.8, line=dict(width=1, color="black")))
-        st.plotly_chart(fig, use_container_width=True)
+        charts.plot(fig, key=key, zoom=True)
     elif chart_type == "Bar Plot":
-        fig = px.bar(df, x="Quantity", y="Emission", text="Emission", color="Emission",
+        by_quantity = aggregate("Materials", {"Quantity": "Quantity"}, {"Emission": "SUM(Emission)"},
+                                "Category = ?", (category,), order_by="1", filters=filters)
+        fig = charts.bar(by_quantity, x="Quantity", y="Emission", text="Emission", color="Emission",
                      color_continuous_scale="Blues", title="Quantity vs CO₂ Emission")
         fig.update_traces(texttemplate='%{text}', textposition='outside')
-        st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+        charts.plot(fig)
\ No newline at end of file
@@ -0,0 +1,42 @@
+import sqlite3
+import logging
+import pandas as pd
+import streamlit as st
+from shards import cross_shard_aggregate
+from tenancy import list_orgs
+from visualizations import charts
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def fetch_portfolio() -> pd.DataFrame:
+    """Ledger totals per organization and scope, read from every shard in parallel."""
+    try:
+        return cross_shard_aggregate(
+            "MasterEmissions", {"Scope": "Category"},
+            {"Emission": "SUM(Emission)", "Records": "COUNT(*)", "Latest": "MAX(Timestamp)"},
+        )
+    except sqlite3.Error as e:
+        st.error(f"Database error: {e}")
+        logging.error(f"Error fetching portfolio totals: {e}")
+        return pd.DataFrame(columns=["Organization", "Scope", "Emission", "Records", "Latest"])
+
+
+# 📊 Portfolio (consultants only)
+def portfolio_page():
+    """Emissions of every client organization side by side."""
+    st.title("Client Portfolio")
+    df = fetch_portfolio()
+    if df.empty:
+        st.info(f"No emissions recorded yet in {len(list_orgs())} organization(s).")
+        return
+
+    totals = df.pivot_table(index="Organization", columns="Scope", values="Emission", aggfunc="sum", fill_value=0)
+    totals["Total"] = totals.sum(axis=1)
+    summary = df.groupby("Organization").agg(Records=("Records", "sum"), Latest=("Latest", "max"))
+    st.dataframe(totals.join(summary).sort_values("Total", ascending=False).style.format(
+        {column: "{:,.1f}" for column in totals.columns}), use_container_width=True)
+
+    fig = charts.bar(df, x="Organization", y="Emission", color="Scope", title="Emissions by Organization (kg CO₂e)")
+    charts.plot(fig)
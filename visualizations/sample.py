@@ -1,87 +1,41 @@
-import ast
 import json
-import time
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import sqlite3
 import plotly.graph_objects as go
 import logging
+from common import cached_read_sql
+from visualizations.ledger_transform import process_data
+from visualizations.filters import FilterContext, filter_bar
+from visualizations.time_buckets import grain_selector, time_buckets
+from visualizations.change_feed import LIVE_REFRESH_SECONDS, get_ledger_feed
+from visualizations import charts
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-def fetch_data():
-    """Fetch emissions data grouped by category."""
+def fetch_data(filters: FilterContext):
+    """Fetch emissions data grouped by category for the active filters."""
     try:
-        conn = sqlite3.connect("data/emissions.db")
-        query = "SELECT Category, SUM(Emission) AS TotalEmissions, Timestamp FROM MasterEmissions GROUP BY Category;"
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return df
+        where, params = filters.sql(event_column="Event")
+        query = f"SELECT Category, SUM(Emission) AS TotalEmissions, Timestamp FROM MasterEmissions{where} GROUP BY Category;"
+        return cached_read_sql(query, params)
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         logging.error(f"Error fetching data: {e}")
         return pd.DataFrame()
 
-def fetch_total_data():
-    """Fetch all emissions data."""
+def fetch_total_data(filters: FilterContext):
+    """Fetch emissions data for the active filters."""
     try:
-        conn = sqlite3.connect("data/emissions.db")
-        query = "SELECT * FROM MasterEmissions;"
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return df
+        where, params = filters.sql(event_column="Event")
+        query = f"SELECT * FROM MasterEmissions{where};"
+        return cached_read_sql(query, params)
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         logging.error(f"Error fetching total data: {e}")
         return pd.DataFrame()
 
-def convert_to_list(value):
-    """Convert string representations of lists into actual lists."""
-    try:
-        if isinstance(value, str) and value.startswith("["):
-            return ast.literal_eval(value)
-        return value
-    except Exception as e:
-        logging.warning(f"Error converting to list: {e}")
-        return value
-
-def process_data(df):
-    """Process and transform the emissions data."""
-    processed_data = []
-    event_cumulative = {}
-
-    for _, row in df.iterrows():
-        _, SourceTable, Category, Event, Description, Quantity, Weight, Emission, Timestamp = row
-        
-        # Convert lists
-        Description = convert_to_list(Description)
-        Quantity = convert_to_list(Quantity)
-        Emission = convert_to_list(Emission)
-
-        # If Description is a list, split into multiple rows
-        if isinstance(Description, list):
-            for desc, qty, emi in zip(Description, Quantity, Emission):
-                processed_data.append([SourceTable, Category, Event, desc, qty, Weight, emi, Timestamp])
-        else:
-            processed_data.append([SourceTable, Category, Event, Description, Quantity, Weight, Emission, Timestamp])
-    
-    # Convert to DataFrame
-    transformed_df = pd.DataFrame(processed_data, columns=["SourceTable", "Category", "Event", "Description", "Quantity", "Weight", "Emission", "Timestamp"])
-
-    # Compute cumulative emissions per event
-    for event in transformed_df["Event"].unique():
-        event_cumulative[event] = transformed_df[transformed_df["Event"] == event]["Emission"].sum()
-
-    # Add cumulative emissions column
-    transformed_df["Cumulative Emission"] = transformed_df["Event"].map(event_cumulative)
-
-    # Assign unique row numbers
-    transformed_df.insert(0, "ID", range(1, len(transformed_df) + 1))
-
-    return transformed_df
-
 def display_emissions_summary(df):
     """Display emissions summary by scope."""
     col1, col2, col3 = st.columns(3)
@@ -121,7 +75,7 @@ def display_emissions_summary(df):
                 "Scope2": "#f48080", 
                 "Scope3": "white"
             }
-            fig = px.pie(
+            fig = charts.pie(
                 df, 
                 values='TotalEmissions', 
                 names='Category', 
@@ -129,7 +83,7 @@ def display_emissions_summary(df):
                 color='Category',  # Assign colors by category
                 color_discrete_map=custom_colors  # Map categories to colors
             )
-            st.plotly_chart(fig)
+            charts.plot(fig)
         else:
             st.warning("No records found.")
 
@@ -161,48 +115,48 @@ def display_emissions_summary(df):
             </div>
         """, unsafe_allow_html=True)
 
-def display_gauge_chart(transformed_df):
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def display_gauge_chart(filters: FilterContext):
     """Display a real-time gauge chart for cumulative emissions."""
-    def get_latest_emission():
-        return transformed_df["Cumulative Emission"].iloc[-1]  # Get latest emission value
+    feed = get_ledger_feed()
+    feed.poll()  # Only reads ledger rows added since the last refresh
+    snapshot = feed.snapshot(filters)
+    event_totals = snapshot["event_totals"]
 
     st.title("Total Emission")
-    gauge_placeholder = st.empty()
-
-    for _ in range(100):  # Simulate live updates
-        latest_emission = get_latest_emission()
-
-        fig = go.Figure(go.Indicator(
-            mode="gauge+number", 
-            value=latest_emission, 
-            title={'text': "Emission Levels"}, 
-            gauge={
-                'axis': {'range': [0, transformed_df["Cumulative Emission"].max()]}, 
-                'bar': {'color': "red"},
-                'steps': [
-                    {'range': [0, 50], 'color': "green"},
-                    {'range': [50, 100], 'color': "yellow"},
-                    {'range': [100, transformed_df["Cumulative Emission"].max()], 'color': "red"}
-                ],
-                'threshold': {
-                    'line': {'color': "black", 'width': 4},
-                    'thickness': 0.75,
-                    'value': latest_emission
-                }
+    if not event_totals:
+        st.warning("No records found.")
+        return
+    latest_emission = event_totals[snapshot["last_event"]]
+    max_emission = max(event_totals.values())
+
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number", 
+        value=latest_emission, 
+        title={'text': "Emission Levels"}, 
+        gauge={
+            'axis': {'range': [0, max_emission]}, 
+            'bar': {'color': "red"},
+            'steps': [
+                {'range': [0, 50], 'color': "green"},
+                {'range': [50, 100], 'color': "yellow"},
+                {'range': [100, max_emission], 'color': "red"}
+            ],
+            'threshold': {
+                'line': {'color': "black", 'width': 4},
+                'thickness': 0.75,
+                'value': latest_emission
             }
-        ))
+        }
+    ))
 
-        gauge_placeholder.plotly_chart(fig)
-        time.sleep(2)  # Refresh every 2 seconds
+    st.plotly_chart(fig)
 
 def chatbot_response(user_input):
     """Generate a response for the chatbot based on user input."""
     def query_database(query):
         try:
-            conn = sqlite3.connect("data/emissions.db")
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
+            return cached_read_sql(query)
         except sqlite3.Error as e:
             st.error(f"Database error: {e}")
             logging.error(f"Error querying database: {e}")
@@ -229,8 +183,9 @@ def chatbot_response(user_input):
 
 def vis():
     """Main function to display the overall analysis."""
-    df = fetch_data()
-    transformed = process_data(fetch_total_data())
+    filters = filter_bar()
+    df = fetch_data(filters)
+    transformed = process_data(fetch_total_data(filters))
 
     # Display emissions summary
     display_emissions_summary(df)
@@ -239,24 +194,26 @@ def vis():
     c, co = st.columns(2)
     with c:
         d = st.selectbox("Select", ["SourceTable", "Category", "Event", "Description"])
-        fig1 = px.bar(transformed, x=d, y="Emission", title="Emissions by Category")
+        fig1 = charts.bar(transformed, x=d, y="Emission", title="Emissions by Category")
         fig1.update_traces(marker_color="#ffffff")
-        st.plotly_chart(fig1, use_container_width=True, key="f1")
+        charts.plot(fig1, key="f1")
     with co:
-        display_gauge_chart(transformed)
+        display_gauge_chart(filters)
 
     # Emissions trend over time
     col4, col5 = st.columns(2)
     with col4:
         st.write("Emission breakdown")
         category = st.selectbox("Select", ["SourceTable", "Category", "Event", "Description", "Cumulative Emission", "Timestamp"])
-        fig1 = px.bar(transformed, x="Cumulative Emission", y=category, title="Emission Trend", color_discrete_sequence=["red", "blue", "green", "purple"])
-        st.plotly_chart(fig1, use_container_width=True, key="f2")
+        fig1 = charts.bar(transformed, x="Cumulative Emission", y=category, title="Emission Trend", color_discrete_sequence=["red", "blue", "green", "purple"])
+        charts.plot(fig1, key="f2")
     with col5:
         st.subheader("📈 Emissions Over Time")
-        fig2 = px.line(transformed, x="Timestamp", y="Cumulative Emission", title="Emission Trend", color_discrete_sequence=["red", "blue", "green", "purple"], markers=True)
-        fig2.update_layout(hovermode="x unified", xaxis_title="Timestamp", yaxis_title="Cumulative Emission", legend_title="Legend", hoverlabel=dict(bgcolor="black", font_size=12, font_family="Arial"))
-        st.plotly_chart(fig2, use_container_width=True)
+        grain = grain_selector(key="overall_trend_grain")
+        trend = time_buckets("MasterEmissions", grain, {"Emission": "Emission"}, {"Scope": "Category"}, filters=filters)
+        fig2 = charts.line(trend, x="Bucket", y="Emission", color="Scope", title="Emission Trend", color_discrete_sequence=["red", "blue", "green", "purple"], markers=True)
+        fig2.update_layout(hovermode="x unified", xaxis_title=grain.title(), yaxis_title="Emission", legend_title="Legend", hoverlabel=dict(bgcolor="black", font_size=12, font_family="Arial"))
+        charts.plot(fig2)
 
     # Chatbot
     st.title("Emissions Chatbot")
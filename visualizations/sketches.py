@@ -0,0 +1,282 @@
+import random
+import sqlite3
+import struct
+import logging
+import threading
+from collections import defaultdict
+from contextlib import closing
+from typing import Dict, Iterable, List, Optional, Sequence
+from common import cached_query, get_db_path, query_cache
+from resources import registry
+from visualizations.filters import FilterContext
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# 📐 Sketch parameters
+#
+# KLL (Karnin, Lang & Liberty, 2016) with k = 200 keeps at most about 3k values (~5 KB
+# serialized) however long the stream is. The published bound for that size is a normalized rank error of about 1.33% for a
+# single quantile at 99% confidence: the reported median sits between the 48.7th and 51.3rd
+# percentile of the exact data. Below ~k values per sketch nothing is compacted and answers
+# are exact. Merging sketches (events, days, categories) keeps the same bound.
+SKETCH_K = 200
+SKETCH_RANK_ERROR = 0.0133
+SKETCH_DRAIN_BATCH = 50_000  # Queue rows folded per write transaction
+SKETCH_FOLD_SECONDS = 5  # Interval of the background fold of queued values
+
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<BHQddB")  # version, k, n, min, max, levels
+
+
+class KLLSketch:
+    """Mergeable quantile sketch: level ``h`` holds values that each stand for ``2**h`` inputs."""
+
+    def __init__(self, k: int = SKETCH_K, rng: Optional[random.Random] = None):
+        self.k = k
+        self.n = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.levels: List[List[float]] = [[]]
+        self._rng = rng or random
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(self.k * (2 / 3) ** depth) + 1)
+
+    def _size(self) -> int:
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def _compress(self):
+        """Halve full levels (keeping every other sorted value, from a random offset) until the sketch fits."""
+        while self._size() >= self._max_size():
+            for level, items in enumerate(self.levels):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.levels):
+                        self.levels.append([])
+                    items.sort()
+                    leftover = items.pop() if len(items) % 2 else None
+                    self.levels[level + 1].extend(items[self._rng.randrange(2)::2])
+                    items.clear()
+                    if leftover is not None:
+                        items.append(leftover)
+                    break
+
+    def update(self, value: float):
+        self.extend((value,))
+
+    def extend(self, values: Iterable[float]):
+        """Add a batch of values (one compression pass for the whole batch)."""
+        values = [float(v) for v in values]
+        if not values:
+            return
+        self.n += len(values)
+        low, high = min(values), max(values)
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self.levels[0].extend(values)
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Fold ``other`` into this sketch (in place) and return it."""
+        if not other.n:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, fractions: Sequence[float]) -> List[Optional[float]]:
+        """Approximate values at the given fractions of the distribution (0 is the min, 1 the max)."""
+        if not self.n:
+            return [None for _ in fractions]
+        weighted = sorted((value, 1 << level) for level, items in enumerate(self.levels) for value in items)
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for q in fractions:
+            if q <= 0:
+                results.append(self.min)
+                continue
+            if q >= 1:
+                results.append(self.max)
+                continue
+            target, seen = q * total, 0
+            for value, weight in weighted:
+                seen += weight
+                if seen >= target:
+                    results.append(value)
+                    break
+        return results
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles((q,))[0]
+
+    def to_bytes(self) -> bytes:
+        sizes = [len(items) for items in self.levels]
+        values = [value for items in self.levels for value in items]
+        return (
+            _HEADER.pack(_FORMAT_VERSION, self.k, self.n, self.min or 0.0, self.max or 0.0, len(sizes))
+            + struct.pack(f"<{len(sizes)}I", *sizes)
+            + struct.pack(f"<{len(values)}d", *values)
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "KLLSketch":
+        version, k, n, low, high, depth = _HEADER.unpack_from(data)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported sketch format version {version}")
+        offset = _HEADER.size
+        sizes = struct.unpack_from(f"<{depth}I", data, offset)
+        offset += 4 * depth
+        values = struct.unpack_from(f"<{sum(sizes)}d", data, offset)
+        sketch = cls(k)
+        sketch.n = n
+        sketch.min, sketch.max = (low, high) if n else (None, None)
+        sketch.levels, start = [], 0
+        for size in sizes:
+            sketch.levels.append(list(values[start:start + size]))
+            start += size
+        return sketch
+
+
+def merge_sketches(sketches: Iterable[KLLSketch]) -> KLLSketch:
+    """One sketch covering all of ``sketches`` (which are left untouched)."""
+    merged = KLLSketch()
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+
+_sync_lock = threading.Lock()
+_synced_versions: Dict[str, int] = {}
+
+
+def sync_sketches(db_path: Optional[str] = None) -> int:
+    """Fold queued values into the stored sketches; returns how many were folded.
+
+    The insert triggers queue every new line item, so the sketches catch up with exactly the
+    rows written since the last sync. Skipped while ``PRAGMA data_version`` is unchanged.
+    Runs on the background ``SketchFolder``; readers never take the write lock.
+    """
+    db_path = db_path or get_db_path()
+    with _sync_lock:
+        version = query_cache.data_version(db_path)
+        if _synced_versions.get(db_path) == version:
+            return 0
+
+        folded = 0
+        try:
+            with closing(sqlite3.connect(db_path, timeout=30, isolation_level=None)) as conn:
+                while True:
+                    conn.execute("BEGIN IMMEDIATE")
+                    rows = conn.execute(
+                        "SELECT id, SourceTable, Event, Category, Day, Value FROM EmissionSketchQueue "
+                        "ORDER BY id LIMIT ?",
+                        (SKETCH_DRAIN_BATCH,),
+                    ).fetchall()
+                    if not rows:
+                        conn.execute("ROLLBACK")
+                        break
+
+                    batches = defaultdict(list)
+                    for _, *key, value in rows:
+                        batches[tuple(key)].append(value)
+                    for key, values in batches.items():
+                        stored = conn.execute(
+                            "SELECT Sketch FROM EmissionSketches "
+                            "WHERE SourceTable = ? AND Event = ? AND Category = ? AND Day = ?",
+                            key,
+                        ).fetchone()
+                        sketch = KLLSketch.from_bytes(stored[0]) if stored else KLLSketch()
+                        sketch.extend(values)
+                        conn.execute(
+                            "INSERT OR REPLACE INTO EmissionSketches (SourceTable, Event, Category, Day, Count, Sketch) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            (*key, sketch.n, sketch.to_bytes()),
+                        )
+                    conn.execute("DELETE FROM EmissionSketchQueue WHERE id <= ?", (rows[-1][0],))
+                    conn.execute("COMMIT")
+                    folded += len(rows)
+        except sqlite3.Error as e:
+            logging.error(f"Error updating emission sketches: {e}")
+            return folded
+
+        # The version read before draining: rows committed meanwhile are folded on the next run
+        _synced_versions[db_path] = version
+        if folded:
+            logging.info(f"Folded {folded} values into emission sketches")
+        return folded
+
+
+class SketchFolder:
+    """Background thread folding one database's sketch queue every ``SKETCH_FOLD_SECONDS``."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sketch-folder", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                sync_sketches(self.db_path)
+            except Exception as e:
+                logging.error(f"Sketch folder for {self.db_path} failed: {e}")
+            if self._stop.wait(SKETCH_FOLD_SECONDS):
+                return
+
+    def alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=SKETCH_FOLD_SECONDS)
+
+
+registry.register("sketch_folder", SketchFolder, close=SketchFolder.close, health=SketchFolder.alive,
+                  per_database=True)
+
+
+def emission_sketches(source: str, filters: Optional[FilterContext] = None,
+                      categories: Sequence[str] = ()) -> Dict[str, KLLSketch]:
+    """Per-category quantile sketches of one source table, merged across the filtered events and days.
+
+    Values still queued for the background fold are added in memory; stored sketches and queue
+    are read in one statement, so a concurrent fold can neither drop nor double-count a value.
+    """
+    registry.get("sketch_folder", get_db_path())
+    where, params = "SourceTable = ?", [source]
+    if categories:
+        where += f" AND Category IN ({', '.join('?' for _ in categories)})"
+        params.extend(categories)
+    if filters:
+        where, params = filters.combine(where, params, event_column="Event", timestamp_column="Day", epoch=False)
+
+    by_category: Dict[str, KLLSketch] = {}
+    pending = defaultdict(list)
+    rows = cached_query(
+        f"SELECT Category, Sketch, NULL FROM EmissionSketches WHERE {where} "
+        f"UNION ALL SELECT Category, NULL, Value FROM EmissionSketchQueue WHERE {where}",
+        params * 2,
+    )
+    for category, blob, value in rows:
+        if blob is None:
+            pending[category].append(value)
+            continue
+        sketch = KLLSketch.from_bytes(blob)
+        if category in by_category:
+            by_category[category].merge(sketch)
+        else:
+            by_category[category] = sketch
+    for category, values in pending.items():
+        by_category.setdefault(category, KLLSketch()).extend(values)
+    return by_category
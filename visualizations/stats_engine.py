@@ -0,0 +1,130 @@
+import math
+import logging
+from dataclasses import dataclass
+from functools import reduce
+from typing import Dict, Optional, Sequence
+import pandas as pd
+import streamlit as st
+from common import cached_query
+from visualizations.filters import FilterContext
+from visualizations.sketches import SKETCH_RANK_ERROR, KLLSketch, merge_sketches
+from visualizations import charts
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+@dataclass(frozen=True)
+class RunningStats:
+    """Count, total, mean, M2 and extremes of a series; partial results merge without the raw rows."""
+    count: int = 0
+    total: float = 0.0
+    mean: float = 0.0
+    m2: float = 0.0  # Sum of squared deviations from the mean
+    min: Optional[float] = None
+    max: Optional[float] = None
+    peak_timestamp: Optional[str] = None  # When ``max`` was recorded
+    latest_timestamp: Optional[str] = None
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Combine two partial results (Chan et al.'s parallel form of Welford's update)."""
+        if not other.count:
+            return self
+        if not self.count:
+            return other
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        peak = other if other.max > self.max else self
+        return RunningStats(
+            count=count,
+            total=self.total + other.total,
+            mean=self.mean + delta * other.count / count,
+            m2=self.m2 + other.m2 + delta * delta * self.count * other.count / count,
+            min=min(self.min, other.min),
+            max=peak.max,
+            peak_timestamp=peak.peak_timestamp,
+            latest_timestamp=max(self.latest_timestamp or "", other.latest_timestamp or "") or None,
+        )
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 for fewer than two records)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(max(self.variance, 0.0))
+
+
+def emission_stats(source: str, filters: Optional[FilterContext] = None,
+                   categories: Sequence[str] = ()) -> RunningStats:
+    """Merged statistics of one source table from the ``EmissionStats`` rollups.
+
+    Reads one row per (event, category, day) bucket instead of the line items, so the cost
+    doesn't grow with the number of records. ``categories`` narrows to e.g. one material.
+    """
+    where, params = "SourceTable = ?", [source]
+    if categories:
+        where += f" AND Category IN ({', '.join('?' for _ in categories)})"
+        params.extend(categories)
+    if filters:
+        where, params = filters.combine(where, params, event_column="Event", timestamp_column="Day", epoch=False)
+
+    rows = cached_query(
+        "SELECT Count, Total, Mean, M2, MinValue, MaxValue, PeakTimestamp, LatestTimestamp "
+        f"FROM EmissionStats WHERE {where}",
+        params,
+    )
+    return reduce(RunningStats.merge, (RunningStats(*row) for row in rows), RunningStats())
+
+
+# 📊 Descriptive Analytics
+def display_descriptive_analytics(stats: RunningStats, sketches: Optional[Dict[str, KLLSketch]] = None,
+                                  column: str = "Emission (kg CO₂)"):
+    """Display the shared descriptive analytics panel for a series (percentiles when sketches are given)."""
+    st.subheader("Descriptive Analysis")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric(label=f'Total {column}', value=round(stats.total, 3), delta_color="off")
+    with col2:
+        st.metric(label=f'Average {column}', value=round(stats.mean, 3), delta_color="off")
+    with col3:
+        st.metric(label=f'Std. Deviation {column}', value=round(stats.std, 3), delta_color="off")
+    with col4:
+        st.metric(label='Number of Records', value=stats.count, delta_color="off")
+
+    col5, col6, col7 = st.columns(3)
+    with col5:
+        st.metric(label=f'Highest Recorded {column}', value=round(stats.max or 0, 3), delta_color="off")
+    with col6:
+        st.metric(label=f'Lowest Recorded {column}', value=round(stats.min or 0, 3), delta_color="off")
+    with col7:
+        st.metric(label=f'Highest {column} Recorded On', value=stats.peak_timestamp, delta_color="off")
+
+    if sketches:
+        median, p90, p95 = merge_sketches(sketches.values()).quantiles((0.5, 0.9, 0.95))
+        approx = f"Approximate: within ±{SKETCH_RANK_ERROR:.1%} of the exact percentile rank"
+        col8, col9, col10 = st.columns(3)
+        with col8:
+            st.metric(label=f'Median {column}', value=round(median, 3), delta_color="off", help=approx)
+        with col9:
+            st.metric(label=f'90th Percentile {column}', value=round(p90, 3), delta_color="off", help=approx)
+        with col10:
+            st.metric(label=f'95th Percentile {column}', value=round(p95, 3), delta_color="off", help=approx)
+        display_distribution(sketches, column)
+
+
+def display_distribution(sketches: Dict[str, KLLSketch], column: str = "Emission (kg CO₂)"):
+    """Box plot per category drawn from the quantile sketches; whiskers span 1.5 IQR, clipped to min/max."""
+    rows = []
+    for category, sketch in sorted(sketches.items()):
+        q1, median, q3 = sketch.quantiles((0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        rows.append({
+            "Category": category or "Other",
+            "q1": q1, "median": median, "q3": q3,
+            "lowerfence": max(sketch.min, q1 - 1.5 * iqr),
+            "upperfence": min(sketch.max, q3 + 1.5 * iqr),
+        })
+    fig = charts.quantile_box(pd.DataFrame(rows), x="Category", title=f"{column} Distribution", yaxis_title=column)
+    charts.plot(fig)
@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+from zoneinfo import ZoneInfo
+import pandas as pd
+import streamlit as st
+from visualizations.aggregations import aggregate
+from visualizations.filters import DISPLAY_TIMEZONE, FilterContext
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+GRAINS = ("hour", "day", "week", "month", "quarter", "year")
+_PERIODS = {"month": "M", "quarter": "Q", "year": "Y"}
+
+
+def slice_seconds(tz: str) -> int:
+    """Width of the UTC slices SQL groups by: hours, or quarter hours for zones like +05:30."""
+    zone = ZoneInfo(tz)
+    year = datetime.now().year
+    offsets = [datetime(year, month, 1, tzinfo=zone).utcoffset().total_seconds() for month in (1, 7)]
+    return 3600 if all(offset % 3600 == 0 for offset in offsets) else 900
+
+
+def bucket_starts(epochs: pd.Series, grain: str, tz: Optional[str] = None) -> pd.Series:
+    """Local wall-clock start of the calendar bucket that each Unix time falls in."""
+    if grain not in GRAINS:
+        raise ValueError(f"Unknown time bucket {grain!r}; expected one of {GRAINS}")
+    local = pd.to_datetime(epochs, unit="s", utc=True).dt.tz_convert(tz or DISPLAY_TIMEZONE).dt.tz_localize(None)
+    if grain == "hour":
+        return local.dt.floor("h")
+    if grain == "day":
+        return local.dt.normalize()
+    if grain == "week":
+        # ISO weeks start on Monday
+        return local.dt.normalize() - pd.to_timedelta(local.dt.weekday, unit="D")
+    return local.dt.to_period(_PERIODS[grain]).dt.start_time
+
+
+def time_buckets(source: str, grain: str, values: Optional[Dict[str, str]] = None,
+                 group_by: Optional[Dict[str, str]] = None, where: str = "", params: Sequence = (),
+                 filters: Optional[FilterContext] = None, tz: Optional[str] = None) -> pd.DataFrame:
+    """Sum ``values`` per calendar bucket (hour/day/week/month/quarter/year) in timezone ``tz``.
+
+    SQL groups the indexed ``Epoch`` column into fixed UTC slices; the slices are then mapped to
+    local calendar buckets, so months, DST days and half-hour offsets all come out right.
+    Returns ``Bucket`` (local start), the ``group_by`` columns, the summed ``values`` and ``Count``.
+    """
+    tz = tz or DISPLAY_TIMEZONE
+    values = values or {"Emission": "Emission"}
+    group_by = group_by or {}
+    base = slice_seconds(tz)
+
+    slices = aggregate(
+        source,
+        {"Slice": f"Epoch / {base}", **group_by},
+        {**{name: f"SUM({expr})" for name, expr in values.items()}, "Count": "COUNT(*)"},
+        " AND ".join(part for part in ("Epoch IS NOT NULL", where) if part),
+        params,
+        filters=filters,
+    )
+    columns = ["Bucket", *group_by, *values, "Count"]
+    if slices.empty:
+        return pd.DataFrame(columns=columns)
+
+    slices["Bucket"] = bucket_starts(slices["Slice"] * base, grain, tz)
+    return (
+        slices.groupby(["Bucket", *group_by], as_index=False, sort=True, dropna=False)[[*values, "Count"]]
+        .sum()[columns]
+    )
+
+
+def grain_selector(key: str, default: str = "day") -> str:
+    """Selectbox for the time bucket of a trend chart."""
+    return st.selectbox("Group by", GRAINS, index=GRAINS.index(default), format_func=str.title, key=key)
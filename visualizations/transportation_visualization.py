@@ -1,104 +1,102 @@
 import streamlit as st
 import sqlite3
 import pandas as pd
-import plotly.express as px
 import logging
+from typing import Optional
+from common import cached_query
+from visualizations.aggregations import aggregate
+from visualizations.data_grid import data_grid
+from visualizations.downsample import downsample
+from visualizations.filters import FilterContext, get_filters
+from visualizations.time_buckets import grain_selector, time_buckets
+from visualizations.sketches import emission_sketches
+from visualizations.stats_engine import display_descriptive_analytics, emission_stats
+from visualizations import charts
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-@st.cache_data  # Cache the data to avoid redundant database calls
-def fetch_transport_data(table):
-    """Fetch transport emissions data from the database."""
+def fetch_transport_data(table, filters: FilterContext, where: str = "", params=()):
+    """Fetch transport emissions data for the active filters (and an optional extra condition)."""
     try:
-        conn = sqlite3.connect('data/emissions.db')
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT Mode, Vehicle, WeightOrDistance, Emission, Timestamp FROM {table}")
-        data = cursor.fetchall()
-        conn.close()
-        return data
+        where, params = filters.combine(where, params)
+        where = f" WHERE {where}" if where else ""
+        return cached_query(f"SELECT Mode, Vehicle, WeightOrDistance, Emission, Timestamp FROM {table}{where}", params)
     except sqlite3.Error as e:
         st.error(f"Database error: {e}")
         logging.error(f"Error fetching transport data: {e}")
         return []
 
-def display_descriptive_analytics(df):
-    """Display descriptive analytics for transport emissions."""
-    total_emission = round(df["Emission (kg CO₂)"].sum(), 3)
-    avg_emission = round(df["Emission (kg CO₂)"].mean(), 3)
-    max_emission = round(df["Emission (kg CO₂)"].max(), 3)
-    min_emission = round(df["Emission (kg CO₂)"].min(), 3)
-    day_with_highest_emission = df["Timestamp"].max()
-    no_of_emissions = df["Emission (kg CO₂)"].count()
+def fetch_filter_options(table, filters: FilterContext):
+    """Vehicle types and emission bounds for the chart filters."""
+    where, params = filters.sql()
+    vehicle_types = [row[0] for row in cached_query(f"SELECT DISTINCT Vehicle FROM {table}{where}", params)]
+    bounds = cached_query(f"SELECT MIN(Emission), MAX(Emission) FROM {table}{where}", params)[0]
+    return vehicle_types, bounds
 
-    st.subheader("Descriptive Analysis")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric(label='Total Emission (kg CO₂)', value=total_emission, delta_color="off")
-    with col2:
-        st.metric(label='Average Emission (kg CO₂)', value=avg_emission, delta_color="off")
-    with col3:
-        st.metric(label='Highest Recorded Emission (kg CO₂)', value=max_emission, delta_color="off")
+def prefetch_transport_data(table, filters: FilterContext):
+    """Warm the query cache for ``transport_visual`` (safe to call from a worker thread)."""
+    emission_stats(table, filters)
+    emission_sketches(table, filters)
+    fetch_filter_options(table, filters)
 
-    col4, col5, col6 = st.columns(3)
-    with col4:
-        st.metric(label='Lowest Recorded Emission (kg CO₂)', value=min_emission, delta_color="off")
-    with col5:
-        st.metric(label='Number of Emissions Recorded', value=no_of_emissions, delta_color="off")
-    with col6:
-        st.metric(label='Day with Highest Emission', value=day_with_highest_emission, delta_color="off")
-
-def transport_visual(table):
+def transport_visual(table, filters: Optional[FilterContext] = None):
     """Display transport emissions visualizations."""
     st.subheader("🚗 Transport Emission Data")
+    filters = filters or get_filters()
 
-    # Fetch data (cached)
-    data = fetch_transport_data(table)
-    if not data:
+    stats = emission_stats(table, filters)
+    if not stats.count:
         st.warning("No transport emission records found.")
         return
 
-    # Convert data to DataFrame
-    df = pd.DataFrame(data, columns=["Mode", "Vehicle", "Distance (km)", "Emission (kg CO₂)", "Timestamp"])
-    df["Distance (km)"] = df["Distance (km)"].astype(float)
-    df["Emission (kg CO₂)"] = df["Emission (kg CO₂)"].astype(float)
-
-    # Display raw data
+    # Display raw data, one page at a time
     st.write("### Raw Data")
-    st.dataframe(df, use_container_width=True)
+    data_grid(table, {
+        "Mode": "Mode", "Vehicle": "Vehicle", "Distance (km)": "WeightOrDistance",
+        "Emission (kg CO₂)": "Emission", "Timestamp": "Timestamp",
+    }, key=f"{table}_grid", filters=filters)
 
     # Descriptive analytics
-    display_descriptive_analytics(df)
+    display_descriptive_analytics(stats, emission_sketches(table, filters))
 
-    # Interactive filters
-    st.sidebar.header("Filters")
-    vehicle_types = df["Vehicle"].unique()
-    selected_vehicles = st.sidebar.multiselect(
+    # Interactive filters (options and bounds come straight from SQL)
+    st.write("### Filters")
+    vehicle_types, (min_emission, max_emission) = fetch_filter_options(table, filters)
+    selected_vehicles = st.multiselect(
         "Select Vehicle Types", vehicle_types, default=vehicle_types
     )
-    emission_range = st.sidebar.slider(
+    emission_range = st.slider(
         "Select Emission Range (kg CO₂)",
-        float(df["Emission (kg CO₂)"].min()),
-        float(df["Emission (kg CO₂)"].max()),
-        (float(df["Emission (kg CO₂)"].min()), float(df["Emission (kg CO₂)"].max())),
+        float(min_emission),
+        float(max_emission),
+        (float(min_emission), float(max_emission)),
     )
 
-    # Filter data based on user selection
-    filtered_df = df[
-        (df["Vehicle"].isin(selected_vehicles)) &
-        (df["Emission (kg CO₂)"] >= emission_range[0]) &
-        (df["Emission (kg CO₂)"] <= emission_range[1])
-    ]
-
     # Visualization options
     st.write("### Visualizations")
     chart_type = st.selectbox(
         "Select Chart Type", ["Bar Chart", "Scatter Plot", "Line Chart"]
     )
 
+    # Same filters, applied in SQL for the aggregated charts
+    placeholders = ", ".join("?" for _ in selected_vehicles) or "NULL"
+    selection = f"Vehicle IN ({placeholders}) AND Emission BETWEEN ? AND ?"
+    selection_params = (*selected_vehicles, *emission_range)
+
+    zoom_key = None  # Only the scatter zooms
     if chart_type == "Bar Chart":
-        fig = px.bar(
-            filtered_df,
+        # One row per vehicle and mode
+        by_vehicle = aggregate(
+            table,
+            {"Vehicle": "Vehicle", "Mode": "Mode"},
+            {"Emission (kg CO₂)": "SUM(Emission)"},
+            selection,
+            selection_params,
+            filters=filters,
+        )
+        fig = charts.bar(
+            by_vehicle,
             x="Vehicle",
             y="Emission (kg CO₂)",
             color="Mode",
@@ -106,23 +104,41 @@ def transport_visual(table):
             labels={"Emission (kg CO₂)": "CO₂ Emission (kg)"},
         )
     elif chart_type == "Scatter Plot":
-        fig = px.scatter(
-            filtered_df,
+        # Only the scatter needs individual records, and only those in the zoomed distance range
+        zoom_key = f"{table}_scatter"
+        x_range = charts.zoom_range(zoom_key)
+        where, params = selection, selection_params
+        if x_range:
+            where, params = f"{selection} AND WeightOrDistance BETWEEN ? AND ?", (*selection_params, *sorted(x_range))
+        points = pd.DataFrame(
+            fetch_transport_data(table, filters, where, params),
+            columns=["Mode", "Vehicle", "Distance (km)", "Emission (kg CO₂)", "Timestamp"],
+        )
+        points["Distance (km)"] = points["Distance (km)"].astype(float)
+        points["Emission (kg CO₂)"] = points["Emission (kg CO₂)"].astype(float)
+        fig = charts.scatter(
+            downsample(points, "Distance (km)", "Emission (kg CO₂)", by="Vehicle", method="minmax"),
             x="Distance (km)",
             y="Emission (kg CO₂)",
             color="Vehicle",
             title="Emission vs Distance by Vehicle Type",
         )
     elif chart_type == "Line Chart":
-        fig = px.line(
-            filtered_df,
-            x="Timestamp",
+        grain = grain_selector(key="transport_trend_grain")
+        trend = time_buckets(
+            table, grain, {"Emission (kg CO₂)": "Emission"}, {"Vehicle": "Vehicle"},
+            selection, selection_params, filters=filters,
+        )
+        fig = charts.line(
+            trend,
+            x="Bucket",
             y="Emission (kg CO₂)",
             color="Vehicle",
+            markers=True,
             title="Emission Trend Over Time",
         )
 
-    st.plotly_chart(fig, use_container_width=True)
+    charts.plot(fig, key=zoom_key, zoom=zoom_key is not None)
 
 # Example usage
 if __name__ == "__main__":